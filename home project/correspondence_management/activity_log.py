@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة كتابة سجل النشاطات
+Activity Log Writer Module
+"""
+
+import queue
+import threading
+from datetime import datetime, timezone
+
+class ActivityLogWriter:
+    """كتابة سجل النشاطات على دفعات في خيط خلفي
+    
+    تُجمع الإدخالات في طابور وتُكتب كل دفعة في معاملة واحدة بدلاً من
+    فتح اتصال وتنفيذ commit لكل إدخال.
+    """
+    
+    INSERT_QUERY = '''
+        INSERT INTO activity_log (user_id, action, action_type, table_name, record_id, old_values, new_values, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
+    # نوع النشاط والكلمات التي تدل عليه (بالترتيب، أول تطابق هو المعتمد)
+    ACTION_TYPES = (
+        ('delete', ('حذف', 'delete')),
+        ('edit', ('تعديل', 'تحديث', 'edit')),
+        ('add', ('إضافة', 'add', 'إنشاء')),
+        ('login', ('دخول', 'login')),
+    )
+    DEFAULT_ACTION_TYPE = 'default'
+    
+    def __init__(self, db_manager, batch_size=100, flush_interval=1.0):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+    
+    @staticmethod
+    def timestamp():
+        """الوقت الحالي بنفس صيغة CURRENT_TIMESTAMP (UTC)"""
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    
+    @classmethod
+    def classify_action(cls, action):
+        """تحديد نوع النشاط من نصه"""
+        action_text = (action or '').lower()
+        for action_type, keywords in cls.ACTION_TYPES:
+            if any(keyword in action_text for keyword in keywords):
+                return action_type
+        return cls.DEFAULT_ACTION_TYPE
+    
+    def write(self, user_id, action, table_name=None, record_id=None, old_values=None, new_values=None):
+        """إضافة إدخال إلى الطابور (يُكتب لاحقاً في الخلفية)"""
+        self._ensure_worker()
+        self._queue.put((
+            user_id, action, self.classify_action(action), table_name,
+            record_id, old_values, new_values, self.timestamp()
+        ))
+    
+    def write_now(self, cursor, user_id, action, table_name=None, record_id=None, old_values=None, new_values=None):
+        """كتابة إدخال مباشرة باستخدام مؤشر معاملة قائمة"""
+        cursor.execute(
+            self.INSERT_QUERY,
+            (user_id, action, self.classify_action(action), table_name,
+             record_id, old_values, new_values, self.timestamp())
+        )
+        return cursor.lastrowid
+    
+    def write_many(self, cursor, entries):
+        """كتابة عدة إدخالات دفعة واحدة داخل معاملة قائمة
+        
+        entries: (user_id, action, table_name, record_id) لكل إدخال
+        """
+        timestamp = self.timestamp()
+        cursor.executemany(self.INSERT_QUERY, [
+            (user_id, action, self.classify_action(action), table_name, record_id, None, None, timestamp)
+            for user_id, action, table_name, record_id in entries
+        ])
+    
+    def _ensure_worker(self):
+        """تشغيل الخيط الخلفي عند الحاجة"""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+                self._worker.start()
+    
+    def _worker_loop(self):
+        """حلقة الخيط الخلفي"""
+        try:
+            self._process_queue()
+        finally:
+            # إغلاق اتصال هذا الخيط بقاعدة البيانات قبل انتهائه
+            self.db_manager.release_thread_connection()
+    
+    def _process_queue(self):
+        """جمع الإدخالات وكتابتها على دفعات حتى استلام علامة الإيقاف"""
+        while True:
+            try:
+                entry = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            
+            batch = []
+            stop = entry is None
+            if not stop:
+                batch.append(entry)
+            
+            # جمع ما هو متاح في الطابور حتى حجم الدفعة
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                else:
+                    batch.append(entry)
+            
+            try:
+                if batch:
+                    self._write_batch(batch)
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._queue.task_done()
+            
+            if stop:
+                break
+    
+    def _write_batch(self, batch):
+        """كتابة دفعة كاملة في معاملة واحدة"""
+        try:
+            with self.db_manager.transaction(tables=('activity_log',)) as cursor:
+                cursor.executemany(self.INSERT_QUERY, batch)
+        except Exception as e:
+            print(f"خطأ في كتابة سجل النشاطات: {e}")
+    
+    def flush(self):
+        """الانتظار حتى تُكتب جميع الإدخالات المعلقة"""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.join()
+    
+    def close(self):
+        """كتابة الإدخالات المعلقة وإيقاف الخيط الخلفي"""
+        with self._worker_lock:
+            worker = self._worker
+            self._worker = None
+        if worker is not None and worker.is_alive():
+            self._queue.put(None)
+            worker.join()
@@ -5,18 +5,71 @@
 Authentication and User Management Module
 """
 
-import hashlib
 import sqlite3
 from datetime import datetime
 
+from passwords import PasswordHasher
+
 class AuthManager:
-    def __init__(self, db_manager):
+    # المستخدم المدير الافتراضي عند عدم وجوده
+    DEFAULT_ADMIN = {
+        'username': 'admin',
+        'password': 'admin123',
+        'full_name': 'مدير النظام',
+        'role': 'admin',
+        'department': 'الإدارة',
+    }
+    
+    def __init__(self, db_manager, hasher=None):
         self.db_manager = db_manager
         self.current_user = None
+        self.hasher = hasher or self.load_hasher()
+    
+    def load_hasher(self):
+        """خوارزمية وتكلفة التشفير من app_settings (password.algorithm و password.cost)"""
+        rows = self.db_manager.execute_query(
+            "SELECT key, value FROM app_settings WHERE key IN ('password.algorithm', 'password.cost')"
+        )
+        settings = {row['key'].split('.', 1)[1]: row['value'] for row in rows}
+        try:
+            return PasswordHasher(settings.get('algorithm', 'pbkdf2_sha256'), settings.get('cost'))
+        except ValueError as e:
+            print(f"تحذير: إعدادات تشفير كلمات المرور غير صحيحة، سيتم استخدام الافتراضية: {e}")
+            return PasswordHasher()
     
     def hash_password(self, password):
-        """تشفير كلمة المرور"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """تشفير كلمة المرور (بملح عشوائي وتكلفة قابلة للتعديل)"""
+        return self.hasher.hash(password)
+    
+    def verify_user(self, username, password):
+        """التحقق من كلمة مرور مستخدم نشط بدون تسجيل دخول
+        
+        يعيد بيانات المستخدم أو None. القيم القديمة (SHA-256) أو ذات الإعدادات
+        المختلفة يُعاد تشفيرها بالإعدادات الحالية بعد التحقق الناجح.
+        """
+        query = '''
+            SELECT id, username, full_name, role, department, is_active, password_hash
+            FROM users
+            WHERE username = ? AND is_active = 1
+        '''
+        result = self.db_manager.execute_query(query, (username,))
+        
+        if not result:
+            self.hasher.dummy_verify(password)
+            return None
+        
+        user_data = dict(result[0])
+        stored = user_data.pop('password_hash')
+        if not self.hasher.verify(password, stored):
+            return None
+        
+        if self.hasher.needs_rehash(stored):
+            # الشرط على القيمة القديمة حتى لا تُلغى كلمة مرور تغيرت في نفس الوقت
+            self.db_manager.execute_update(
+                "UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                (self.hash_password(password), user_data['id'], stored)
+            )
+        return user_data
     
     def create_user(self, username, password, full_name, role, department=None):
         """إنشاء مستخدم جديد"""
@@ -41,21 +94,17 @@ class AuthManager:
             return user_id
         return None
     
+    def create_default_admin(self):
+        """إنشاء المستخدم المدير الافتراضي إذا لم يكن موجوداً (يعيد True عند إنشائه)"""
+        if self.user_exists(self.DEFAULT_ADMIN['username']):
+            return False
+        return bool(self.create_user(**self.DEFAULT_ADMIN))
+    
     def authenticate(self, username, password):
         """التحقق من صحة بيانات المستخدم"""
-        password_hash = self.hash_password(password)
+        user_data = self.verify_user(username, password)
         
-        query = '''
-            SELECT id, username, full_name, role, department, is_active
-            FROM users 
-            WHERE username = ? AND password_hash = ? AND is_active = 1
-        '''
-        params = (username, password_hash)
-        
-        result = self.db_manager.execute_query(query, params)
-        
-        if result:
-            user_data = dict(result[0])
+        if user_data:
             self.current_user = user_data
             
             # تسجيل نشاط تسجيل الدخول
@@ -80,6 +129,7 @@ class AuthManager:
                 record_id=self.current_user['id']
             )
             self.current_user = None
+            self.hasher.clear_cache()
     
     def user_exists(self, username):
         """التحقق من وجود المستخدم"""
@@ -159,6 +209,8 @@ class AuthManager:
         result = self.db_manager.execute_update(query, params)
         
         if result is not None:
+            self.hasher.clear_cache()
+            
             # تسجيل النشاط
             self.db_manager.log_activity(
                 user_id=self.current_user['id'] if self.current_user else None,
@@ -234,13 +286,16 @@ class AuthManager:
     
     def get_user_activity_log(self, user_id=None, limit=100):
         """الحصول على سجل نشاطات المستخدم"""
+        # التأكد من كتابة الإدخالات المعلقة قبل القراءة
+        self.db_manager.activity_writer.flush()
+        
         if user_id:
             query = '''
                 SELECT al.*, u.username, u.full_name
                 FROM activity_log al
                 LEFT JOIN users u ON al.user_id = u.id
                 WHERE al.user_id = ?
-                ORDER BY al.timestamp DESC
+                ORDER BY al.timestamp DESC, al.id DESC
                 LIMIT ?
             '''
             params = (user_id, limit)
@@ -249,7 +304,7 @@ class AuthManager:
                 SELECT al.*, u.username, u.full_name
                 FROM activity_log al
                 LEFT JOIN users u ON al.user_id = u.id
-                ORDER BY al.timestamp DESC
+                ORDER BY al.timestamp DESC, al.id DESC
                 LIMIT ?
             '''
             params = (limit,)
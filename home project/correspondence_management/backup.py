@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة النسخ الاحتياطي
+Backup Engine Module
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import tempfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class BackupEngine:
+    """نسخ احتياطي أثناء العمل باستخدام SQLite backup API
+    
+    - النسخ يتم على خطوات من الصفحات مع تقرير التقدم، ومن لقطة قراءة ثابتة
+      (في وضع WAL لا يتم منع المستخدمين من الكتابة أثناء النسخ).
+    - ضغط اختياري gzip أو zstd حسب امتداد الملف (.gz أو .zst).
+    - نسخ تفاضلية تحتوي فقط على الصفحات التي تغيرت منذ آخر نسخة كاملة
+      (بمقارنة بصمات الصفحات المحفوظة في ملف manifest بجانب النسخة الكاملة).
+    """
+    
+    PAGES_PER_STEP = 1024
+    CHUNK_SIZE = 1024 * 1024
+    
+    GZIP_MAGIC = b'\x1f\x8b'
+    ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+    DIFF_MAGIC = b'CMDIFF1\n'
+    
+    MANIFEST_SUFFIX = '.manifest.json'
+    
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+    
+    # أدوات مساعدة
+    @staticmethod
+    def compression_for(path):
+        """تحديد نوع الضغط من امتداد الملف"""
+        if path.endswith('.gz'):
+            return 'gzip'
+        if path.endswith('.zst'):
+            return 'zstd'
+        return None
+    
+    def _open_writer(self, path, compression):
+        """فتح ملف للكتابة مع الضغط المطلوب"""
+        if compression == 'gzip':
+            return gzip.open(path, 'wb', compresslevel=6)
+        if compression == 'zstd':
+            if zstandard is None:
+                raise RuntimeError("مكتبة zstandard غير مثبتة")
+            return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+        return open(path, 'wb')
+    
+    def _open_reader(self, path):
+        """فتح ملف للقراءة مع فك الضغط حسب محتواه"""
+        with open(path, 'rb') as f:
+            magic = f.read(4)
+        if magic.startswith(self.GZIP_MAGIC):
+            return gzip.open(path, 'rb')
+        if magic == self.ZSTD_MAGIC:
+            if zstandard is None:
+                raise RuntimeError("مكتبة zstandard غير مثبتة")
+            return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+        return open(path, 'rb')
+    
+    def _temp_path(self, near_path):
+        """ملف مؤقت في نفس مجلد الملف الهدف"""
+        directory = os.path.dirname(os.path.abspath(near_path))
+        fd, path = tempfile.mkstemp(suffix='.db', dir=directory)
+        os.close(fd)
+        return path
+    
+    @staticmethod
+    def _remove(path):
+        """حذف ملف قاعدة بيانات مؤقت مع ملفاته المرافقة"""
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    
+    @staticmethod
+    def _read_exact(source, size):
+        """قراءة عدد محدد من البايتات من تدفق (قد يعيد أقل عند نهاية الملف)"""
+        data = b''
+        while len(data) < size:
+            chunk = source.read(size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+    
+    def _copy_stream(self, source, target, total=None, progress=None, stage=None):
+        """نسخ تدفق بيانات على أجزاء"""
+        done = 0
+        while True:
+            chunk = source.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            target.write(chunk)
+            done += len(chunk)
+            if progress:
+                progress(stage, done, total or done)
+    
+    # النسخ
+    def snapshot(self, target_path, progress=None):
+        """نسخ قاعدة البيانات الحية إلى ملف SQLite عادي باستخدام backup API"""
+        source = self.db_manager._open_connection()
+        target = sqlite3.connect(target_path)
+        try:
+            # لقطة قراءة ثابتة حتى لا يعاد النسخ من البداية عند كل كتابة
+            source.execute("BEGIN")
+            source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            
+            def on_step(status, remaining, total):
+                if progress:
+                    progress('copy', total - remaining, total)
+            
+            source.backup(target, pages=self.PAGES_PER_STEP, progress=on_step)
+            # النسخة مستقلة عن ملفات WAL
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            target.close()
+            source.rollback()
+            source.close()
+    
+    def backup(self, backup_path, progress=None, manifest=True):
+        """نسخة كاملة (مضغوطة إذا كان الامتداد .gz أو .zst)"""
+        compression = self.compression_for(backup_path)
+        snapshot_path = backup_path if compression is None else self._temp_path(backup_path)
+        
+        try:
+            if compression is None and os.path.exists(backup_path):
+                self._remove(backup_path)
+            self.snapshot(snapshot_path, progress)
+            
+            if manifest:
+                self._write_manifest(backup_path, self._page_hashes(snapshot_path))
+            
+            if compression is not None:
+                total = os.path.getsize(snapshot_path)
+                with open(snapshot_path, 'rb') as source, self._open_writer(backup_path, compression) as target:
+                    self._copy_stream(source, target, total, progress, 'compress')
+        finally:
+            if snapshot_path != backup_path:
+                self._remove(snapshot_path)
+    
+    def backup_differential(self, base_path, backup_path, progress=None):
+        """نسخة تفاضلية: الصفحات التي تغيرت منذ النسخة الكاملة base_path فقط"""
+        base_manifest = self._read_manifest(base_path)
+        snapshot_path = self._temp_path(backup_path)
+        
+        try:
+            self.snapshot(snapshot_path, progress)
+            page_size, hashes = self._page_hashes(snapshot_path)
+            
+            if page_size != base_manifest['page_size']:
+                raise ValueError("حجم الصفحة مختلف عن النسخة الأساسية، يلزم إنشاء نسخة كاملة")
+            
+            base_hashes = base_manifest['hashes']
+            changed = [
+                page_number for page_number, page_hash in enumerate(hashes)
+                if page_number >= len(base_hashes) or base_hashes[page_number] != page_hash
+            ]
+            
+            header = json.dumps({
+                'base': os.path.basename(base_path),
+                'base_digest': base_manifest['digest'],
+                'page_size': page_size,
+                'page_count': len(hashes),
+            }).encode('utf-8')
+            
+            compression = self.compression_for(backup_path) or 'gzip'
+            with open(snapshot_path, 'rb') as source, self._open_writer(backup_path, compression) as target:
+                target.write(self.DIFF_MAGIC)
+                target.write(struct.pack('>I', len(header)))
+                target.write(header)
+                for done, page_number in enumerate(changed, 1):
+                    source.seek(page_number * page_size)
+                    target.write(struct.pack('>I', page_number))
+                    target.write(source.read(page_size))
+                    if progress:
+                        progress('compress', done, len(changed))
+            
+            return len(changed)
+        finally:
+            self._remove(snapshot_path)
+    
+    # بصمات الصفحات
+    def _page_hashes(self, db_path):
+        """بصمة كل صفحة في ملف قاعدة البيانات"""
+        connection = sqlite3.connect(db_path)
+        try:
+            page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        finally:
+            connection.close()
+        
+        hashes = []
+        with open(db_path, 'rb') as f:
+            while True:
+                page = f.read(page_size)
+                if not page:
+                    break
+                hashes.append(hashlib.blake2b(page, digest_size=16).hexdigest())
+        return page_size, hashes
+    
+    @staticmethod
+    def _digest(hashes):
+        """بصمة واحدة لكل صفحات النسخة"""
+        return hashlib.blake2b(''.join(hashes).encode('ascii'), digest_size=16).hexdigest()
+    
+    def _write_manifest(self, backup_path, page_hashes):
+        """حفظ بصمات الصفحات بجانب النسخة الكاملة"""
+        page_size, hashes = page_hashes
+        digest = self._digest(hashes)
+        with open(backup_path + self.MANIFEST_SUFFIX, 'w', encoding='utf-8') as f:
+            json.dump({'page_size': page_size, 'digest': digest, 'hashes': hashes}, f)
+    
+    def _read_manifest(self, backup_path):
+        """قراءة بصمات الصفحات لنسخة كاملة"""
+        manifest_path = backup_path + self.MANIFEST_SUFFIX
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"لا يوجد ملف بصمات للنسخة الأساسية: {manifest_path}")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    # الاستعادة
+    def materialize(self, backup_path, target_path, base_path=None, progress=None):
+        """تحويل أي نسخة (عادية/مضغوطة/تفاضلية) إلى ملف SQLite عادي"""
+        with self._open_reader(backup_path) as source:
+            magic = self._read_exact(source, len(self.DIFF_MAGIC))
+            
+            if magic != self.DIFF_MAGIC:
+                with open(target_path, 'wb') as target:
+                    target.write(magic)
+                    self._copy_stream(source, target, progress=progress, stage='extract')
+                return
+            
+            header_length = struct.unpack('>I', self._read_exact(source, 4))[0]
+            header = json.loads(self._read_exact(source, header_length).decode('utf-8'))
+            
+            base_path = base_path or os.path.join(os.path.dirname(os.path.abspath(backup_path)), header['base'])
+            self.materialize(base_path, target_path, progress=progress)
+            
+            # التأكد أن النسخة الأساسية هي نفسها التي أُخذت منها الفروق (قد تُحفظ نسخة أحدث بنفس الاسم)
+            page_size = header['page_size']
+            base_page_size, base_hashes = self._page_hashes(target_path)
+            if base_page_size != page_size or self._digest(base_hashes) != header['base_digest']:
+                raise ValueError(
+                    f"النسخة الأساسية {os.path.basename(base_path)} ليست النسخة التي أُنشئت منها "
+                    f"النسخة التفاضلية {os.path.basename(backup_path)}"
+                )
+            
+            with open(target_path, 'r+b') as target:
+                while True:
+                    record = self._read_exact(source, 4)
+                    if len(record) < 4:
+                        break
+                    page_number = struct.unpack('>I', record)[0]
+                    target.seek(page_number * page_size)
+                    target.write(self._read_exact(source, page_size))
+                target.truncate(header['page_count'] * page_size)
+    
+    def restore(self, backup_path, base_path=None, progress=None):
+        """استعادة نسخة إلى قاعدة البيانات الحية باستخدام backup API
+        
+        الاتصالات المفتوحة تبقى صالحة وترى البيانات المستعادة مباشرة.
+        """
+        restored_path = self._temp_path(self.db_manager.db_path)
+        try:
+            self.materialize(backup_path, restored_path, base_path, progress)
+            
+            source = sqlite3.connect(restored_path)
+            target = self.db_manager._open_connection()
+            try:
+                if source.execute("PRAGMA integrity_check").fetchone()[0] != 'ok':
+                    raise sqlite3.DatabaseError("ملف النسخة الاحتياطية تالف")
+                
+                def on_step(status, remaining, total):
+                    if progress:
+                        progress('restore', total - remaining, total)
+                
+                target.execute("PRAGMA busy_timeout = 30000")
+                source.backup(target, pages=self.PAGES_PER_STEP, progress=on_step)
+                target.execute("PRAGMA journal_mode = WAL")
+            finally:
+                source.close()
+                target.close()
+        finally:
+            self._remove(restored_path)
+        
+        self.db_manager.write_version += 1
+        self.db_manager.statistics.invalidate()
+        self.db_manager.notify_write()
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+توليد بيانات تجريبية وقياس أداء استعلامات الواجهة
+Synthetic Data Generator and Query Benchmark
+
+الاستخدام:
+    python benchmark.py --db benchmark.db --incoming 100000 --outgoing 100000 \\
+        --follow-ups 200000 --activity 500000 --output report.json --baseline old_report.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from database import DatabaseManager
+from activity_log import ActivityLogWriter
+
+class SyntheticDataGenerator:
+    """إضافة مراسلات ومتابعات وسجل نشاطات بنصوص عربية واقعية
+    
+    الإضافة على دفعات (كل دفعة في معاملة واحدة) عبر نفس المشغلات التي تعمل
+    في البرنامج، فيتم تحديث فهرس البحث والتجميع الشهري وعدادات المتابعات
+    كما لو أُدخلت البيانات من النماذج.
+    """
+    
+    REQUESTS = ('طلب', 'بخصوص', 'استفسار عن', 'موافقة على', 'تأشيرة على', 'متابعة', 'إفادة بشأن', 'اعتماد')
+    TOPICS = (
+        'مستخلص أعمال', 'تعديل مسمى وظيفي', 'صرف مستحقات', 'توريد مواد', 'أعمال الصيانة',
+        'عقد التوريد', 'تقرير الاستشاري', 'خطة التنفيذ', 'تسليم الموقع', 'محضر الاستلام',
+        'الرسومات التنفيذية', 'أوامر التغيير', 'الإجازات السنوية', 'تجديد الترخيص', 'شكوى مقاول',
+    )
+    PROJECTS = (
+        'مشروع الإسكان الاجتماعي', 'محطة معالجة المياه', 'الطريق الدائري', 'المبنى الإداري',
+        'مستشفى المدينة', 'المنطقة الصناعية', 'شبكة الصرف الصحي', 'مدرسة التجمع الخامس',
+    )
+    NAMES = (
+        'احمد العصار', 'امجد علي', 'ندى القصير', 'محمد السيد', 'سارة عبد الله', 'محمود حسن',
+        'هبة مصطفى', 'خالد ابراهيم', 'منى فؤاد', 'عمرو عبد الرحمن', 'ياسمين طارق', 'حسام الدين',
+    )
+    DEPARTMENTS = (
+        'رئيس مجلس الادارة', 'ادارة الدعم الفني', 'الادارة الهندسية', 'الشئون القانونية',
+        'الشئون المالية', 'ادارة المشتريات', 'الموارد البشرية', 'وزارة الاسكان',
+    )
+    ACTIONS = (
+        'الرد على الخطاب', 'إرسال الموافقة', 'مراجعة المستندات', 'تحديد موعد اجتماع',
+        'استكمال البيانات', 'رفع تقرير للإدارة', 'التنسيق مع الاستشاري', 'إعداد مذكرة',
+    )
+    NOTES = (None, None, 'عاجل للعرض', 'مرفق صورة', 'تم التواصل تليفونياً', 'في انتظار الرد')
+    
+    # بادئات أكواد الموضوعات (بنفس صيغة الأكواد المستخدمة في النماذج)
+    CODE_PREFIXES = ('CHR', 'GNL', 'FIN', 'TEC', 'HR')
+    
+    INCOMING_STATUSES = ('جديد', 'قيد المراجعة', 'تم الرد', 'مؤرشف')
+    OUTGOING_STATUSES = ('مسودة', 'تم الإرسال', 'تم الاستلام', 'مؤرشف')
+    FOLLOW_UP_STATUSES = ('معلق', 'جاري', 'مغلق')
+    PRIORITIES = ('عادي', 'عادي', 'عادي', 'مهم', 'عاجل')
+    
+    def __init__(self, db_manager, seed=2025, chunk_size=5000, years=3):
+        self.db_manager = db_manager
+        self.random = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.days = years * 365
+        self.today = date.today()
+    
+    def count(self, table):
+        """عدد الصفوف الحالي في جدول"""
+        return self.db_manager.execute_query(f"SELECT COUNT(*) as count FROM {table}")[0]['count']
+    
+    def generate(self, incoming=0, outgoing=0, follow_ups=0, activity=0):
+        """إضافة الصفوف الناقصة حتى يصل كل جدول إلى العدد المطلوب"""
+        targets = (
+            ('incoming_correspondence', incoming, self._incoming_rows),
+            ('outgoing_correspondence', outgoing, self._outgoing_rows),
+            ('follow_up', follow_ups, self._follow_up_rows),
+            ('activity_log', activity, self._activity_rows),
+        )
+        added = {}
+        for table, target, make_rows in targets:
+            missing = target - self.count(table)
+            added[table] = max(missing, 0)
+            if missing <= 0:
+                continue
+            
+            started = time.perf_counter()
+            offset = self._max_id(table)
+            done = 0
+            while done < missing:
+                size = min(self.chunk_size, missing - done)
+                query, rows = make_rows(offset + done, size)
+                with self.db_manager.transaction(tables=(table,)) as cursor:
+                    cursor.executemany(query, rows)
+                done += size
+                print(f"\r{table}: {done}/{missing}", end='', flush=True)
+            print(f"\r{table}: تمت إضافة {missing} صف في {time.perf_counter() - started:.1f} ثانية")
+        
+        # سجل التغييرات لا يحتاج تغييرات التوليد (الواجهة تعيد التحميل بالكامل عند البدء)
+        self.db_manager.change_feed.prune()
+        return added
+    
+    # توليد الصفوف
+    def _max_id(self, table):
+        return self.db_manager.execute_query(f"SELECT MAX(id) as id FROM {table}")[0]['id'] or 0
+    
+    def _date(self):
+        return (self.today - timedelta(days=self.random.randint(0, self.days))).isoformat()
+    
+    def _subject(self):
+        r = self.random
+        return f"{r.choice(self.REQUESTS)} {r.choice(self.TOPICS)} - {r.choice(self.PROJECTS)}"
+    
+    def _engineer(self):
+        return f"{self.random.choice(('مهندس', 'مهندسة'))} {self.random.choice(self.NAMES)}"
+    
+    def _incoming_rows(self, offset, size):
+        r = self.random
+        query = '''
+            INSERT INTO incoming_correspondence
+                (reference_number, subject_code, subject, sender, sender_department, responsible_person,
+                 received_date, priority, status, content, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        rows = []
+        for number in range(offset + 1, offset + size + 1):
+            subject = self._subject()
+            rows.append((
+                f"BENCH-IN-{number}", f"IN-{r.choice(self.CODE_PREFIXES)}-{number}", subject,
+                self._engineer(), r.choice(self.DEPARTMENTS), self._engineer(),
+                self._date(), r.choice(self.PRIORITIES), r.choice(self.INCOMING_STATUSES),
+                f"نص الخطاب الوارد بخصوص {subject}", r.choice(self.NOTES),
+            ))
+        return query, rows
+    
+    def _outgoing_rows(self, offset, size):
+        r = self.random
+        max_incoming = self._max_id('incoming_correspondence')
+        query = '''
+            INSERT INTO outgoing_correspondence
+                (reference_number, subject_code, subject, recipient, recipient_department, recipient_engineer,
+                 responsible_engineer, sent_date, priority, status, content, notes, related_incoming_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        rows = []
+        for number in range(offset + 1, offset + size + 1):
+            subject = self._subject()
+            # أغلب الصادر رد على وارد
+            related = r.randint(1, max_incoming) if max_incoming and r.random() < 0.6 else None
+            rows.append((
+                f"BENCH-OUT-{number}", f"OUT-{r.choice(self.CODE_PREFIXES)}-{number}", subject,
+                r.choice(self.DEPARTMENTS), r.choice(self.DEPARTMENTS), self._engineer(),
+                self._engineer(), self._date(), r.choice(self.PRIORITIES), r.choice(self.OUTGOING_STATUSES),
+                f"نص الخطاب الصادر بخصوص {subject}", r.choice(self.NOTES), related,
+            ))
+        return query, rows
+    
+    def _follow_up_rows(self, offset, size):
+        r = self.random
+        parents = {kind: self._max_id(table) for kind, table in DatabaseManager.FOLLOW_UP_PARENTS.items()}
+        kinds = [kind for kind, max_id in parents.items() if max_id]
+        if not kinds:
+            raise ValueError("لا توجد مراسلات لإضافة متابعات عليها")
+        
+        query = '''
+            INSERT INTO follow_up
+                (follow_up_code, correspondence_type, correspondence_id, follow_up_date,
+                 action_required, responsible_person, status, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        rows = []
+        for number in range(offset + 1, offset + size + 1):
+            kind = r.choice(kinds)
+            rows.append((
+                f"FU-{number}", kind, r.randint(1, parents[kind]), self._date(),
+                f"{r.choice(self.ACTIONS)} - {r.choice(self.TOPICS)}", self._engineer(),
+                r.choice(self.FOLLOW_UP_STATUSES), r.choice(self.NOTES),
+            ))
+        return query, rows
+    
+    def _activity_rows(self, offset, size):
+        r = self.random
+        users = [row['id'] for row in self.db_manager.execute_query("SELECT id FROM users")] or [None]
+        templates = (
+            ('إضافة مراسلة واردة جديدة: BENCH-IN-{n}', 'incoming_correspondence'),
+            ('تعديل مراسلة واردة: BENCH-IN-{n}', 'incoming_correspondence'),
+            ('إضافة مراسلة صادرة جديدة: BENCH-OUT-{n}', 'outgoing_correspondence'),
+            ('إضافة متابعة جديدة: FU-{n}', 'follow_up'),
+            ('تحديث حالة المتابعة: FU-{n}', 'follow_up'),
+            ('حذف متابعة: FU-{n}', 'follow_up'),
+            ('تسجيل دخول', 'users'),
+            ('تسجيل خروج', 'users'),
+        )
+        rows = []
+        now = datetime.now()
+        for number in range(offset + 1, offset + size + 1):
+            template, table = r.choice(templates)
+            record_id = r.randint(1, 1000)
+            action = template.format(n=record_id)
+            timestamp = now - timedelta(seconds=r.randint(0, self.days * 86400))
+            rows.append((
+                r.choice(users), action, ActivityLogWriter.classify_action(action), table,
+                record_id, None, None, timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            ))
+        return ActivityLogWriter.INSERT_QUERY, rows
+
+class QueryBenchmark:
+    """قياس زمن نفس الاستعلامات التي تنفذها الواجهة
+    
+    كل سيناريو يُنفذ repeat مرة بعد تنفيذ تمهيدي واحد، والنتيجة هي الوسيط
+    و p95 وأقل زمن بالمللي ثانية مع عدد الصفوف المعادة.
+    """
+    
+    def __init__(self, db_manager, repeat=5):
+        self.db_manager = db_manager
+        self.repeat = repeat
+    
+    def scenarios(self):
+        """(الاسم, الاستعلام, التجهيز قبل كل تنفيذ) لكل سيناريو"""
+        db = self.db_manager
+        statistics = db.statistics
+        
+        # كلمات بحث من البيانات الموجودة: كلمة شائعة ورقم مرجع محدد
+        common_word = 'مستخلص'
+        latest = db.execute_query("SELECT subject_code FROM incoming_correspondence ORDER BY id DESC LIMIT 1")
+        reference = latest[0]['subject_code'] if latest and latest[0]['subject_code'] else 'IN'
+        
+        # الصفحة الثانية (التمرير لأسفل في الجدول)
+        _, incoming_next = db.get_incoming_page(None)
+        
+        # فترة الرسم البياني الشهري (آخر 12 شهر) وتقرير الشهر الحالي
+        months = statistics.last_months(12)
+        window_start = statistics.period_range(months[0])[0]
+        window_end = statistics.period_range(months[-1])[1]
+        month_start, month_end = statistics.month_range()
+        
+        cold = statistics.invalidate
+        return (
+            # IncomingTab.refresh_data / load_more / on_search_change
+            ('incoming.refresh_data', lambda: db.get_incoming_page(None), None),
+            ('incoming.load_more', lambda: db.get_incoming_page(None, after=incoming_next), None),
+            ('incoming.search_common', lambda: db.get_incoming_page(common_word), None),
+            ('incoming.search_reference', lambda: db.get_incoming_page(reference), None),
+            # OutgoingTab
+            ('outgoing.refresh_data', lambda: db.get_outgoing_page(None), None),
+            ('outgoing.search_common', lambda: db.get_outgoing_page(common_word), None),
+            # FollowUpTab.apply_filters
+            ('followup.apply_filters', lambda: db.get_follow_up_page(), None),
+            ('followup.filter_status', lambda: db.get_follow_up_page('معلق'), None),
+            ('followup.filter_status_type', lambda: db.get_follow_up_page('جاري', 'incoming'), None),
+            ('followup.search', lambda: db.get_follow_up_page(None, None, common_word), None),
+            # get_statistics بدون ومع التخزين المؤقت
+            ('statistics.get_statistics', db.get_statistics, cold),
+            ('statistics.get_statistics_cached', db.get_statistics, None),
+            # ReportsTab: الرسم الشهري وتقرير الشهر وبطاقات الحالة والأولوية
+            ('reports.monthly_chart', lambda: db.get_time_series(window_start, window_end, 'month'), None),
+            ('reports.monthly_report', lambda: db.get_time_series(month_start, month_end, 'month'), None),
+            ('reports.status_chart', statistics.snapshot, cold),
+            # سجل النشاطات والتنبيهات وقوائم الاختيار في النماذج
+            ('activity.refresh_data', lambda: db.get_activity_page(), None),
+            ('notifications.overdue', db.get_overdue_items, None),
+            ('lookups.search_correspondence',
+             lambda: db.lookups.search_correspondence('incoming', reference[:6]), db.lookups.invalidate),
+        )
+    
+    @staticmethod
+    def _row_count(result):
+        if isinstance(result, tuple):
+            result = result[0]
+        return len(result) if isinstance(result, (list, dict)) else None
+    
+    def measure(self, query, setup=None):
+        """زمن تنفيذ سيناريو واحد"""
+        if setup:
+            setup()
+        result = query()
+        
+        timings = []
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started) * 1000)
+        
+        timings.sort()
+        return {
+            'median_ms': round(timings[len(timings) // 2], 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'min_ms': round(timings[0], 3),
+            'rows': self._row_count(result),
+        }
+    
+    def run(self):
+        results = {}
+        for name, query, setup in self.scenarios():
+            results[name] = self.measure(query, setup)
+            print(f"{name:<36}{results[name]['median_ms']:>12.2f} ms")
+        return results
+
+def git_revision():
+    """رقم الإصدار الحالي في git (أو None)"""
+    try:
+        output = subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=10
+        )
+        return output.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def build_report(db_manager, results, repeat):
+    """تقرير JSON قابل للمقارنة بين الإصدارات"""
+    tables = ('incoming_correspondence', 'outgoing_correspondence', 'follow_up', 'activity_log')
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'database': os.path.abspath(db_manager.db_path),
+        'database_size_mb': round(os.path.getsize(db_manager.db_path) / (1024 * 1024), 1),
+        'rows': {
+            table: db_manager.execute_query(f"SELECT COUNT(*) as count FROM {table}")[0]['count']
+            for table in tables
+        },
+        'repeat': repeat,
+        'results': results,
+    }
+
+def compare_reports(report, baseline, threshold=0.2, min_delta_ms=1.0):
+    """مقارنة الوسيط لكل سيناريو بتقرير سابق
+    
+    التراجع = زيادة أكبر من threshold (نسبة) وأكبر من min_delta_ms معاً،
+    حتى لا تُعتبر فروق الاستعلامات السريعة جداً تراجعاً.
+    """
+    comparison = []
+    for name, result in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            comparison.append((name, None, result['median_ms'], None, False))
+            continue
+        old, new = previous['median_ms'], result['median_ms']
+        change = (new - old) / old if old else 0.0
+        regression = change > threshold and new - old > min_delta_ms
+        comparison.append((name, old, new, change, regression))
+    return comparison
+
+def main():
+    parser = argparse.ArgumentParser(description="توليد بيانات تجريبية وقياس أداء استعلامات الواجهة")
+    parser.add_argument('--db', default='benchmark.db', help="ملف قاعدة البيانات (يُنشأ إن لم يكن موجوداً)")
+    parser.add_argument('--reseed', action='store_true', help="حذف الملف وإعادة التوليد من البداية")
+    parser.add_argument('--incoming', type=int, default=10000, help="عدد المراسلات الواردة")
+    parser.add_argument('--outgoing', type=int, default=10000, help="عدد المراسلات الصادرة")
+    parser.add_argument('--follow-ups', type=int, default=20000, help="عدد المتابعات")
+    parser.add_argument('--activity', type=int, default=50000, help="عدد إدخالات سجل النشاطات")
+    parser.add_argument('--seed', type=int, default=2025, help="بذرة التوليد العشوائي")
+    parser.add_argument('--repeat', type=int, default=5, help="عدد مرات تنفيذ كل سيناريو")
+    parser.add_argument('--output', help="حفظ التقرير في ملف JSON")
+    parser.add_argument('--baseline', help="تقرير سابق للمقارنة")
+    parser.add_argument('--threshold', type=float, default=0.2, help="نسبة الزيادة التي تعتبر تراجعاً (0.2 = 20%%)")
+    args = parser.parse_args()
+    
+    if os.path.abspath(args.db) == os.path.abspath(os.path.join(os.path.dirname(__file__), 'correspondence.db')):
+        print("تحذير: سيتم إضافة بيانات تجريبية إلى قاعدة البيانات الأساسية")
+    
+    if args.reseed:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    
+    db_manager = DatabaseManager(args.db)
+    try:
+        SyntheticDataGenerator(db_manager, seed=args.seed).generate(
+            incoming=args.incoming, outgoing=args.outgoing,
+            follow_ups=args.follow_ups, activity=args.activity
+        )
+        
+        print(f"\n{'السيناريو':<36}{'الوسيط':>15}")
+        results = QueryBenchmark(db_manager, repeat=args.repeat).run()
+        report = build_report(db_manager, results, args.repeat)
+    finally:
+        db_manager.close()
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nتم حفظ التقرير: {args.output}")
+    
+    if not args.baseline:
+        return 0
+    
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nالمقارنة مع {args.baseline} ({baseline.get('revision') or '-'}):")
+    regressions = 0
+    for name, old, new, change, regression in compare_reports(report, baseline, args.threshold):
+        if old is None:
+            print(f"{name:<36}{'-':>10}{new:>10.2f}{'جديد':>10}")
+            continue
+        regressions += regression
+        print(f"{name:<36}{old:>10.2f}{new:>10.2f}{change:>+10.0%}{'  << تراجع' if regression else ''}")
+    
+    if regressions:
+        print(f"\n{regressions} سيناريو أبطأ من التقرير السابق بأكثر من {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة الاستيراد والتصدير الجماعي
+Bulk Import/Export Module
+"""
+
+import csv
+import json
+import os
+import re
+from datetime import datetime
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+class BulkIO:
+    """استيراد وتصدير المراسلات على دفعات (CSV / JSON / JSON Lines / Excel)
+    
+    - الاستيراد يقرأ الملف سجلاً بسجل ويكتب كل دفعة بـ executemany في معاملة مستقلة،
+      مع التحقق من القيود (الحقول المطلوبة، الأولوية، الحالة، التاريخ) وتجاهل
+      أرقام المراسلات المكررة.
+    - التصدير يمر على صفحات جدول العرض (بنفس الفلاتر) ويكتب كل صفحة مباشرة للملف.
+    الذاكرة المستخدمة ثابتة مهما كان حجم الملف.
+    """
+    
+    CHUNK_SIZE = 500
+    MAX_ERRORS = 200
+    
+    # الحقول القابلة للاستيراد لكل نوع مراسلة
+    SPECS = {
+        'incoming': {
+            'table': 'incoming_correspondence',
+            'columns': (
+                'reference_number', 'subject_code', 'subject', 'sender', 'sender_department',
+                'responsible_person', 'received_date', 'priority', 'status', 'content', 'notes'
+            ),
+            'required': ('reference_number', 'subject', 'sender', 'received_date'),
+            'date': 'received_date',
+            'statuses': ('جديد', 'قيد المراجعة', 'تم الرد', 'مؤرشف'),
+            'default_status': 'جديد',
+            'label': 'مراسلة واردة',
+        },
+        'outgoing': {
+            'table': 'outgoing_correspondence',
+            'columns': (
+                'reference_number', 'subject_code', 'subject', 'recipient', 'recipient_department',
+                'recipient_engineer', 'responsible_engineer', 'sent_date', 'priority', 'status',
+                'content', 'notes'
+            ),
+            'required': ('reference_number', 'subject', 'recipient', 'sent_date'),
+            'date': 'sent_date',
+            'statuses': ('مسودة', 'تم الإرسال', 'تم الاستلام', 'مؤرشف'),
+            'default_status': 'مسودة',
+            'label': 'مراسلة صادرة',
+        },
+    }
+    
+    PRIORITIES = ('عاجل', 'مهم', 'عادي')
+    DEFAULT_PRIORITY = 'عادي'
+    
+    # العناوين العربية للأعمدة (تُستخدم في التصدير وتُقبل في الاستيراد)
+    FIELD_LABELS = {
+        'id': 'الرقم',
+        'reference_number': 'رقم المراسلة',
+        'subject_code': 'كود الموضوع',
+        'subject': 'الموضوع',
+        'sender': 'المرسل',
+        'sender_department': 'الجهة',
+        'recipient': 'المرسل إليه',
+        'recipient_department': 'جهة المرسل إليه',
+        'recipient_engineer': 'المهندس المرسل إليه',
+        'responsible_engineer': 'المهندس المسئول',
+        'responsible_person': 'المسئول',
+        'received_date': 'تاريخ الاستلام',
+        'sent_date': 'تاريخ الإرسال',
+        'priority': 'الأولوية',
+        'status': 'الحالة',
+        'content': 'المحتوى',
+        'notes': 'ملاحظات',
+        'related_ref': 'المراسلة المرتبطة',
+        'follow_up_code': 'كود المتابعة',
+        'correspondence_type': 'نوع المراسلة',
+        'correspondence_ref': 'رقم المراسلة المرتبطة',
+        'follow_up_date': 'تاريخ المتابعة',
+        'action_required': 'الإجراء المطلوب',
+    }
+    
+    # أعمدة داخلية لا تُصدر
+    EXPORT_SKIP = ('relevance',)
+    
+    DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d', '%d-%m-%Y')
+    
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._aliases = {label: key for key, label in self.FIELD_LABELS.items()}
+    
+    @staticmethod
+    def file_format(path):
+        """تحديد صيغة الملف من امتداده"""
+        extension = os.path.splitext(path)[1].lower()
+        formats = {'.csv': 'csv', '.json': 'json', '.jsonl': 'jsonl', '.xlsx': 'xlsx'}
+        if extension not in formats:
+            raise ValueError(f"صيغة ملف غير مدعومة: {extension}")
+        if formats[extension] == 'xlsx' and openpyxl is None:
+            raise RuntimeError("مكتبة openpyxl غير مثبتة")
+        return formats[extension]
+    
+    # قراءة الملفات
+    def _read_csv(self, path):
+        with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+            for record in csv.DictReader(f):
+                yield record
+    
+    def _read_jsonl(self, path):
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    
+    def _read_json(self, path):
+        """قراءة مصفوفة JSON عنصراً بعنصر بدون تحميل الملف كاملاً"""
+        decoder = json.JSONDecoder()
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            buffer = ''
+            started = False
+            eof = False
+            while True:
+                buffer = buffer.lstrip()
+                if not started:
+                    if not buffer and not eof:
+                        chunk = f.read(65536)
+                        eof = not chunk
+                        buffer += chunk
+                        continue
+                    if not buffer.startswith('['):
+                        raise ValueError("ملف JSON يجب أن يحتوي على مصفوفة سجلات")
+                    buffer = buffer[1:]
+                    started = True
+                    continue
+                
+                buffer = buffer.lstrip(', \r\n\t')
+                if buffer.startswith(']'):
+                    return
+                try:
+                    record, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    if eof:
+                        raise
+                    chunk = f.read(65536)
+                    eof = not chunk
+                    buffer += chunk
+                    continue
+                buffer = buffer[end:]
+                yield record
+    
+    def _read_xlsx(self, path):
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            header = [str(cell) if cell is not None else '' for cell in header]
+            for values in rows:
+                if values and any(value is not None for value in values):
+                    yield dict(zip(header, values))
+        finally:
+            workbook.close()
+    
+    def read_records(self, path):
+        """قراءة سجلات الملف واحداً تلو الآخر"""
+        readers = {
+            'csv': self._read_csv,
+            'json': self._read_json,
+            'jsonl': self._read_jsonl,
+            'xlsx': self._read_xlsx,
+        }
+        return readers[self.file_format(path)](path)
+    
+    # التحقق
+    def _normalize_date(self, value):
+        """تحويل التاريخ إلى صيغة YYYY-MM-DD"""
+        if hasattr(value, 'strftime'):
+            return value.strftime('%Y-%m-%d')
+        text = str(value).strip()
+        if len(text) > 10 and text[10] in ' T':
+            # تاريخ مع وقت
+            text = text[:10]
+        for date_format in self.DATE_FORMATS:
+            try:
+                return datetime.strptime(text, date_format).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+        raise ValueError(f"تاريخ غير صالح: {value}")
+    
+    def validate(self, kind, record):
+        """التحقق من سجل وتحويله إلى قيم الأعمدة (يرفع ValueError عند الخطأ)"""
+        spec = self.SPECS[kind]
+        
+        values = {}
+        for key, value in record.items():
+            column = self._aliases.get(str(key).strip(), str(key).strip())
+            if column in spec['columns']:
+                if isinstance(value, str):
+                    value = value.strip()
+                values[column] = None if value in ('', None) else value
+        
+        for column in spec['required']:
+            if values.get(column) is None:
+                raise ValueError(f"الحقل مطلوب: {self.FIELD_LABELS.get(column, column)}")
+        
+        values['reference_number'] = str(values['reference_number'])
+        values[spec['date']] = self._normalize_date(values[spec['date']])
+        
+        priority = values.get('priority') or self.DEFAULT_PRIORITY
+        if priority not in self.PRIORITIES:
+            raise ValueError(f"أولوية غير صالحة: {priority}")
+        values['priority'] = priority
+        
+        status = values.get('status') or spec['default_status']
+        if status not in spec['statuses']:
+            raise ValueError(f"حالة غير صالحة: {status}")
+        values['status'] = status
+        
+        return tuple(values.get(column) for column in spec['columns'])
+    
+    # الاستيراد
+    def import_file(self, kind, path, user_id=None, progress=None):
+        """استيراد ملف مراسلات
+        
+        يعيد قاموساً: total, inserted, duplicates, rejected,
+        errors [(رقم السجل, الرسالة)] لأول MAX_ERRORS سجل مرفوض
+        """
+        spec = self.SPECS[kind]
+        columns = spec['columns'] + ('created_by',)
+        insert_query = f'''
+            INSERT INTO {spec['table']} ({', '.join(columns)})
+            VALUES ({', '.join('?' for _ in columns)})
+            ON CONFLICT (reference_number) DO NOTHING
+        '''
+        
+        result = {'total': 0, 'inserted': 0, 'duplicates': 0, 'rejected': 0, 'errors': []}
+        chunk = []
+        # أرقام الدفعة الحالية فقط؛ التكرار مع الدفعات السابقة يُكتشف من قاعدة البيانات
+        chunk_references = set()
+        
+        def write_chunk():
+            inserted = self._write_chunk(kind, insert_query, chunk, user_id)
+            result['inserted'] += inserted
+            result['duplicates'] += len(chunk) - inserted
+            chunk.clear()
+            chunk_references.clear()
+            if progress:
+                progress(result['total'])
+        
+        for number, record in enumerate(self.read_records(path), 1):
+            result['total'] = number
+            try:
+                row = self.validate(kind, record)
+            except (ValueError, TypeError, AttributeError) as e:
+                result['rejected'] += 1
+                if len(result['errors']) < self.MAX_ERRORS:
+                    result['errors'].append((number, str(e)))
+                continue
+            
+            # تكرار داخل نفس الدفعة
+            if row[0] in chunk_references:
+                result['duplicates'] += 1
+                continue
+            chunk_references.add(row[0])
+            
+            chunk.append(row)
+            if len(chunk) >= self.CHUNK_SIZE:
+                write_chunk()
+        
+        if chunk:
+            write_chunk()
+        
+        if result['inserted']:
+            self.db_manager.log_activity(
+                user_id, f"استيراد {result['inserted']} {spec['label']}", spec['table'],
+                new_values=os.path.basename(path)
+            )
+        return result
+    
+    def _write_chunk(self, kind, insert_query, chunk, user_id):
+        """كتابة دفعة في معاملة واحدة وتحديث التسلسلات (يعيد عدد السجلات المضافة)"""
+        spec = self.SPECS[kind]
+        sequences = self.db_manager.sequences
+        
+        with self.db_manager.transaction(tables=(spec['table'], 'sequences')) as cursor:
+            # استبعاد الأرقام الموجودة مسبقاً (الفهرس الفريد على reference_number)
+            references = [row[0] for row in chunk]
+            cursor.execute(
+                f"SELECT reference_number FROM {spec['table']} "
+                f"WHERE reference_number IN ({', '.join('?' for _ in references)})",
+                references
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            rows = [row + (user_id,) for row in chunk if row[0] not in existing]
+            if not rows:
+                return 0
+            
+            cursor.executemany(insert_query, rows)
+            
+            # حتى لا تعيد الأرقام التلقائية رقماً مستورداً
+            numbers = [int(row[0]) for row in rows if row[0].isdigit()]
+            if numbers:
+                sequences.advance_to(kind, max(numbers), cursor)
+            
+            # أكواد موضوعات الصادرة بنفس صيغة النموذج (OUT-CHR12)
+            subject_numbers = {}
+            if kind == 'outgoing':
+                for row in rows:
+                    match = re.fullmatch(r'([A-Z]{1,3})-([A-Z]{0,3})(\d+)', row[1] or '')
+                    if match:
+                        series = sequences.subject_series(match.group(1), match.group(2))
+                        subject_numbers[series] = max(subject_numbers.get(series, 0), int(match.group(3)))
+            for series, value in subject_numbers.items():
+                sequences.advance_to(series, value, cursor)
+        
+        return len(rows)
+    
+    # التصدير
+    def export_pages(self, fetch_page, path, progress=None):
+        """تصدير جميع صفحات جدول عرض إلى ملف
+        
+        fetch_page: نفس دالة جلب الصفحات المستخدمة في الجدول (بنفس الفلاتر)
+        يعيد عدد السجلات المصدرة.
+        """
+        file_format = self.file_format(path)
+        temp_path = path + '.tmp'
+        exported = 0
+        
+        writer = None
+        try:
+            after = None
+            while True:
+                rows, after = fetch_page(after)
+                for row in rows:
+                    if writer is None:
+                        columns = [key for key in row.keys() if key not in self.EXPORT_SKIP]
+                        writer = self._open_export(file_format, temp_path, columns)
+                    writer.write([row[column] for column in writer.columns])
+                    exported += 1
+                if progress:
+                    progress(exported)
+                if after is None:
+                    break
+            
+            if writer is None:
+                writer = self._open_export(file_format, temp_path, [])
+            writer.close()
+            writer = None
+            os.replace(temp_path, path)
+        finally:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        return exported
+    
+    def _open_export(self, file_format, path, columns):
+        writers = {
+            'csv': _CsvExport,
+            'json': _JsonExport,
+            'jsonl': _JsonLinesExport,
+            'xlsx': _XlsxExport,
+        }
+        headers = [self.FIELD_LABELS.get(column, column) for column in columns]
+        return writers[file_format](path, columns, headers)
+
+
+class _CsvExport:
+    """كتابة CSV (مع BOM حتى يفتحه Excel بالعربية)"""
+    
+    def __init__(self, path, columns, headers):
+        self.columns = columns
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(headers)
+    
+    def write(self, values):
+        self.writer.writerow(values)
+    
+    def close(self):
+        self.file.close()
+
+
+class _JsonLinesExport:
+    """كتابة سجل JSON في كل سطر"""
+    
+    def __init__(self, path, columns, headers):
+        self.columns = columns
+        self.headers = headers
+        self.file = open(path, 'w', encoding='utf-8')
+    
+    def write(self, values):
+        self.file.write(json.dumps(dict(zip(self.headers, values)), ensure_ascii=False))
+        self.file.write('\n')
+    
+    def close(self):
+        self.file.close()
+
+
+class _JsonExport(_JsonLinesExport):
+    """كتابة مصفوفة JSON سجلاً بسجل"""
+    
+    def __init__(self, path, columns, headers):
+        super().__init__(path, columns, headers)
+        self.file.write('[')
+        self.first = True
+    
+    def write(self, values):
+        self.file.write('\n' if self.first else ',\n')
+        self.first = False
+        self.file.write(json.dumps(dict(zip(self.headers, values)), ensure_ascii=False))
+    
+    def close(self):
+        self.file.write('\n]\n')
+        self.file.close()
+
+
+class _XlsxExport:
+    """كتابة Excel في وضع write_only (لا يحتفظ بالصفوف في الذاكرة)"""
+    
+    def __init__(self, path, columns, headers):
+        self.columns = columns
+        self.path = path
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.sheet_view.rightToLeft = True
+        self.sheet.append(headers)
+    
+    def write(self, values):
+        self.sheet.append(values)
+    
+    def close(self):
+        if self.workbook is not None:
+            self.workbook.save(self.path)
+            self.workbook = None
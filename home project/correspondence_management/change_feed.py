@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة سجل التغييرات
+Change Feed Module
+"""
+
+class ChangeFeed:
+    """سجل التغييرات على الجداول المعروضة (تملؤه المشغلات برقم إصدار متزايد)
+    
+    كل إدراج أو تعديل أو حذف في الجداول المراقبة يضيف صفاً في جدول changes،
+    فتستطيع الواجهة (أو نسخة أخرى من البرنامج على نفس الملف) معرفة الصفوف
+    التي تغيرت منذ آخر إصدار رأته وتحديثها فقط بدلاً من إعادة تحميل الجداول.
+    """
+    
+    # الجداول التي لها مشغلات في سجل التغييرات (تُنشأ في migrations.py)
+    TABLES = ('incoming_correspondence', 'outgoing_correspondence', 'follow_up', 'users')
+    
+    # عدد الإصدارات المحفوظة (الأقدم منها يُحذف عند تطبيق سياسة الاحتفاظ)
+    KEEP_VERSIONS = 50000
+    
+    def __init__(self, db_manager, limit=1000):
+        self.db_manager = db_manager
+        # أكثر من هذا العدد من التغييرات يعني إعادة تحميل الجدول بالكامل
+        self.limit = limit
+    
+    def latest_version(self):
+        """آخر إصدار في سجل التغييرات"""
+        rows = self.db_manager.execute_query("SELECT MAX(version) as version FROM changes")
+        return (rows[0]['version'] or 0) if rows else 0
+    
+    def changes_since(self, version, tables=None):
+        """التغييرات بعد إصدار معين
+        
+        يعيد (آخر إصدار, {الجدول: {معرف الصف: آخر عملية}}).
+        قيمة الجدول None تعني أن التغييرات كثيرة (أو أقدم من السجل المحفوظ)
+        ويجب إعادة تحميله بالكامل.
+        """
+        tables = tuple(tables or self.TABLES)
+        placeholders = ', '.join('?' for _ in tables)
+        
+        if version and self._is_stale(version):
+            # السجل لم يعد يحتوي على كل التغييرات منذ هذا الإصدار
+            return self.latest_version(), {table: None for table in tables}
+        
+        rows = self.db_manager.execute_query(f'''
+            SELECT version, table_name, row_id, operation FROM changes
+            WHERE version > ? AND table_name IN ({placeholders})
+            ORDER BY version
+            LIMIT ?
+        ''', (version, *tables, self.limit + 1))
+        
+        if len(rows) > self.limit:
+            changed = self.db_manager.execute_query(
+                f"SELECT DISTINCT table_name FROM changes WHERE version > ? AND table_name IN ({placeholders})",
+                (version, *tables)
+            )
+            return self.latest_version(), {row['table_name']: None for row in changed}
+        
+        changes = {}
+        for row in rows:
+            # العملية الأخيرة لكل صف هي المعتمدة
+            changes.setdefault(row['table_name'], {})[row['row_id']] = row['operation']
+        
+        latest = rows[-1]['version'] if rows else version
+        return max(latest, version), changes
+    
+    def _is_stale(self, version):
+        """هل أصبح الإصدار خارج السجل (حُذفت تغييرات بعده، أو تمت استعادة نسخة أقدم)"""
+        rows = self.db_manager.execute_query(
+            "SELECT (SELECT MIN(version) FROM changes) as oldest, (SELECT MAX(version) FROM changes) as latest"
+        )
+        if not rows or rows[0]['latest'] is None:
+            return True
+        return rows[0]['oldest'] > version + 1 or rows[0]['latest'] < version
+    
+    def prune(self, keep=None):
+        """حذف التغييرات القديمة مع الاحتفاظ بآخر keep إصدار"""
+        keep = keep or self.KEEP_VERSIONS
+        with self.db_manager.transaction(tables=('changes',)) as cursor:
+            cursor.execute(
+                "DELETE FROM changes WHERE version <= (SELECT MAX(version) FROM changes) - ?",
+                (keep,)
+            )
+            return cursor.rowcount
@@ -7,210 +7,303 @@ Database Management Module
 
 import sqlite3
 import os
-from datetime import datetime
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
 import hashlib
 
+from search_index import SearchIndex
+from stats_engine import StatisticsEngine
+from activity_log import ActivityLogWriter
+from backup import BackupEngine
+from retention import RetentionManager
+from sequences import SequenceAllocator
+from bulk_io import BulkIO
+from lookup_cache import LookupCache
+from change_feed import ChangeFeed
+from migrations import SchemaMigrations
+from query_profiler import QueryProfiler
+
 class DatabaseManager:
-    def __init__(self, db_path="correspondence.db"):
+    # عدد الاستعلامات المحضرة التي يحتفظ بها كل اتصال
+    STATEMENT_CACHE_SIZE = 256
+    
+    # إعدادات الأداء المطبقة على كل اتصال دائم
+    CONNECTION_PRAGMAS = (
+        "PRAGMA auto_vacuum = INCREMENTAL",  # يطبق فقط على قاعدة بيانات جديدة (قبل WAL)
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA cache_size = -20000",       # حوالي 20 ميجابايت
+        "PRAGMA mmap_size = 268435456",     # 256 ميجابايت
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA busy_timeout = 5000",
+    )
+    
+    # عدد الصفوف في كل صفحة من جداول العرض
+    PAGE_SIZE = 200
+    
+    # الجداول التي تحمل عداد المتابعات وآخر حالة: نوع المراسلة -> الجدول
+    # (الأعمدة والمشغلات تُنشأ في migrations.py)
+    FOLLOW_UP_PARENTS = {
+        'incoming': 'incoming_correspondence',
+        'outgoing': 'outgoing_correspondence',
+    }
+    
+    # الحالات غير المغلقة (حسب قيود CHECK) لفحص التأخير باستخدام فهرس (status, date)
+    OPEN_STATUSES = {
+        'incoming_correspondence': ('جديد', 'قيد المراجعة', 'تم الرد', 'مؤرشف'),
+        'follow_up': ('معلق', 'جاري'),
+    }
+    
+    # الجداول التي تدعم تغيير الحالة والحذف الجماعي من الجداول المعروضة
+    BULK_TABLES = ('incoming_correspondence', 'outgoing_correspondence', 'follow_up')
+    
+    # عدد المعرفات في كل جملة IN أثناء العمليات الجماعية
+    BULK_CHUNK = 500
+    
+    # أول جدول يتم تعديله في جملة INSERT / UPDATE / DELETE
+    WRITE_PATTERN = re.compile(
+        r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+["\[`]?(\w+)',
+        re.IGNORECASE
+    )
+    
+    def __init__(self, db_path="correspondence.db", persistent=True):
         self.db_path = db_path
+        self.persistent = persistent
+        
+        # اتصال دائم لكل خيط (thread) بدلاً من فتح اتصال لكل استعلام
+        self._local = threading.local()
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        
+        # رقم إصدار يزداد مع كل عملية كتابة ناجحة (لإبطال النسخ المخزنة)
+        self.write_version = 0
+        
+        # زمن الاستعلامات وخطط تنفيذ البطيء منها
+        self.profiler = QueryProfiler()
+        
+        # فهرس البحث النصي الكامل
+        self.search_index = SearchIndex()
+        
+        # محرك الإحصائيات مع التخزين المؤقت
+        self.statistics = StatisticsEngine(self)
+        
+        # كتابة سجل النشاطات على دفعات في الخلفية
+        self.activity_writer = ActivityLogWriter(self)
+        
+        # النسخ الاحتياطي أثناء العمل
+        self.backup_engine = BackupEngine(self)
+        
+        # سياسة الاحتفاظ وأرشفة سجل النشاطات
+        self.retention = RetentionManager(self)
+        
+        # تسلسل الأرقام التلقائية
+        self.sequences = SequenceAllocator(self)
+        
+        # الاستيراد والتصدير الجماعي
+        self.bulk_io = BulkIO(self)
+        
+        # دوال تُستدعى بعد كل كتابة (مع أسماء الجداول المعدلة إن كانت معروفة)
+        self._write_listeners = []
+        
+        # قوائم الاختيار المشتركة بين النماذج
+        self.lookups = LookupCache(self)
+        
+        # سجل التغييرات لتحديث الجداول المعروضة جزئياً
+        self.change_feed = ChangeFeed(self)
+        
+        # خطوات ترقية المخطط المرقمة (PRAGMA user_version)
+        self.migrations = SchemaMigrations(self)
+        
         self.init_database()
     
+    def _open_connection(self):
+        """فتح اتصال جديد بقاعدة البيانات"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            cached_statements=self.STATEMENT_CACHE_SIZE,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row  # للحصول على النتائج كقاموس
+        return conn
+    
+    def _apply_pragmas(self, conn):
+        """تطبيق إعدادات الأداء على الاتصال"""
+        for pragma in self.CONNECTION_PRAGMAS:
+            try:
+                conn.execute(pragma)
+            except sqlite3.DatabaseError as e:
+                print(f"تحذير: تعذر تطبيق الإعداد {pragma}: {e}")
+    
     def get_connection(self):
         """الحصول على اتصال بقاعدة البيانات"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # للحصول على النتائج كقاموس
+        if not self.persistent:
+            return self._open_connection()
+        
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open_connection()
+            self._apply_pragmas(conn)
+            self.profiler.attach(conn)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections[threading.get_ident()] = conn
         return conn
     
-    def init_database(self):
-        """إنشاء جداول قاعدة البيانات"""
+    def release_thread_connection(self):
+        """إغلاق الاتصال الدائم للخيط الحالي (تستدعيه الخيوط الخلفية قبل انتهائها)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._connections_lock:
+            if self._connections.get(threading.get_ident()) is conn:
+                del self._connections[threading.get_ident()]
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    
+    def release_connection(self, conn):
+        """إغلاق الاتصال إذا لم يكن اتصالاً دائماً"""
+        if not self.persistent:
+            conn.close()
+    
+    @contextmanager
+    def connection(self):
+        """اتصال مؤقت يُعاد تلقائياً بعد الانتهاء"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            # جدول المستخدمين
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    full_name TEXT NOT NULL,
-                    role TEXT NOT NULL CHECK (role IN ('admin', 'employee', 'viewer')),
-                    department TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT 1
-                )
-            ''')
-            
-            # جدول المراسلات الواردة
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS incoming_correspondence (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    reference_number TEXT UNIQUE NOT NULL,
-                    subject TEXT NOT NULL,
-                    sender TEXT NOT NULL,
-                    sender_department TEXT,
-                    received_date DATE NOT NULL,
-                    priority TEXT DEFAULT 'عادي' CHECK (priority IN ('عاجل', 'مهم', 'عادي')),
-                    status TEXT DEFAULT 'جديد' CHECK (status IN ('جديد', 'قيد المراجعة', 'تم الرد', 'مؤرشف')),
-                    content TEXT,
-                    notes TEXT,
-                    created_by INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (created_by) REFERENCES users (id)
-                )
-            ''')
-            
-            # جدول المراسلات الصادرة
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS outgoing_correspondence (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    reference_number TEXT UNIQUE NOT NULL,
-                    subject TEXT NOT NULL,
-                    recipient TEXT NOT NULL,
-                    recipient_department TEXT,
-                    sent_date DATE NOT NULL,
-                    priority TEXT DEFAULT 'عادي' CHECK (priority IN ('عاجل', 'مهم', 'عادي')),
-                    status TEXT DEFAULT 'مسودة' CHECK (status IN ('مسودة', 'تم الإرسال', 'تم الاستلام', 'مؤرشف')),
-                    content TEXT,
-                    notes TEXT,
-                    related_incoming_id INTEGER,
-                    created_by INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (related_incoming_id) REFERENCES incoming_correspondence (id),
-                    FOREIGN KEY (created_by) REFERENCES users (id)
-                )
-            ''')
-            
-            # جدول متابعة الموضوعات
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS follow_up (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    correspondence_type TEXT NOT NULL CHECK (correspondence_type IN ('incoming', 'outgoing')),
-                    correspondence_id INTEGER NOT NULL,
-                    follow_up_date DATE NOT NULL,
-                    action_required TEXT NOT NULL,
-                    responsible_person TEXT,
-                    status TEXT DEFAULT 'معلق' CHECK (status IN ('معلق', 'جاري', 'مغلق')),
-                    notes TEXT,
-                    created_by INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (created_by) REFERENCES users (id)
-                )
-            ''')
-            
-            # جدول سجل النشاطات
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS activity_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    action TEXT NOT NULL,
-                    table_name TEXT,
-                    record_id INTEGER,
-                    old_values TEXT,
-                    new_values TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-            
-            # إنشاء فهارس لتحسين الأداء
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_incoming_ref ON incoming_correspondence(reference_number)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_outgoing_ref ON outgoing_correspondence(reference_number)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_incoming_date ON incoming_correspondence(received_date)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_outgoing_date ON outgoing_correspondence(sent_date)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_follow_up_date ON follow_up(follow_up_date)')
-            
-            # تحديث قاعدة البيانات (إضافة أعمدة جديدة)
-            self.update_database_schema(cursor)
-            
-            conn.commit()
-            print("تم إنشاء قاعدة البيانات بنجاح")
-            
-        except Exception as e:
-            print(f"خطأ في إنشاء قاعدة البيانات: {e}")
-            conn.rollback()
+            yield conn
         finally:
-            conn.close()
+            self.release_connection(conn)
     
-    def update_database_schema(self, cursor):
-        """تحديث مخطط قاعدة البيانات - إضافة أعمدة جديدة"""
+    @contextmanager
+    def transaction(self, tables=None):
+        """معاملة واحدة: commit عند النجاح و rollback عند حدوث خطأ
+        
+        الاستدعاء المتداخل يستخدم نفس المعاملة الخارجية.
+        tables: الجداول التي تعدلها المعاملة (بدونها تُعتبر كل البيانات قد تغيرت)
+        """
+        conn = self.get_connection()
+        nested = conn.in_transaction
         try:
-            # التحقق من وجود عمود subject_code في جدول incoming_correspondence
-            cursor.execute("PRAGMA table_info(incoming_correspondence)")
-            columns = [column[1] for column in cursor.fetchall()]
-            
-            if 'subject_code' not in columns:
-                cursor.execute('ALTER TABLE incoming_correspondence ADD COLUMN subject_code TEXT')
-                print("تم إضافة عمود كود الموضوع")
-            
-            if 'responsible_person' not in columns:
-                cursor.execute('ALTER TABLE incoming_correspondence ADD COLUMN responsible_person TEXT')
-                print("تم إضافة عمود المسئول")
-            
-            # تحديث جدول المتابعة
-            cursor.execute("PRAGMA table_info(follow_up)")
-            follow_up_columns = [column[1] for column in cursor.fetchall()]
-            
-            if 'follow_up_code' not in follow_up_columns:
-                cursor.execute('ALTER TABLE follow_up ADD COLUMN follow_up_code TEXT')
-                print("تم إضافة عمود كود المتابعة")
-            
-            # تحديث حالات المتابعة (تنفيذ كل استعلام منفصل)
+            if not nested:
+                conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            yield cursor
+            if not nested:
+                conn.commit()
+                self.write_version += 1
+                self.notify_write(tables)
+        except Exception:
+            if not nested:
+                conn.rollback()
+            raise
+        finally:
+            self.release_connection(conn)
+    
+    def add_write_listener(self, listener):
+        """تسجيل دالة تُستدعى بعد كل كتابة: listener(tables) حيث tables=None تعني غير معروف"""
+        self._write_listeners.append(listener)
+    
+    def remove_write_listener(self, listener):
+        """إلغاء تسجيل دالة الكتابة"""
+        if listener in self._write_listeners:
+            self._write_listeners.remove(listener)
+    
+    def notify_write(self, tables=None):
+        """إبلاغ المستمعين بأن البيانات تغيرت"""
+        for listener in list(self._write_listeners):
             try:
-                cursor.execute("UPDATE follow_up SET status = 'جاري' WHERE status = 'قيد التنفيذ'")
-                cursor.execute("UPDATE follow_up SET status = 'مغلق' WHERE status = 'مكتمل'")
-                cursor.execute("UPDATE follow_up SET status = 'مغلق' WHERE status = 'ملغي'")
-                print("تم تحديث حالات المتابعة")
+                listener(tables)
             except Exception as e:
-                print(f"تحذير: خطأ في تحديث حالات المتابعة: {e}")
-            
-            # تحديث جدول المراسلات الصادرة
-            cursor.execute("PRAGMA table_info(outgoing_correspondence)")
-            outgoing_columns = [column[1] for column in cursor.fetchall()]
-            
-            if 'subject_code' not in outgoing_columns:
-                cursor.execute('ALTER TABLE outgoing_correspondence ADD COLUMN subject_code TEXT')
-                print("تم إضافة عمود كود الموضوع للصادرة")
-            
-            if 'recipient_engineer' not in outgoing_columns:
-                cursor.execute('ALTER TABLE outgoing_correspondence ADD COLUMN recipient_engineer TEXT')
-                print("تم إضافة عمود المهندس المستلم")
-            
-            if 'responsible_engineer' not in outgoing_columns:
-                cursor.execute('ALTER TABLE outgoing_correspondence ADD COLUMN responsible_engineer TEXT')
-                print("تم إضافة عمود المهندس المسئول")
-            
-            if 'engineer' not in outgoing_columns:
-                cursor.execute('ALTER TABLE outgoing_correspondence ADD COLUMN engineer TEXT')
-                print("تم إضافة عمود مهندس/مهندسة")
-            
-            # يمكن إضافة المزيد من التحديثات هنا في المستقبل
-            
+                print(f"خطأ في معالجة إشعار الكتابة: {e}")
+    
+    @classmethod
+    def written_tables(cls, query):
+        """الجدول الذي تعدله جملة SQL (أو None إذا تعذر تحديده)"""
+        match = cls.WRITE_PATTERN.match(query)
+        return (match.group(1),) if match else None
+    
+    def set_query_trace(self, enabled):
+        """تفعيل أو إلغاء تتبع كل الجمل المنفذة على جميع الاتصالات الدائمة"""
+        self.profiler.trace = enabled
+        with self._connections_lock:
+            connections = list(self._connections.values())
+        for conn in connections:
+            self.profiler.attach(conn)
+    
+    def get_data_version(self):
+        """رقم يتغير عند تعديل البيانات من هذا البرنامج أو من برنامج آخر على نفس الملف
+        
+        PRAGMA data_version عداد مستقل لكل اتصال (وهنا اتصال لكل خيط) فلا تصلح
+        مقارنة قيمه بين الخيوط، لذلك يُستخدم عداد الكتابة في هذا البرنامج مع آخر
+        إصدار في سجل التغييرات (تكتبه المشغلات عند أي تعديل من أي اتصال).
+        """
+        return (self.write_version, self.change_feed.latest_version())
+    
+    def interrupt(self, thread_ident):
+        """مقاطعة الاستعلام الجاري على اتصال خيط معين"""
+        with self._connections_lock:
+            conn = self._connections.get(thread_ident)
+        if conn is not None:
+            conn.interrupt()
+    
+    def close(self):
+        """إغلاق جميع الاتصالات الدائمة"""
+        # كتابة سجل النشاطات المعلق قبل إغلاق الاتصالات
+        self.activity_writer.close()
+        
+        with self._connections_lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+    
+    def init_database(self):
+        """ترقية مخطط قاعدة البيانات إلى آخر إصدار (لا شيء إذا كان محدثاً)"""
+        try:
+            if self.migrations.migrate():
+                print("تم إنشاء قاعدة البيانات بنجاح")
         except Exception as e:
-            print(f"تحذير: خطأ في تحديث قاعدة البيانات: {e}")
+            print(f"خطأ في إنشاء قاعدة البيانات: {e}")
+        
+        # فهرس البحث النصي قد لا يكون متاحاً في نسخة SQLite التي أنشأت الملف
+        with self.connection() as conn:
+            self.search_index.detect(conn.cursor())
     
     def execute_query(self, query, params=None):
         """تنفيذ استعلام قراءة"""
         conn = self.get_connection()
+        started = time.perf_counter()
         try:
             cursor = conn.cursor()
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
-            return cursor.fetchall()
+            rows = cursor.fetchall()
+            self.profiler.record(query, params, (time.perf_counter() - started) * 1000, len(rows), conn=conn)
+            return rows
         except Exception as e:
+            self.profiler.record(query, params, (time.perf_counter() - started) * 1000, error=e)
             print(f"خطأ في تنفيذ الاستعلام: {e}")
             return []
         finally:
-            conn.close()
+            self.release_connection(conn)
     
     def execute_update(self, query, params=None):
         """تنفيذ استعلام تحديث/إدراج/حذف"""
         conn = self.get_connection()
+        started = time.perf_counter()
         try:
             cursor = conn.cursor()
             if params:
@@ -218,80 +311,338 @@ class DatabaseManager:
             else:
                 cursor.execute(query)
             conn.commit()
+            self.profiler.record(query, params, (time.perf_counter() - started) * 1000, cursor.rowcount, conn=conn)
+            self.write_version += 1
+            self.notify_write(self.written_tables(query))
             return cursor.lastrowid
         except Exception as e:
+            self.profiler.record(query, params, (time.perf_counter() - started) * 1000, error=e)
             print(f"خطأ في تنفيذ التحديث: {e}")
             conn.rollback()
             return None
         finally:
-            conn.close()
+            self.release_connection(conn)
     
-    def log_activity(self, user_id, action, table_name=None, record_id=None, old_values=None, new_values=None):
-        """تسجيل نشاط المستخدم"""
-        query = '''
-            INSERT INTO activity_log (user_id, action, table_name, record_id, old_values, new_values)
-            VALUES (?, ?, ?, ?, ?, ?)
-        '''
-        params = (user_id, action, table_name, record_id, old_values, new_values)
-        return self.execute_update(query, params)
+    def log_activity(self, user_id, action, table_name=None, record_id=None, old_values=None, new_values=None, cursor=None):
+        """تسجيل نشاط المستخدم
+        
+        بدون cursor يُضاف الإدخال إلى طابور الكتابة على دفعات،
+        ومع cursor يُكتب فوراً داخل نفس معاملة التعديل.
+        """
+        if cursor is not None:
+            return self.activity_writer.write_now(cursor, user_id, action, table_name, record_id, old_values, new_values)
+        self.activity_writer.write(user_id, action, table_name, record_id, old_values, new_values)
     
-    def get_statistics(self):
-        """الحصول على إحصائيات النظام"""
-        stats = {}
+    def _bulk_ids(self, cursor, table, ids, condition="", params=()):
+        """المعرفات الموجودة من قائمة (مع شرط إضافي) على دفعات داخل المعاملة"""
+        if table not in self.BULK_TABLES:
+            raise ValueError(f"جدول غير مدعوم للعمليات الجماعية: {table}")
+        found = []
+        for start in range(0, len(ids), self.BULK_CHUNK):
+            chunk = ids[start:start + self.BULK_CHUNK]
+            cursor.execute(
+                f"SELECT id FROM {table} WHERE id IN ({', '.join('?' for _ in chunk)}){condition}",
+                (*chunk, *params)
+            )
+            found.extend(row[0] for row in cursor.fetchall())
+        return found
+    
+    def bulk_update_status(self, table, ids, status, user_id=None, action=None, locked_statuses=()):
+        """تغيير حالة عدة صفوف في معاملة واحدة مع إدخال في سجل النشاطات لكل صف
         
-        # عدد المراسلات الواردة
-        result = self.execute_query("SELECT COUNT(*) as count FROM incoming_correspondence")
-        stats['total_incoming'] = result[0]['count'] if result else 0
+        action: نص النشاط لكل صف ({id} يُستبدل بالمعرف)
+        locked_statuses: حالات لا يتم تغييرها (مثل المتابعات المغلقة)
+        يعيد عدد الصفوف التي تغيرت حالتها (الصفوف التي لها نفس الحالة لا تُعدل)، أو None عند الفشل
+        """
+        ids = [int(row_id) for row_id in ids]
+        skip = (status, *locked_statuses)
+        try:
+            with self.transaction(tables=(table, 'activity_log')) as cursor:
+                changed = self._bulk_ids(
+                    cursor, table, ids,
+                    f" AND status NOT IN ({', '.join('?' for _ in skip)})", skip
+                )
+                cursor.executemany(
+                    f"UPDATE {table} SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    [(status, row_id) for row_id in changed]
+                )
+                if action:
+                    self.activity_writer.write_many(cursor, [
+                        (user_id, action.format(id=row_id), table, row_id) for row_id in changed
+                    ])
+            return len(changed)
+        except Exception as e:
+            print(f"خطأ في تغيير الحالة: {e}")
+            return None
+    
+    def bulk_delete(self, table, ids, user_id=None, action=None):
+        """حذف عدة صفوف في معاملة واحدة مع إدخال في سجل النشاطات لكل صف
         
-        # عدد المراسلات الصادرة
-        result = self.execute_query("SELECT COUNT(*) as count FROM outgoing_correspondence")
-        stats['total_outgoing'] = result[0]['count'] if result else 0
+        يعيد عدد الصفوف المحذوفة، أو None عند الفشل
+        """
+        ids = [int(row_id) for row_id in ids]
+        try:
+            with self.transaction(tables=(table, 'activity_log')) as cursor:
+                existing = self._bulk_ids(cursor, table, ids)
+                cursor.executemany(f"DELETE FROM {table} WHERE id = ?", [(row_id,) for row_id in existing])
+                if action:
+                    self.activity_writer.write_many(cursor, [
+                        (user_id, action.format(id=row_id), table, row_id) for row_id in existing
+                    ])
+            return len(existing)
+        except Exception as e:
+            print(f"خطأ في الحذف: {e}")
+            return None
+    
+    def execute_page(self, base_query, conditions=None, params=None, order_by=(), after=None, limit=None, ids=None):
+        """تنفيذ استعلام مقسم إلى صفحات باستخدام مفتاح الترتيب (keyset)
+        
+        order_by: أزواج (تعبير SQL, اسم العمود في النتيجة) مرتبة تنازلياً، آخرها عمود المعرف
+        after: مفتاح آخر صف في الصفحة السابقة
+        ids: جلب صفوف محددة فقط بنفس الفلاتر (لتحديث الصفوف التي تغيرت)
+        يعيد (الصفوف, مفتاح الصفحة التالية أو None عند النهاية)
+        """
+        limit = limit or self.PAGE_SIZE
+        conditions = list(conditions or [])
+        params = list(params or [])
+        
+        if ids is not None:
+            ids = list(ids)
+            conditions.append(f"{order_by[-1][0]} IN ({', '.join('?' for _ in ids)})")
+            params.extend(ids)
+            limit = max(len(ids), 1)
+        
+        expressions = [expression for expression, _ in order_by]
+        if after is not None:
+            conditions.append(f"({', '.join(expressions)}) < ({', '.join('?' * len(expressions))})")
+            params.extend(after)
+        
+        query = base_query
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY " + ", ".join(f"{expression} DESC" for expression in expressions)
+        query += " LIMIT ?"
+        params.append(limit)
+        
+        rows = self.execute_query(query, params)
+        
+        next_key = None
+        if len(rows) == limit:
+            last_row = rows[-1]
+            next_key = tuple(last_row[column] for _, column in order_by)
+        return rows, next_key
+    
+    def get_incoming_page(self, search_term=None, after=None, limit=None, ids=None):
+        """صفحة من المراسلات الواردة لجدول العرض"""
+        base_query = '''
+            SELECT id, reference_number, subject_code, subject, sender, sender_department,
+                   responsible_person, received_date, priority, status
+            FROM incoming_correspondence
+        '''
+        conditions = []
+        params = []
+        order_by = (('received_date', 'received_date'), ('id', 'id'))
         
-        # المراسلات الواردة الجديدة
-        result = self.execute_query("SELECT COUNT(*) as count FROM incoming_correspondence WHERE status = 'جديد'")
-        stats['new_incoming'] = result[0]['count'] if result else 0
+        match = self.search_index.match_expression(search_term) if search_term and self.search_index.enabled else None
+        if match:
+            # البحث النصي مرتب حسب درجة التطابق
+            base_query = '''
+                SELECT ic.id, ic.reference_number, ic.subject_code, ic.subject, ic.sender, ic.sender_department,
+                       ic.responsible_person, ic.received_date, ic.priority, ic.status,
+                       -bm25(incoming_fts) as relevance
+                FROM incoming_fts
+                JOIN incoming_correspondence ic ON ic.id = incoming_fts.rowid
+            '''
+            conditions.append("incoming_fts MATCH ?")
+            params.append(match)
+            order_by = (('-bm25(incoming_fts)', 'relevance'), ('ic.id', 'id'))
+        elif search_term:
+            conditions.append("(reference_number LIKE ? OR subject LIKE ? OR sender LIKE ? OR subject_code LIKE ? OR notes LIKE ?)")
+            params.extend([f'%{search_term}%'] * 5)
+        
+        return self.execute_page(
+            base_query, conditions, params,
+            order_by=order_by,
+            after=after, limit=limit, ids=ids
+        )
+    
+    def get_outgoing_page(self, search_term=None, after=None, limit=None, ids=None):
+        """صفحة من المراسلات الصادرة لجدول العرض"""
+        base_query = '''
+            SELECT oc.id, oc.reference_number, oc.subject_code, oc.subject, oc.recipient,
+                   oc.recipient_engineer, oc.responsible_engineer, oc.sent_date,
+                   oc.priority, oc.status, oc.related_incoming_id,
+                   ic.subject_code as related_ref
+            FROM outgoing_correspondence oc
+            LEFT JOIN incoming_correspondence ic ON oc.related_incoming_id = ic.id
+        '''
+        conditions = []
+        params = []
+        order_by = (('oc.sent_date', 'sent_date'), ('oc.id', 'id'))
+        
+        match = self.search_index.match_expression(search_term) if search_term and self.search_index.enabled else None
+        if match:
+            # البحث النصي مرتب حسب درجة التطابق
+            base_query = '''
+                SELECT oc.id, oc.reference_number, oc.subject_code, oc.subject, oc.recipient,
+                       oc.recipient_engineer, oc.responsible_engineer, oc.sent_date,
+                       oc.priority, oc.status, oc.related_incoming_id,
+                       ic.subject_code as related_ref,
+                       -bm25(outgoing_fts) as relevance
+                FROM outgoing_fts
+                JOIN outgoing_correspondence oc ON oc.id = outgoing_fts.rowid
+                LEFT JOIN incoming_correspondence ic ON oc.related_incoming_id = ic.id
+            '''
+            conditions.append("outgoing_fts MATCH ?")
+            params.append(match)
+            order_by = (('-bm25(outgoing_fts)', 'relevance'), ('oc.id', 'id'))
+        elif search_term:
+            conditions.append("(oc.reference_number LIKE ? OR oc.subject LIKE ? OR oc.recipient LIKE ? OR oc.subject_code LIKE ? OR oc.notes LIKE ?)")
+            params.extend([f'%{search_term}%'] * 5)
+        
+        return self.execute_page(
+            base_query, conditions, params,
+            order_by=order_by,
+            after=after, limit=limit, ids=ids
+        )
+    
+    def get_follow_up_page(self, status=None, correspondence_type=None, search_term=None, after=None, limit=None, ids=None):
+        """صفحة من المتابعات لجدول العرض"""
+        base_query = '''
+            SELECT f.id, f.follow_up_code, f.correspondence_type, f.correspondence_id, f.follow_up_date,
+                   f.action_required, f.responsible_person, f.status, f.notes, f.correspondence_ref
+            FROM follow_up_grid f
+        '''
+        conditions = []
+        params = []
         
-        # المراسلات الصادرة المسودة
-        result = self.execute_query("SELECT COUNT(*) as count FROM outgoing_correspondence WHERE status = 'مسودة'")
-        stats['draft_outgoing'] = result[0]['count'] if result else 0
+        if status:
+            conditions.append("f.status = ?")
+            params.append(status)
         
-        # المتابعات المعلقة
-        result = self.execute_query("SELECT COUNT(*) as count FROM follow_up WHERE status = 'معلق'")
-        stats['pending_followups'] = result[0]['count'] if result else 0
+        if correspondence_type:
+            conditions.append("f.correspondence_type = ?")
+            params.append(correspondence_type)
         
-        # إحصائيات هذا الشهر
-        current_month = datetime.now().strftime('%Y-%m')
+        match = self.search_index.match_expression(search_term) if search_term and self.search_index.enabled else None
+        if match:
+            # البحث في فهرس المتابعات أو في أرقام المراسلات المرتبطة
+            conditions.append("""(
+                f.id IN (SELECT rowid FROM follow_up_fts WHERE follow_up_fts MATCH ?) OR
+                (f.correspondence_type = 'incoming' AND f.correspondence_id IN
+                    (SELECT rowid FROM incoming_fts WHERE incoming_fts MATCH ?)) OR
+                (f.correspondence_type = 'outgoing' AND f.correspondence_id IN
+                    (SELECT rowid FROM outgoing_fts WHERE outgoing_fts MATCH ?))
+            )""")
+            reference_match = self.search_index.match_expression(search_term, column='reference_number')
+            params.extend([match, reference_match, reference_match])
+        elif search_term:
+            conditions.append("""(
+                f.action_required LIKE ? OR
+                f.responsible_person LIKE ? OR
+                f.notes LIKE ? OR
+                f.correspondence_ref LIKE ?
+            )""")
+            params.extend([f'%{search_term}%'] * 4)
         
-        result = self.execute_query(
-            "SELECT COUNT(*) as count FROM incoming_correspondence WHERE strftime('%Y-%m', received_date) = ?",
-            (current_month,)
+        return self.execute_page(
+            base_query, conditions, params,
+            order_by=(('f.follow_up_date', 'follow_up_date'), ('f.id', 'id')),
+            after=after, limit=limit, ids=ids
+        )
+    
+    def get_statistics(self):
+        """الحصول على إحصائيات النظام"""
+        snapshot = self.statistics.snapshot()
+        keys = (
+            'total_incoming', 'total_outgoing', 'new_incoming', 'draft_outgoing',
+            'pending_followups', 'incoming_this_month', 'outgoing_this_month'
         )
-        stats['incoming_this_month'] = result[0]['count'] if result else 0
+        return {key: snapshot[key] for key in keys}
+    
+    def get_activity_page(self, user_id=None, table_name=None, action_type=None, after=None, limit=None):
+        """صفحة من سجل النشاطات (الأحدث أولاً) مع التصفية حسب المستخدم والجدول ونوع النشاط"""
+        # التأكد من كتابة الإدخالات المعلقة قبل القراءة
+        self.activity_writer.flush()
+        
+        base_query = '''
+            SELECT al.id, al.timestamp, al.action, al.action_type, al.table_name, al.record_id,
+                   al.user_id, u.username, u.full_name
+            FROM activity_log al
+            LEFT JOIN users u ON al.user_id = u.id
+        '''
+        conditions = []
+        params = []
+        
+        for column, value in (('al.user_id', user_id), ('al.table_name', table_name), ('al.action_type', action_type)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
         
-        result = self.execute_query(
-            "SELECT COUNT(*) as count FROM outgoing_correspondence WHERE strftime('%Y-%m', sent_date) = ?",
-            (current_month,)
+        return self.execute_page(
+            base_query, conditions, params,
+            order_by=(('al.timestamp', 'timestamp'), ('al.id', 'id')),
+            after=after, limit=limit
         )
-        stats['outgoing_this_month'] = result[0]['count'] if result else 0
+    
+    def get_activity_tables(self):
+        """أسماء الجداول الموجودة في سجل النشاطات"""
+        rows = self.execute_query(
+            "SELECT DISTINCT table_name FROM activity_log WHERE table_name IS NOT NULL ORDER BY table_name"
+        )
+        return [row['table_name'] for row in rows]
+    
+    def get_overdue_items(self, days=3, limit=20):
+        """المراسلات الواردة والمتابعات غير المغلقة التي تجاوزت عدد الأيام المحدد
+        
+        تعيد أقدم العناصر (حتى limit) مع العدد الكلي لكل نوع.
+        """
+        cutoff = (date.today() - timedelta(days=days)).isoformat()
+        checks = {
+            'incoming': ('incoming_correspondence', 'received_date', 'id, reference_number, subject, received_date, status'),
+            'follow_up': ('follow_up', 'follow_up_date', 'id, follow_up_code, action_required, follow_up_date, status'),
+        }
         
-        return stats
+        result = {}
+        for key, (table, date_column, columns) in checks.items():
+            statuses = self.OPEN_STATUSES[table]
+            where = f"status IN ({', '.join('?' for _ in statuses)}) AND {date_column} < ?"
+            params = (*statuses, cutoff)
+            
+            total = self.execute_query(f"SELECT COUNT(*) as count FROM {table} WHERE {where}", params)
+            result[f'{key}_total'] = total[0]['count'] if total else 0
+            result[key] = self.execute_query(
+                f"SELECT {columns} FROM {table} WHERE {where} ORDER BY {date_column}, id LIMIT ?",
+                (*params, limit)
+            ) if result[f'{key}_total'] else []
+        return result
+    
+    def get_time_series(self, start, end, granularity='month', kinds=('incoming', 'outgoing')):
+        """عدد المراسلات لكل يوم/أسبوع/شهر في المدى [start, end)"""
+        return self.statistics.time_series(start, end, granularity, kinds)
     
-    def backup_database(self, backup_path):
-        """نسخ احتياطي من قاعدة البيانات"""
+    def backup_database(self, backup_path, progress=None, base_path=None):
+        """نسخ احتياطي من قاعدة البيانات (تفاضلي إذا تم تحديد نسخة أساسية)"""
         try:
-            import shutil
-            shutil.copy2(self.db_path, backup_path)
+            # تسجيل النشاطات المعلقة قبل أخذ اللقطة
+            self.activity_writer.flush()
+            if base_path:
+                self.backup_engine.backup_differential(base_path, backup_path, progress)
+            else:
+                self.backup_engine.backup(backup_path, progress)
             return True
         except Exception as e:
             print(f"خطأ في إنشاء النسخة الاحتياطية: {e}")
             return False
     
-    def restore_database(self, backup_path):
+    def restore_database(self, backup_path, progress=None):
         """استعادة قاعدة البيانات من نسخة احتياطية"""
         try:
-            import shutil
-            shutil.copy2(backup_path, self.db_path)
+            self.activity_writer.flush()
+            self.backup_engine.restore(backup_path, progress=progress)
+            # النسخة المستعادة قد تكون من إصدار أقدم للمخطط
+            self.init_database()
             return True
         except Exception as e:
             print(f"خطأ في استعادة النسخة الاحتياطية: {e}")
-            return False
\ No newline at end of file
+            return False
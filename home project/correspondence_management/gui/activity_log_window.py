@@ -8,7 +8,19 @@ Activity Log Window
 import tkinter as tk
 from tkinter import ttk
 
+from gui.paged_tree import PagedTreeLoader
+
 class ActivityLogWindow:
+    # أنواع النشاط المحفوظة في العمود action_type
+    ACTION_TYPE_NAMES = {
+        'add': 'إضافة',
+        'edit': 'تعديل',
+        'delete': 'حذف',
+        'login': 'تسجيل دخول',
+        'default': 'أخرى',
+    }
+    ALL = 'الكل'
+    
     def __init__(self, parent, db_manager, auth_manager):
         self.db_manager = db_manager
         self.auth_manager = auth_manager
@@ -49,6 +61,51 @@ class ActivityLogWindow:
         )
         title_label.pack(pady=(0, 20))
         
+        # إطار التصفية (يتم التصفية في قاعدة البيانات)
+        filter_frame = ttk.Frame(main_frame)
+        filter_frame.pack(fill='x', pady=(0, 10))
+        
+        users = self.db_manager.execute_query("SELECT id, username, full_name FROM users ORDER BY full_name, username")
+        # اسم الدخول مع الاسم الكامل حتى لا يتكرر النص لمستخدمين بنفس الاسم
+        self.user_ids = {f"{user['full_name']} ({user['username']})": user['id'] for user in users}
+        self.action_types = {name: action_type for action_type, name in self.ACTION_TYPE_NAMES.items()}
+        
+        ttk.Label(filter_frame, text="المستخدم:").pack(side='right', padx=5)
+        self.user_var = tk.StringVar(value=self.ALL)
+        user_combo = ttk.Combobox(
+            filter_frame,
+            textvariable=self.user_var,
+            values=[self.ALL] + list(self.user_ids),
+            state="readonly",
+            width=20
+        )
+        user_combo.pack(side='right', padx=5)
+        
+        ttk.Label(filter_frame, text="الجدول:").pack(side='right', padx=5)
+        self.table_var = tk.StringVar(value=self.ALL)
+        table_combo = ttk.Combobox(
+            filter_frame,
+            textvariable=self.table_var,
+            values=[self.ALL] + self.db_manager.get_activity_tables(),
+            state="readonly",
+            width=20
+        )
+        table_combo.pack(side='right', padx=5)
+        
+        ttk.Label(filter_frame, text="نوع النشاط:").pack(side='right', padx=5)
+        self.action_type_var = tk.StringVar(value=self.ALL)
+        action_type_combo = ttk.Combobox(
+            filter_frame,
+            textvariable=self.action_type_var,
+            values=[self.ALL] + list(self.action_types),
+            state="readonly",
+            width=15
+        )
+        action_type_combo.pack(side='right', padx=5)
+        
+        for combo in (user_combo, table_combo, action_type_combo):
+            combo.bind('<<ComboboxSelected>>', lambda e: self.load_data())
+        
         # إطار الجدول
         table_frame = ttk.Frame(main_frame)
         table_frame.pack(fill='both', expand=True)
@@ -92,6 +149,9 @@ class ActivityLogWindow:
         table_frame.grid_rowconfigure(0, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
         
+        # تحميل الصفحات الأقدم عند التمرير
+        self.pager = PagedTreeLoader(self.tree, scrollbar_v, self.insert_row)
+        
         # زر الإغلاق
         close_btn = ttk.Button(
             main_frame,
@@ -101,27 +161,26 @@ class ActivityLogWindow:
         close_btn.pack(pady=(20, 0))
     
     def load_data(self):
-        """تحميل بيانات سجل النشاطات"""
-        # جلب آخر 500 نشاط
-        activities = self.auth_manager.get_user_activity_log(limit=500)
-        
-        # إدراج البيانات في الجدول مع تلوين حسب نوع العملية
-        for activity in activities:
-            action_text = activity['action'].lower()
-            if 'حذف' in action_text or 'delete' in action_text:
-                tag = 'delete'
-            elif 'تعديل' in action_text or 'edit' in action_text:
-                tag = 'edit'
-            elif 'إضافة' in action_text or 'add' in action_text or 'إنشاء' in action_text:
-                tag = 'add'
-            elif 'دخول' in action_text or 'login' in action_text:
-                tag = 'login'
-            else:
-                tag = 'default'
-            self.tree.insert('', 'end', values=(
-                activity['timestamp'][:16] if activity['timestamp'] else '-',
-                activity['username'] or 'غير معروف',
-                activity['action'],
-                activity['table_name'] or '-',
-                activity['record_id'] or '-'
-            ), tags=(tag,))
\ No newline at end of file
+        """تحميل بيانات سجل النشاطات (الصفحة الأولى حسب التصفية)"""
+        user_id = self.user_ids.get(self.user_var.get())
+        table_name = self.table_var.get()
+        table_name = None if table_name == self.ALL else table_name
+        action_type = self.action_types.get(self.action_type_var.get())
+        
+        def fetch_page(after):
+            return self.db_manager.get_activity_page(
+                user_id=user_id, table_name=table_name, action_type=action_type, after=after
+            )
+        
+        self.pager.reset(fetch_page)
+    
+    def insert_row(self, activity):
+        """إضافة نشاط للجدول مع تلوين حسب نوع العملية"""
+        tag = activity['action_type'] or 'default'
+        self.tree.insert('', 'end', iid=str(activity['id']), values=(
+            activity['timestamp'][:16] if activity['timestamp'] else '-',
+            activity['username'] or 'غير معروف',
+            activity['action'],
+            activity['table_name'] or '-',
+            activity['record_id'] or '-'
+        ), tags=(tag,))
\ No newline at end of file
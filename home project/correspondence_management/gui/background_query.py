@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تنفيذ الاستعلامات في الخلفية
+Background Query Runner
+"""
+
+import queue
+import threading
+
+class BackgroundQueryRunner:
+    """تنفيذ الاستعلامات في خيط خلفي مع تأخير الكتابة وإلغاء الطلبات القديمة
+    
+    يتم تنفيذ الدالة work في الخيط الخلفي، ثم تُمرر نتيجتها إلى callback
+    في الخيط الرئيسي عبر after() حتى لا تتجمد الواجهة أثناء البحث.
+    """
+    
+    def __init__(self, widget, db_manager, delay_ms=300, poll_ms=30):
+        self.widget = widget
+        self.db_manager = db_manager
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+        
+        self._generation = 0
+        self._running_generation = None
+        self._debounce_id = None
+        self._poll_id = None
+        self._pending = 0
+        
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._worker = None
+    
+    def submit(self, work, callback, delay_ms=None):
+        """جدولة عمل جديد يلغي أي عمل سابق لم يكتمل"""
+        self._generation += 1
+        generation = self._generation
+        
+        # إعادة ضبط مؤقت التأخير مع كل ضغطة مفتاح
+        if self._debounce_id is not None:
+            self.widget.after_cancel(self._debounce_id)
+        
+        # إيقاف الاستعلام الجاري إذا أصبح قديماً
+        self.cancel_running()
+        
+        delay = self.delay_ms if delay_ms is None else delay_ms
+        self._debounce_id = self.widget.after(
+            delay, lambda: self._dispatch(generation, work, callback)
+        )
+    
+    def cancel_running(self):
+        """مقاطعة الاستعلام الجاري في الخيط الخلفي"""
+        running = self._running_generation
+        if running is not None and running != self._generation and self._worker is not None:
+            self.db_manager.interrupt(self._worker.ident)
+    
+    def _dispatch(self, generation, work, callback):
+        """إرسال العمل إلى الخيط الخلفي بعد انتهاء مدة التأخير"""
+        self._debounce_id = None
+        self._ensure_worker()
+        self._pending += 1
+        self._jobs.put((generation, work, callback))
+        self._schedule_poll()
+    
+    def _ensure_worker(self):
+        """تشغيل الخيط الخلفي عند الحاجة"""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._worker.start()
+    
+    def _worker_loop(self):
+        """حلقة الخيط الخلفي"""
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                
+                generation, work, callback = job
+                if generation != self._generation:
+                    # تم استبدال هذا الطلب بطلب أحدث
+                    self._results.put((generation, None, None, None))
+                    continue
+                
+                self._running_generation = generation
+                try:
+                    result, error = work(), None
+                except Exception as e:
+                    result, error = None, e
+                finally:
+                    self._running_generation = None
+                
+                self._results.put((generation, callback, result, error))
+        finally:
+            # إغلاق اتصال هذا الخيط بقاعدة البيانات قبل انتهائه
+            self.db_manager.release_thread_connection()
+    
+    def _schedule_poll(self):
+        """جدولة فحص النتائج في الخيط الرئيسي"""
+        if self._poll_id is None:
+            try:
+                self._poll_id = self.widget.after(self.poll_ms, self._poll_results)
+            except Exception:
+                self._poll_id = None
+    
+    def _poll_results(self):
+        """تسليم النتائج الجاهزة إلى الخيط الرئيسي"""
+        self._poll_id = None
+        
+        while True:
+            try:
+                generation, callback, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            
+            self._pending -= 1
+            
+            # تجاهل نتائج الطلبات القديمة
+            if callback is None or generation != self._generation:
+                continue
+            
+            if error is not None:
+                print(f"خطأ في تنفيذ الاستعلام في الخلفية: {error}")
+                continue
+            
+            callback(result)
+        
+        if self._pending > 0:
+            self._schedule_poll()
+    
+    def close(self):
+        """إيقاف الخيط الخلفي"""
+        if self._debounce_id is not None:
+            try:
+                self.widget.after_cancel(self._debounce_id)
+            except Exception:
+                pass
+            self._debounce_id = None
+        self._generation += 1
+        self.cancel_running()
+        self._jobs.put(None)
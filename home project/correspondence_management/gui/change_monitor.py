@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مراقبة التغييرات وتحديث التبويبات
+Change Monitor
+"""
+
+class ChangeMonitor:
+    """فحص سجل التغييرات دورياً وتمرير الصفوف المتغيرة للتبويبات المشتركة فقط
+    
+    الفحص الدوري يقارن رقم إصدار البيانات أولاً (get_data_version) ولا يقرأ
+    سجل التغييرات إلا إذا تغير. التبويبات تطلب فحصاً فورياً بعد أي تعديل
+    بإرسال الحدث DATA_CHANGED.
+    """
+    
+    DATA_CHANGED = '<<DataChanged>>'
+    
+    def __init__(self, widget, db_manager, interval_ms=2000):
+        self.widget = widget
+        self.db_manager = db_manager
+        self.interval_ms = interval_ms
+        
+        # (الجداول, الدالة) لكل مشترك
+        self._subscribers = []
+        self._after_id = None
+        self._data_version = None
+        self.version = db_manager.change_feed.latest_version()
+        
+        widget.bind_all(self.DATA_CHANGED, lambda event: self.check_now())
+    
+    def subscribe(self, tables, callback):
+        """تسجيل دالة تستقبل {الجدول: {معرف الصف: العملية} أو None لإعادة التحميل}"""
+        self._subscribers.append((tuple(tables), callback))
+    
+    def start(self):
+        """بدء الفحص الدوري"""
+        self._data_version = self.db_manager.get_data_version()
+        self._schedule()
+    
+    def _schedule(self):
+        self._after_id = self.widget.after(self.interval_ms, self._poll)
+    
+    def _poll(self):
+        """فحص دوري: لا يتم أي عمل إذا لم تتغير البيانات"""
+        self._after_id = None
+        try:
+            data_version = self.db_manager.get_data_version()
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self.dispatch()
+        except Exception as e:
+            print(f"خطأ في فحص التغييرات: {e}")
+        finally:
+            self._schedule()
+    
+    def check_now(self):
+        """فحص فوري (بعد تعديل من نفس البرنامج)"""
+        self._data_version = self.db_manager.get_data_version()
+        self.dispatch()
+    
+    def dispatch(self):
+        """قراءة التغييرات منذ آخر إصدار وتمريرها للمشتركين المعنيين"""
+        self.version, changes = self.db_manager.change_feed.changes_since(self.version)
+        if not changes:
+            return
+        
+        for tables, callback in self._subscribers:
+            relevant = {table: changes[table] for table in tables if table in changes}
+            if relevant:
+                try:
+                    callback(relevant)
+                except Exception as e:
+                    print(f"خطأ في تحديث التبويب: {e}")
+    
+    def reset(self):
+        """تجاهل التغييرات السابقة (بعد إعادة تحميل كل التبويبات)"""
+        self.version = self.db_manager.change_feed.latest_version()
+        self._data_version = self.db_manager.get_data_version()
+    
+    def stop(self):
+        """إيقاف الفحص الدوري"""
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+إدارة الرسوم البيانية
+Chart Manager
+"""
+
+import base64
+import io
+from collections import OrderedDict
+from datetime import date
+
+import importlib.util
+import threading
+
+import tkinter as tk
+
+from gui.background_query import BackgroundQueryRunner
+
+# matplotlib يُستورد عند أول رسم فقط (في الخيط الخلفي) وليس عند بدء البرنامج
+_matplotlib = None
+_matplotlib_lock = threading.Lock()
+
+def load_matplotlib():
+    """استيراد Figure و FigureCanvasAgg عند الحاجة (مرة واحدة)"""
+    global _matplotlib
+    with _matplotlib_lock:
+        if _matplotlib is None:
+            import matplotlib
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            
+            # تعيين الخط العربي لـ matplotlib
+            matplotlib.rcParams['font.family'] = ['Arial Unicode MS', 'Tahoma', 'DejaVu Sans']
+            _matplotlib = (Figure, FigureCanvasAgg)
+        return _matplotlib
+
+class ChartManager:
+    """رسم المخططات في خيط خلفي مع إعادة استخدام الأشكال وتخزين الصور الجاهزة
+    
+    يتم تجهيز البيانات والرسم إلى صورة PNG في الخيط الخلفي (باستخدام Agg بدون pyplot)،
+    ثم تُعرض الصورة في الخيط الرئيسي. كل نوع رسم له شكل واحد يُعاد استخدامه،
+    والصور الجاهزة تخزن حسب (نوع الرسم, إصدار البيانات).
+    """
+    
+    MONTHLY = "شهري"
+    STATUS = "حسب الحالة"
+    PRIORITY = "حسب الأولوية"
+    
+    PRIORITY_COLORS = {'عاجل': '#e74c3c', 'مهم': '#f39c12', 'عادي': '#3498db'}
+    
+    # التحقق من وجود المكتبة بدون استيرادها
+    available = importlib.util.find_spec('matplotlib') is not None
+    
+    def __init__(self, widget, db_manager, cache_size=8, dpi=80):
+        self.db_manager = db_manager
+        self.cache_size = cache_size
+        self.dpi = dpi
+        
+        # شكل واحد لكل نوع رسم مع عناصره القابلة للتحديث
+        self._figures = {}
+        self._cache = OrderedDict()
+        
+        self._builders = {
+            self.MONTHLY: (self._monthly_data, self._draw_monthly, (12, 6)),
+            self.STATUS: (self._status_data, self._draw_status, (15, 6)),
+            self.PRIORITY: (self._priority_data, self._draw_priority, (10, 6)),
+        }
+        
+        self.runner = BackgroundQueryRunner(widget, db_manager, delay_ms=0)
+    
+    def render(self, chart_type, callback):
+        """رسم المخطط في الخلفية ثم تمرير صورة PhotoImage إلى callback (أو None)"""
+        self.runner.submit(
+            lambda: self._render_png(chart_type),
+            lambda png: callback(self._to_photo(png))
+        )
+    
+    def _to_photo(self, png):
+        """تحويل بيانات PNG إلى صورة Tk (في الخيط الرئيسي)"""
+        if png is None:
+            return None
+        return tk.PhotoImage(data=base64.b64encode(png).decode('ascii'))
+    
+    def _render_png(self, chart_type):
+        """تجهيز البيانات ورسم المخطط إلى PNG (في الخيط الخلفي)"""
+        if chart_type not in self._builders:
+            return None
+        
+        cache_key = (chart_type, self.db_manager.get_data_version(), date.today().isoformat()[:7])
+        if cache_key in self._cache:
+            self._cache.move_to_end(cache_key)
+            return self._cache[cache_key]
+        
+        if not self.available:
+            return None
+        
+        fetch_data, draw, figsize = self._builders[chart_type]
+        data = fetch_data()
+        if data is None:
+            png = None
+        else:
+            figure, canvas, state = self._get_figure(chart_type, figsize)
+            draw(figure, state, data)
+            figure.tight_layout()
+            
+            buffer = io.BytesIO()
+            canvas.print_png(buffer)
+            png = buffer.getvalue()
+        
+        self._cache[cache_key] = png
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return png
+    
+    def _get_figure(self, chart_type, figsize):
+        """الحصول على الشكل المحفوظ لنوع الرسم أو إنشاؤه أول مرة"""
+        if chart_type not in self._figures:
+            Figure, FigureCanvasAgg = load_matplotlib()
+            figure = Figure(figsize=figsize, dpi=self.dpi)
+            canvas = FigureCanvasAgg(figure)
+            self._figures[chart_type] = (figure, canvas, {})
+        return self._figures[chart_type]
+    
+    # تجهيز البيانات
+    def _monthly_data(self):
+        """بيانات الأشهر الـ 12 الماضية"""
+        statistics = self.db_manager.statistics
+        months = statistics.last_months(12)
+        window_start = statistics.period_range(months[0])[0]
+        window_end = statistics.period_range(months[-1])[1]
+        return self.db_manager.get_time_series(window_start, window_end, 'month')
+    
+    def _status_data(self):
+        """توزيع الحالات من لقطة الإحصائيات"""
+        snapshot = self.db_manager.statistics.snapshot()
+        return snapshot['incoming_by_status'], snapshot['outgoing_by_status']
+    
+    def _priority_data(self):
+        """توزيع الأولويات من لقطة الإحصائيات"""
+        priorities = self.db_manager.statistics.snapshot()['by_priority']
+        return priorities or None
+    
+    # الرسم
+    def _draw_monthly(self, figure, state, months_data):
+        """رسم أعمدة شهرية (تحديث ارتفاع الأعمدة إذا كانت موجودة)"""
+        months = [data['period'] for data in months_data]
+        incoming_counts = [data['incoming'] for data in months_data]
+        outgoing_counts = [data['outgoing'] for data in months_data]
+        x = range(len(months))
+        width = 0.35
+        
+        if 'ax' not in state or len(state['incoming_bars']) != len(months):
+            figure.clear()
+            ax = figure.add_subplot(111)
+            state['ax'] = ax
+            state['incoming_bars'] = ax.bar([i - width/2 for i in x], incoming_counts, width, label='واردة', color='#3498db')
+            state['outgoing_bars'] = ax.bar([i + width/2 for i in x], outgoing_counts, width, label='صادرة', color='#2ecc71')
+            ax.set_xlabel('الشهر')
+            ax.set_ylabel('عدد المراسلات')
+            ax.set_title('إحصائيات المراسلات الشهرية')
+            ax.set_xticks(list(x))
+            ax.legend()
+        else:
+            for bar, value in zip(state['incoming_bars'], incoming_counts):
+                bar.set_height(value)
+            for bar, value in zip(state['outgoing_bars'], outgoing_counts):
+                bar.set_height(value)
+        
+        ax = state['ax']
+        ax.set_xticklabels(months, rotation=45)
+        ax.relim()
+        ax.autoscale_view()
+    
+    def _draw_status(self, figure, state, data):
+        """رسم دائري للحالات (الواردة والصادرة)"""
+        incoming_statuses, outgoing_statuses = data
+        
+        if 'axes' not in state:
+            figure.clear()
+            state['axes'] = (figure.add_subplot(121), figure.add_subplot(122))
+        
+        titles = ('المراسلات الواردة حسب الحالة', 'المراسلات الصادرة حسب الحالة')
+        for ax, statuses, title in zip(state['axes'], (incoming_statuses, outgoing_statuses), titles):
+            # تفريغ المحور وإعادة استخدامه بدلاً من إنشاء شكل جديد
+            ax.clear()
+            ax.set_axis_off()
+            if statuses:
+                ax.set_axis_on()
+                ax.pie(list(statuses.values()), labels=list(statuses.keys()), autopct='%1.1f%%', startangle=90)
+                ax.set_title(title)
+    
+    def _draw_priority(self, figure, state, priority_data):
+        """رسم أعمدة حسب الأولوية"""
+        if 'ax' not in state:
+            figure.clear()
+            state['ax'] = figure.add_subplot(111)
+        
+        ax = state['ax']
+        ax.clear()
+        
+        priorities = sorted(p for p in priority_data if p)
+        counts = [priority_data[p] for p in priorities]
+        bar_colors = [self.PRIORITY_COLORS.get(p, '#95a5a6') for p in priorities]
+        
+        ax.bar(priorities, counts, color=bar_colors)
+        ax.set_xlabel('الأولوية')
+        ax.set_ylabel('عدد المراسلات')
+        ax.set_title('توزيع المراسلات حسب الأولوية')
+        
+        # إضافة القيم على الأعمدة
+        for i, v in enumerate(counts):
+            ax.text(i, v + 0.1, str(v), ha='center', va='bottom')
+    
+    def close(self):
+        """إيقاف الخيط الخلفي وتحرير الأشكال"""
+        self.runner.close()
+        for figure, _, _ in self._figures.values():
+            figure.clear()
+        self._figures.clear()
+        self._cache.clear()
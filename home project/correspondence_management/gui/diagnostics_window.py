@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نافذة تشخيص أداء الاستعلامات
+Query Diagnostics Window
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from datetime import datetime
+
+from query_profiler import save_snapshot
+
+class DiagnosticsWindow:
+    """إحصائيات QueryProfiler: أبطأ الجمل وخطط تنفيذها والاستعلامات البطيئة الأخيرة"""
+    
+    def __init__(self, parent, db_manager):
+        self.db_manager = db_manager
+        self.statements = {}
+        
+        # إنشاء النافذة (غير مقيدة حتى يمكن استخدام البرنامج أثناء المراقبة)
+        self.window = tk.Toplevel(parent)
+        self.setup_window()
+        self.create_widgets()
+        self.load_data()
+    
+    def setup_window(self):
+        """إعداد النافذة"""
+        self.window.title("تشخيص أداء الاستعلامات")
+        self.window.geometry("1100x700")
+        
+        # توسيط النافذة
+        self.window.update_idletasks()
+        x = (self.window.winfo_screenwidth() // 2) - (1100 // 2)
+        y = (self.window.winfo_screenheight() // 2) - (700 // 2)
+        self.window.geometry(f"1100x700+{x}+{y}")
+        
+        self.window.transient(self.window.master)
+    
+    def create_widgets(self):
+        """إنشاء عناصر الواجهة"""
+        main_frame = ttk.Frame(self.window)
+        main_frame.pack(fill='both', expand=True, padx=20, pady=20)
+        
+        # العنوان
+        title_label = tk.Label(
+            main_frame,
+            text="تشخيص أداء الاستعلامات",
+            font=('Arial Unicode MS', 16, 'bold'),
+            fg='#2c3e50'
+        )
+        title_label.pack(pady=(0, 10))
+        
+        # الإعدادات والأزرار
+        controls_frame = ttk.Frame(main_frame)
+        controls_frame.pack(fill='x', pady=(0, 10))
+        
+        ttk.Label(controls_frame, text="حد الاستعلام البطيء (ms):").pack(side='right', padx=5)
+        self.slow_ms_var = tk.StringVar()
+        slow_spinbox = ttk.Spinbox(
+            controls_frame, from_=1, to=10000, increment=10,
+            textvariable=self.slow_ms_var, width=8, command=self.apply_settings
+        )
+        slow_spinbox.pack(side='right', padx=5)
+        slow_spinbox.bind('<Return>', lambda e: self.apply_settings())
+        
+        self.trace_var = tk.BooleanVar()
+        ttk.Checkbutton(
+            controls_frame, text="تتبع كل الجمل المنفذة",
+            variable=self.trace_var, command=self.toggle_trace
+        ).pack(side='right', padx=15)
+        
+        ttk.Button(controls_frame, text="إغلاق", command=self.window.destroy).pack(side='left', padx=5)
+        ttk.Button(controls_frame, text="حفظ JSON", command=self.save_json).pack(side='left', padx=5)
+        ttk.Button(controls_frame, text="تصفير", command=self.reset).pack(side='left', padx=5)
+        ttk.Button(controls_frame, text="تحديث", command=self.load_data).pack(side='left', padx=5)
+        
+        # ملخص
+        self.summary_label = ttk.Label(main_frame, text="", anchor='e')
+        self.summary_label.pack(fill='x', pady=(0, 10))
+        
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(fill='both', expand=True)
+        
+        # الجمل مرتبة حسب الزمن الكلي مع تفاصيل الجملة المحددة
+        statements_frame = ttk.Frame(notebook)
+        notebook.add(statements_frame, text="الجمل")
+        self.statements_tree = self.create_tree(statements_frame, (
+            ('sql', 'الجملة', 420, 'w'),
+            ('count', 'المرات', 70, 'center'),
+            ('avg_ms', 'المتوسط', 80, 'center'),
+            ('p95_ms', 'p95 حتى', 80, 'center'),
+            ('max_ms', 'الأقصى', 80, 'center'),
+            ('total_ms', 'الإجمالي', 90, 'center'),
+            ('rows', 'الصفوف', 80, 'center'),
+            ('errors', 'أخطاء', 60, 'center'),
+        ), height=12)
+        self.statements_tree.tag_configure('full_scan', background='#fae8e8')  # أحمر فاتح
+        self.statements_tree.tag_configure('error', background='#fff6e0')      # برتقالي فاتح
+        self.statements_tree.bind('<<TreeviewSelect>>', self.on_statement_select)
+        
+        self.details_text = tk.Text(statements_frame, height=10, wrap='none', font=('Courier New', 10))
+        self.details_text.pack(fill='x', pady=(10, 0))
+        
+        # آخر الاستعلامات البطيئة
+        slow_frame = ttk.Frame(notebook)
+        notebook.add(slow_frame, text="الاستعلامات البطيئة")
+        self.slow_tree = self.create_tree(slow_frame, (
+            ('at', 'الوقت', 150, 'center'),
+            ('ms', 'الزمن (ms)', 90, 'center'),
+            ('rows', 'الصفوف', 80, 'center'),
+            ('sql', 'الجملة', 680, 'w'),
+        ))
+        
+        # كل الجمل المنفذة على الاتصالات (عند تفعيل التتبع)
+        traced_frame = ttk.Frame(notebook)
+        notebook.add(traced_frame, text="التتبع")
+        self.traced_tree = self.create_tree(traced_frame, (
+            ('count', 'المرات', 80, 'center'),
+            ('sql', 'الجملة', 920, 'w'),
+        ))
+    
+    def create_tree(self, parent, columns, height=20):
+        """جدول مع شريطي تمرير: columns = (الاسم, العنوان, العرض, المحاذاة)"""
+        table_frame = ttk.Frame(parent)
+        table_frame.pack(fill='both', expand=True)
+        
+        tree = ttk.Treeview(table_frame, columns=[column[0] for column in columns], show='headings', height=height)
+        for name, title, width, anchor in columns:
+            tree.heading(name, text=title)
+            tree.column(name, width=width, anchor=anchor)
+        
+        scrollbar_v = ttk.Scrollbar(table_frame, orient='vertical', command=tree.yview)
+        scrollbar_h = ttk.Scrollbar(table_frame, orient='horizontal', command=tree.xview)
+        tree.configure(yscrollcommand=scrollbar_v.set, xscrollcommand=scrollbar_h.set)
+        
+        tree.grid(row=0, column=0, sticky='nsew')
+        scrollbar_v.grid(row=0, column=1, sticky='ns')
+        scrollbar_h.grid(row=1, column=0, sticky='ew')
+        table_frame.grid_rowconfigure(0, weight=1)
+        table_frame.grid_columnconfigure(0, weight=1)
+        return tree
+    
+    def load_data(self):
+        """تحميل الإحصائيات الحالية"""
+        try:
+            snapshot = self.db_manager.profiler.snapshot()
+        except Exception as e:
+            messagebox.showerror("خطأ", f"تعذر تحميل إحصائيات الاستعلامات: {e}", parent=self.window)
+            return
+        
+        self.slow_ms_var.set(f"{snapshot['slow_ms']:g}")
+        self.trace_var.set(snapshot['trace'])
+        
+        full_scans = sum(1 for statement in snapshot['statements'] if statement['full_scans'])
+        self.summary_label.config(text=(
+            f"منذ {snapshot['started_at'].replace('T', ' ')}   |   "
+            f"الجمل: {len(snapshot['statements'])}   |   "
+            f"الاستعلامات البطيئة: {len(snapshot['slow_queries'])}   |   "
+            f"جمل بمسح كامل للجدول: {full_scans}"
+        ))
+        
+        for tree in (self.statements_tree, self.slow_tree, self.traced_tree):
+            tree.delete(*tree.get_children())
+        self.details_text.delete('1.0', 'end')
+        
+        self.statements = {}
+        for index, statement in enumerate(snapshot['statements']):
+            iid = str(index)
+            self.statements[iid] = statement
+            tags = ('full_scan',) if statement['full_scans'] else ('error',) if statement['errors'] else ()
+            p95 = statement['p95_ms']
+            self.statements_tree.insert('', 'end', iid=iid, values=(
+                statement['sql'][:200],
+                statement['count'],
+                f"{statement['avg_ms']:.2f}",
+                p95 if p95 is not None else '-',
+                f"{statement['max_ms']:.1f}",
+                f"{statement['total_ms']:.1f}",
+                statement['rows'],
+                statement['errors'] or '-'
+            ), tags=tags)
+        
+        for slow in reversed(snapshot['slow_queries']):
+            self.slow_tree.insert('', 'end', values=(
+                slow['at'].replace('T', ' '),
+                slow['ms'],
+                slow['rows'] if slow['rows'] is not None else '-',
+                slow['sql'][:300]
+            ))
+        
+        for traced in snapshot['traced']:
+            self.traced_tree.insert('', 'end', values=(traced['count'], traced['sql'][:300]))
+    
+    def on_statement_select(self, event=None):
+        """الجملة كاملة وتوزيع الأزمنة وخطة التنفيذ"""
+        selection = self.statements_tree.selection()
+        if not selection:
+            return
+        statement = self.statements[selection[0]]
+        
+        lines = [statement['sql'], '', "توزيع الأزمنة:"]
+        lines += [f"  {label:>10}  {count}" for label, count in statement['histogram'].items() if count]
+        if statement['last_error']:
+            lines += ['', f"آخر خطأ: {statement['last_error']}"]
+        lines += ['', "خطة التنفيذ:"]
+        if statement['plan']:
+            lines += [f"  {step}" for step in statement['plan']]
+        else:
+            lines.append("  (تُحسب عند تجاوز حد الاستعلام البطيء)")
+        if statement['full_scans']:
+            lines += ['', "مسح كامل: " + "، ".join(statement['full_scans'])]
+        
+        self.details_text.delete('1.0', 'end')
+        self.details_text.insert('1.0', '\n'.join(lines))
+    
+    def apply_settings(self):
+        """تطبيق حد الاستعلام البطيء"""
+        try:
+            slow_ms = float(self.slow_ms_var.get())
+        except ValueError:
+            messagebox.showerror("خطأ", "حد الاستعلام البطيء يجب أن يكون رقماً", parent=self.window)
+            return
+        self.db_manager.profiler.configure(slow_ms=slow_ms)
+    
+    def toggle_trace(self):
+        """تفعيل أو إلغاء تتبع كل الجمل"""
+        self.db_manager.set_query_trace(self.trace_var.get())
+    
+    def reset(self):
+        """بدء القياس من جديد"""
+        self.db_manager.profiler.reset()
+        self.load_data()
+    
+    def save_json(self):
+        """حفظ الإحصائيات في ملف JSON"""
+        path = filedialog.asksaveasfilename(
+            parent=self.window,
+            title="حفظ إحصائيات الاستعلامات",
+            defaultextension=".json",
+            initialfile=f"query_profile_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
+            filetypes=[("JSON", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            save_snapshot(self.db_manager.profiler.snapshot(), path)
+            messagebox.showinfo("تم", f"تم حفظ الإحصائيات في:\n{path}", parent=self.window)
+        except Exception as e:
+            messagebox.showerror("خطأ", f"تعذر حفظ الملف: {e}", parent=self.window)
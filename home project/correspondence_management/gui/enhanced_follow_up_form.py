@@ -10,6 +10,8 @@ from tkinter import ttk, messagebox
 from datetime import datetime, date
 import re
 
+from gui.typeahead_combobox import TypeaheadCombobox
+
 class EnhancedFollowUpForm:
     def __init__(self, parent, db_manager, auth_manager, user_data, 
                  follow_up_id=None, callback=None):
@@ -114,14 +116,18 @@ class EnhancedFollowUpForm:
         correspondence_frame = tk.Frame(fields_frame, bg='white')
         correspondence_frame.grid(row=2, column=1, sticky='ew', padx=(10, 0), pady=5)
         
+        # البحث برقم المراسلة أو كود الموضوع أو الموضوع أثناء الكتابة
         self.correspondence_var = tk.StringVar()
-        self.correspondence_combo = ttk.Combobox(
+        self.current_type = 'incoming'
+        self.correspondence_combo = TypeaheadCombobox(
             correspondence_frame,
+            self.db_manager,
+            self.search_correspondence,
             textvariable=self.correspondence_var,
-            state="readonly",
             font=('Arial Unicode MS', 10),
             width=50
         )
+        self.correspondence_data = self.correspondence_combo.mapping
         self.correspondence_combo.pack(side='left', fill='x', expand=True)
         self.correspondence_combo.bind('<<ComboboxSelected>>', self.on_correspondence_change)
         
@@ -307,58 +313,31 @@ class EnhancedFollowUpForm:
                 self.status_var.set("معلق")
                 return
     
+    def correspondence_option(self, row, correspondence_type):
+        """نص العرض وبيانات المراسلة لعنصر في القائمة"""
+        display_text = f"{row['reference_number']} - {row['subject'][:50]}..."
+        code_part = (row['subject_code'] or 'CHR') if correspondence_type == "incoming" else 'OUT'
+        return display_text, {
+            'id': row['id'],
+            'reference_number': row['reference_number'],
+            'subject_code': code_part
+        }
+    
+    def search_correspondence(self, prefix):
+        """المراسلات غير المغلقة المطابقة للنص المكتوب (من قوائم الاختيار المشتركة)"""
+        correspondence_type = self.current_type
+        rows = self.db_manager.lookups.search_correspondence(correspondence_type, prefix, open_only=True)
+        return [self.correspondence_option(row, correspondence_type) for row in rows]
+    
     def refresh_correspondence_list(self):
         """تحديث قائمة المراسلات (استبعاد المغلقة)"""
-        correspondence_type = self.correspondence_type_var.get()
-        
-        if correspondence_type == "incoming":
-            # جلب المراسلات الواردة غير المغلقة
-            query = '''
-                SELECT ic.id, ic.reference_number, ic.subject_code, ic.subject
-                FROM incoming_correspondence ic
-                LEFT JOIN follow_up fu ON ic.id = fu.correspondence_id 
-                    AND fu.correspondence_type = 'incoming'
-                WHERE fu.status IS NULL OR fu.status != 'مغلق'
-                ORDER BY ic.received_date DESC
-            '''
-        else:
-            # جلب المراسلات الصادرة غير المغلقة
-            query = '''
-                SELECT oc.id, oc.reference_number, oc.subject, '' as subject_code
-                FROM outgoing_correspondence oc
-                LEFT JOIN follow_up fu ON oc.id = fu.correspondence_id 
-                    AND fu.correspondence_type = 'outgoing'
-                WHERE fu.status IS NULL OR fu.status != 'مغلق'
-                ORDER BY oc.sent_date DESC
-            '''
+        self.current_type = self.correspondence_type_var.get()
         
         try:
-            data = self.db_manager.execute_query(query)
-            
-            # تحديث القائمة المنسدلة
-            correspondence_list = []
-            self.correspondence_data = {}
+            self.correspondence_combo.clear()
+            self.correspondence_combo.reload()
             
-            for row in data:
-                if correspondence_type == "incoming":
-                    display_text = f"{row['reference_number']} - {row['subject'][:50]}..."
-                    code_part = row['subject_code'] or 'CHR'
-                else:
-                    display_text = f"{row['reference_number']} - {row['subject'][:50]}..."
-                    code_part = 'OUT'
-                
-                correspondence_list.append(display_text)
-                self.correspondence_data[display_text] = {
-                    'id': row['id'],
-                    'reference_number': row['reference_number'],
-                    'subject_code': code_part
-                }
-            
-            self.correspondence_combo['values'] = correspondence_list
-            
-            if correspondence_list:
-                self.correspondence_combo.set('')
-            else:
+            if not self.correspondence_data:
                 messagebox.showinfo("تنبيه", "لا توجد مراسلات متاحة للمتابعة")
                 
         except Exception as e:
@@ -379,24 +358,19 @@ class EnhancedFollowUpForm:
         # الحصول على كود الموضوع
         subject_code = correspondence_info['subject_code']
         
-        # الحصول على رقم المتابعة التالي لهذه المراسلة
-        query = '''
-            SELECT COUNT(*) as count 
-            FROM follow_up 
-            WHERE correspondence_id = ? AND correspondence_type = ?
-        '''
-        result = self.db_manager.execute_query(query, (correspondence_info['id'], correspondence_type))
-        
-        follow_up_number = (result[0]['count'] + 1) if result else 1
+        # رقم المتابعة التالي لهذه المراسلة (يُحجز فعلياً عند الحفظ)
+        series = self.db_manager.sequences.follow_up_series(correspondence_type, correspondence_info['id'])
+        follow_up_number = self.db_manager.sequences.peek(series)
         
         # تكوين الكود النهائي
         follow_up_code = f"{type_prefix}-{subject_code}-{follow_up_number}"
         
+        self.auto_follow_up_code = (follow_up_code, series, f"{type_prefix}-{subject_code}-")
         self.follow_up_code_var.set(follow_up_code)
     
     def validate_data(self):
         """التحقق من صحة البيانات"""
-        if not self.correspondence_var.get():
+        if self.correspondence_var.get() not in self.correspondence_data:
             messagebox.showerror("خطأ", "يرجى اختيار المراسلة المرتبطة")
             return False
         
@@ -459,7 +433,8 @@ class EnhancedFollowUpForm:
         
         def verify():
             password = password_var.get()
-            user_data = self.auth_manager.authenticate(self.user_data['username'], password)
+            # تحقق بدون تسجيل دخول جديد (التحققات المتكررة من الذاكرة)
+            user_data = self.auth_manager.verify_user(self.user_data['username'], password)
             
             if user_data and self.auth_manager.has_permission('edit_closed_follow_up'):
                 result['verified'] = True
@@ -546,15 +521,23 @@ class EnhancedFollowUpForm:
             data['status'], data['notes'], self.user_data['id']
         )
         
-        result = self.db_manager.execute_update(query, params)
-        
-        if result:
-            # تسجيل النشاط
+        # حجز رقم المتابعة والإدراج وتسجيل النشاط في معاملة واحدة
+        # المشغلات تحدث عداد المتابعات في جدول المراسلات أيضاً
+        tables = ('follow_up', 'incoming_correspondence', 'outgoing_correspondence', 'sequences', 'activity_log')
+        with self.db_manager.transaction(tables=tables) as cursor:
+            auto_code = getattr(self, 'auto_follow_up_code', None)
+            if auto_code and data['follow_up_code'] == auto_code[0]:
+                _, series, code_prefix = auto_code
+                data['follow_up_code'] = f"{code_prefix}{self.db_manager.sequences.allocate(series, cursor)}"
+                params = (data['follow_up_code'],) + params[1:]
+            
+            cursor.execute(query, params)
             self.db_manager.log_activity(
                 user_id=self.user_data['id'],
                 action=f"إضافة متابعة {data['follow_up_code']}",
                 table_name="follow_up",
-                record_id=result
+                record_id=cursor.lastrowid,
+                cursor=cursor
             )
     
     def update_follow_up(self, data):
@@ -598,12 +581,10 @@ class EnhancedFollowUpForm:
             # تحديث قائمة المراسلات أولاً
             self.refresh_correspondence_list()
             
-            # البحث عن المراسلة المرتبطة وتحديدها
-            correspondence_id = record['correspondence_id']
-            for display_text, info in self.correspondence_data.items():
-                if info['id'] == correspondence_id:
-                    self.correspondence_var.set(display_text)
-                    break
+            # تحديد المراسلة المرتبطة (حتى لو لم تكن ضمن القائمة المعروضة)
+            row = self.db_manager.lookups.correspondence_by_id(record['correspondence_type'], record['correspondence_id'])
+            if row:
+                self.correspondence_combo.set_value(*self.correspondence_option(row, record['correspondence_type']))
             
             # تعيين التاريخ
             try:
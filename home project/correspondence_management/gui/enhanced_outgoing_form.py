@@ -10,6 +10,8 @@ from tkinter import ttk, messagebox
 from datetime import datetime, date
 import re
 
+from gui.typeahead_combobox import TypeaheadCombobox
+
 class EnhancedOutgoingForm:
     def __init__(self, parent, db_manager, auth_manager, user_data, 
                  correspondence_id=None, callback=None):
@@ -218,13 +220,16 @@ class EnhancedOutgoingForm:
         related_frame = tk.Frame(fields_frame, bg='white')
         related_frame.grid(row=5, column=1, sticky='ew', padx=(10, 0), pady=5)
         
+        # البحث برقم المراسلة أو كود الموضوع أو الموضوع أثناء الكتابة
         self.related_incoming_var = tk.StringVar()
-        self.related_combo = ttk.Combobox(
+        self.related_combo = TypeaheadCombobox(
             related_frame,
+            self.db_manager,
+            self.search_incoming,
             textvariable=self.related_incoming_var,
-            state="readonly",
             font=('Arial Unicode MS', 10)
         )
+        self.incoming_data = self.related_combo.mapping
         self.related_combo.pack(side='left', fill='x', expand=True)
         
         # زر تحديث قائمة المراسلات الواردة
@@ -399,15 +404,12 @@ class EnhancedOutgoingForm:
     def generate_reference_number(self):
         """توليد رقم المراسلة التلقائي"""
         try:
-            # الحصول على آخر رقم مراسلة
-            query = "SELECT MAX(id) as max_id FROM outgoing_correspondence"
-            result = self.db_manager.execute_query(query)
-            
-            next_id = (result[0]['max_id'] + 1) if result and result[0]['max_id'] else 1
+            # الرقم التالي في التسلسل (يُحجز فعلياً عند الحفظ)
+            next_id = self.db_manager.sequences.peek('outgoing')
             
             # تنسيق الرقم
-            reference_number = f"{next_id}"
-            self.reference_var.set(reference_number)
+            self.auto_reference_number = f"{next_id}"
+            self.reference_var.set(self.auto_reference_number)
             
         except Exception as e:
             print(f"خطأ في توليد رقم المراسلة: {e}")
@@ -452,26 +454,15 @@ class EnhancedOutgoingForm:
     def generate_subject_code(self):
         """توليد كود الموضوع التلقائي"""
         try:
-            # الحصول على آخر كود موضوع
-            query = "SELECT subject_code FROM outgoing_correspondence WHERE subject_code IS NOT NULL ORDER BY id DESC LIMIT 1"
-            result = self.db_manager.execute_query(query)
+            # السلسلة حسب البادئة والحروف الحالية في النموذج (OUT-CHR افتراضياً)
+            prefix = self.code_prefix_var.get().strip().upper() or "OUT"
+            letters = re.match(r'^[A-Z]{0,3}', self.code_suffix_var.get().strip().upper()).group(0) or "CHR"
             
-            if result and result[0]['subject_code']:
-                last_code = result[0]['subject_code']
-                # استخراج الرقم من الكود (XXX-XXXX)
-                match = re.search(r'([A-Z]{1,3})-([A-Z]{0,3})(\d+)', last_code)
-                if match:
-                    prefix = match.group(1)  # OUT
-                    letters = match.group(2)  # CHR
-                    number = int(match.group(3)) + 1
-                    new_suffix = f"{letters}{number}"
-                else:
-                    prefix = "OUT"
-                    new_suffix = "CHR1"
-            else:
-                prefix = "OUT"
-                new_suffix = "CHR1"
+            # الرقم التالي في التسلسل (يُحجز فعلياً عند الحفظ)
+            number = self.db_manager.sequences.peek(self.db_manager.sequences.subject_series(prefix, letters))
+            new_suffix = f"{letters}{number}"
             
+            self.auto_subject_code = f"{prefix}-{new_suffix}"
             self.code_prefix_var.set(prefix)
             self.code_suffix_var.set(new_suffix)
             
@@ -482,29 +473,21 @@ class EnhancedOutgoingForm:
     
 
     
+    @staticmethod
+    def incoming_display_text(row):
+        """نص عرض المراسلة الواردة في القائمة"""
+        return f"{row['subject_code'] or 'CHR'} - {row['subject'][:40]}..."
+    
+    def search_incoming(self, prefix):
+        """المراسلات الواردة المطابقة للنص المكتوب (من قوائم الاختيار المشتركة)"""
+        rows = self.db_manager.lookups.search_correspondence('incoming', prefix)
+        # خيار فارغ لأن الربط اختياري
+        return [("", None)] + [(self.incoming_display_text(row), row['id']) for row in rows]
+    
     def refresh_incoming_list(self):
         """تحديث قائمة المراسلات الواردة"""
         try:
-            query = '''
-                SELECT id, reference_number, subject_code, subject
-                FROM incoming_correspondence
-                ORDER BY received_date DESC
-                LIMIT 50
-            '''
-            
-            data = self.db_manager.execute_query(query)
-            
-            # تحديث القائمة المنسدلة
-            incoming_list = [""]  # خيار فارغ للاختياري
-            self.incoming_data = {"": None}
-            
-            for row in data:
-                display_text = f"{row['subject_code'] or 'CHR'} - {row['subject'][:40]}..."
-                incoming_list.append(display_text)
-                self.incoming_data[display_text] = row['id']
-            
-            self.related_combo['values'] = incoming_list
-            
+            self.related_combo.reload()
         except Exception as e:
             messagebox.showerror("خطأ", f"فشل في تحديث قائمة المراسلات الواردة: {e}")
     
@@ -639,17 +622,45 @@ class EnhancedOutgoingForm:
             data['related_incoming_id'], self.user_data['id']
         )
         
-        result = self.db_manager.execute_update(query, params)
-        
-        if result:
-            # تسجيل النشاط
+        # حجز الأرقام والإدراج وتسجيل النشاط في معاملة واحدة
+        with self.db_manager.transaction(tables=('outgoing_correspondence', 'sequences', 'activity_log')) as cursor:
+            data['reference_number'] = self.reserve_reference_number(data['reference_number'], cursor)
+            data['subject_code'] = self.reserve_subject_code(data['subject_code'], cursor)
+            params = (data['reference_number'], data['subject_code']) + params[2:]
+            
+            cursor.execute(query, params)
             self.db_manager.log_activity(
                 user_id=self.user_data['id'],
                 action=f"إضافة مراسلة صادرة {data['reference_number']}",
                 table_name="outgoing_correspondence",
-                record_id=result
+                record_id=cursor.lastrowid,
+                cursor=cursor
             )
     
+    def reserve_reference_number(self, reference_number, cursor):
+        """حجز رقم المراسلة من التسلسل إذا كان تلقائياً، أو تقديم التسلسل بعد الرقم اليدوي"""
+        if reference_number == getattr(self, 'auto_reference_number', None):
+            return str(self.db_manager.sequences.allocate('outgoing', cursor))
+        if reference_number.isdigit():
+            self.db_manager.sequences.advance_to('outgoing', int(reference_number), cursor)
+        return reference_number
+    
+    def reserve_subject_code(self, subject_code, cursor):
+        """حجز كود الموضوع من التسلسل إذا كان تلقائياً، أو تقديم التسلسل بعد الكود اليدوي"""
+        match = re.fullmatch(r'([A-Z]{1,3})-([A-Z]{0,3})(\d+)', subject_code or '')
+        if not match:
+            return subject_code
+        
+        prefix, letters, number = match.group(1), match.group(2), int(match.group(3))
+        series = self.db_manager.sequences.subject_series(prefix, letters)
+        
+        if subject_code == getattr(self, 'auto_subject_code', None):
+            number = self.db_manager.sequences.allocate(series, cursor)
+            return f"{prefix}-{letters}{number}"
+        
+        self.db_manager.sequences.advance_to(series, number, cursor)
+        return subject_code
+    
     def update_correspondence(self, data):
         """تحديث مراسلة موجودة"""
         query = '''
@@ -666,15 +677,15 @@ class EnhancedOutgoingForm:
             data['related_incoming_id'], self.correspondence_id
         )
         
-        result = self.db_manager.execute_update(query, params)
-        
-        if result is not None:
-            # تسجيل النشاط
+        # التحديث وتسجيل النشاط في معاملة واحدة
+        with self.db_manager.transaction(tables=('outgoing_correspondence', 'sequences', 'activity_log')) as cursor:
+            cursor.execute(query, params)
             self.db_manager.log_activity(
                 user_id=self.user_data['id'],
                 action=f"تحديث مراسلة صادرة {data['reference_number']}",
                 table_name="outgoing_correspondence",
-                record_id=self.correspondence_id
+                record_id=self.correspondence_id,
+                cursor=cursor
             )
     
     def load_data(self):
@@ -745,8 +756,7 @@ class EnhancedOutgoingForm:
             
             # تعيين المراسلة الواردة المرتبطة
             if record['related_incoming_id']:
-                # البحث عن المراسلة الواردة المرتبطة
-                for display_text, incoming_id in self.incoming_data.items():
-                    if incoming_id == record['related_incoming_id']:
-                        self.related_incoming_var.set(display_text)
-                        break
\ No newline at end of file
+                # تحديد المراسلة الواردة المرتبطة حتى لو لم تكن ضمن آخر المراسلات المعروضة
+                row = self.db_manager.lookups.correspondence_by_id('incoming', record['related_incoming_id'])
+                if row:
+                    self.related_combo.set_value(self.incoming_display_text(row), row['id'])
\ No newline at end of file
@@ -9,6 +9,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, date
 
+from gui.typeahead_combobox import TypeaheadCombobox
+
 class FollowUpForm:
     def __init__(self, parent, db_manager, auth_manager, user_data, 
                  correspondence_type=None, correspondence_id=None, 
@@ -89,13 +91,16 @@ class FollowUpForm:
         
         self.create_field(fields_frame, "المراسلة المرتبطة:", row_offset)
         self.correspondence_var = tk.StringVar()
-        self.correspondence_combo = ttk.Combobox(
+        self.current_type = self.correspondence_type or 'incoming'
+        self.correspondence_combo = TypeaheadCombobox(
             fields_frame,
+            self.db_manager,
+            self.search_correspondence,
             textvariable=self.correspondence_var,
-            state="readonly",
             font=('Arial Unicode MS', 10),
             width=40
         )
+        self.correspondence_data = self.correspondence_combo.mapping
         self.correspondence_combo.grid(row=row_offset, column=1, sticky='ew', padx=(10, 0), pady=5)
         
         # تحميل قائمة المراسلات
@@ -232,30 +237,26 @@ class FollowUpForm:
             # تحميل حسب النوع المختار
             self.load_correspondence_by_type('incoming')  # افتراضي
     
+    def search_correspondence(self, prefix):
+        """المراسلات المطابقة للنص المكتوب (من قوائم الاختيار المشتركة)"""
+        rows = self.db_manager.lookups.search_correspondence(self.current_type, prefix)
+        return [(f"{row['reference_number']} - {row['subject'][:50]}", row['id']) for row in rows]
+    
+    def select_correspondence(self, correspondence_id):
+        """تحديد مراسلة بالمعرف حتى لو لم تكن ضمن القائمة المعروضة"""
+        row = self.db_manager.lookups.correspondence_by_id(self.current_type, correspondence_id)
+        if row:
+            self.correspondence_combo.set_value(f"{row['reference_number']} - {row['subject'][:50]}", row['id'])
+    
     def load_correspondence_by_type(self, corr_type):
-        """تحميل المراسلات حسب النوع"""
-        if corr_type == 'incoming':
-            query = "SELECT id, reference_number, subject FROM incoming_correspondence ORDER BY received_date DESC"
-        else:
-            query = "SELECT id, reference_number, subject FROM outgoing_correspondence ORDER BY sent_date DESC"
-        
-        data = self.db_manager.execute_query(query)
-        
-        # تحديث قائمة الخيارات
-        values = []
-        for row in data:
-            display_text = f"{row['reference_number']} - {row['subject'][:50]}"
-            values.append((row['id'], display_text))
-        
-        self.correspondence_combo['values'] = [item[1] for item in values]
-        self.correspondence_data = {item[1]: item[0] for item in values}
+        """تحميل المراسلات حسب النوع (آخر المراسلات، والباقي بالبحث أثناء الكتابة)"""
+        self.current_type = corr_type
+        self.correspondence_combo.clear()
+        self.correspondence_combo.reload()
         
         # تحديد المراسلة إذا كانت محددة مسبقاً
         if self.correspondence_id:
-            for display_text, corr_id in self.correspondence_data.items():
-                if corr_id == self.correspondence_id:
-                    self.correspondence_var.set(display_text)
-                    break
+            self.select_correspondence(self.correspondence_id)
     
     def on_type_change(self, event=None):
         """عند تغيير نوع المراسلة"""
@@ -276,10 +277,7 @@ class FollowUpForm:
                 self.load_correspondence_by_type(record['correspondence_type'])
             
             # تعيين المراسلة المرتبطة
-            for display_text, corr_id in self.correspondence_data.items():
-                if corr_id == record['correspondence_id']:
-                    self.correspondence_var.set(display_text)
-                    break
+            self.select_correspondence(record['correspondence_id'])
             
             # تعيين التاريخ
             try:
@@ -335,7 +333,7 @@ class FollowUpForm:
     
     def validate_data(self):
         """التحقق من صحة البيانات"""
-        if not self.correspondence_var.get():
+        if self.correspondence_var.get() not in self.correspondence_data:
             if self.notify:
                 self.notify("يرجى اختيار المراسلة المرتبطة", type_="error")
             return False
@@ -9,6 +9,11 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, date
 
+from gui.paged_tree import PagedTreeLoader
+from gui.background_query import BackgroundQueryRunner
+from gui.transfer_dialog import TransferDialog
+from gui.change_monitor import ChangeMonitor
+
 class FollowUpTab:
     def __init__(self, parent, db_manager, auth_manager, user_data):
         self.parent = parent
@@ -19,6 +24,9 @@ class FollowUpTab:
         # إنشاء الإطار الرئيسي
         self.frame = ttk.Frame(parent)
         
+        # منفذ البحث في الخلفية
+        self.search_runner = BackgroundQueryRunner(self.frame, self.db_manager)
+        
         # إعداد الخطوط
         self.font_normal = ('Arial Unicode MS', 10)
         self.font_bold = ('Arial Unicode MS', 10, 'bold')
@@ -61,6 +69,13 @@ class FollowUpTab:
             )
             delete_btn.pack(side='right', padx=5)
         
+        export_btn = ttk.Button(
+            buttons_frame,
+            text="تصدير",
+            command=self.export_followups
+        )
+        export_btn.pack(side='right', padx=5)
+        
 
         
         # إطار الفلاتر
@@ -152,7 +167,17 @@ class FollowUpTab:
         # إضافة شريط التمرير
         scrollbar_v = ttk.Scrollbar(parent, orient='vertical', command=self.tree.yview)
         scrollbar_h = ttk.Scrollbar(parent, orient='horizontal', command=self.tree.xview)
-        self.tree.configure(yscrollcommand=scrollbar_v.set, xscrollcommand=scrollbar_h.set)
+        self.tree.configure(xscrollcommand=scrollbar_h.set)
+        
+        # تحميل الصفوف على صفحات عند التمرير
+        self.pager = PagedTreeLoader(self.tree, scrollbar_v, self.insert_row, key_columns=('follow_up_date', 'id'))
+        
+        # تكوين ألوان الصفوف
+        self.tree.tag_configure('pending', background='#fff3e0')      # معلق - أصفر فاتح
+        self.tree.tag_configure('in_progress', background='#e3f2fd')  # جاري - أزرق فاتح
+        self.tree.tag_configure('closed', background='#f5f5f5')       # مغلق - رمادي فاتح
+        self.tree.tag_configure('overdue', background='#ffebee')      # متأخر - أحمر فاتح
+        self.tree.tag_configure('due_today', background='#f3e5f5')    # اليوم - بنفسجي فاتح
         
         # تخطيط الجدول وشريط التمرير
         self.tree.grid(row=0, column=0, sticky='nsew')
@@ -166,70 +191,46 @@ class FollowUpTab:
         # ربط الأحداث
         self.tree.bind('<Double-1>', self.on_double_click)
         self.tree.bind('<Button-3>', self.show_context_menu)
+        self.tree.bind('<Control-a>', self.select_all)
     
     def refresh_data(self):
         """تحديث بيانات الجدول"""
-        # مسح البيانات الحالية
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # جلب البيانات من قاعدة البيانات
-        query = '''
-            SELECT f.id, f.follow_up_code, f.correspondence_type, f.correspondence_id, f.follow_up_date,
-                   f.action_required, f.responsible_person, f.status, f.notes,
-                   CASE 
-                       WHEN f.correspondence_type = 'incoming' THEN ic.reference_number
-                       WHEN f.correspondence_type = 'outgoing' THEN oc.reference_number
-                   END as correspondence_ref
-            FROM follow_up f
-            LEFT JOIN incoming_correspondence ic ON f.correspondence_type = 'incoming' AND f.correspondence_id = ic.id
-            LEFT JOIN outgoing_correspondence oc ON f.correspondence_type = 'outgoing' AND f.correspondence_id = oc.id
-            ORDER BY f.follow_up_date DESC, f.id DESC
-        '''
-        
-        data = self.db_manager.execute_query(query)
-        
-        # إدراج البيانات في الجدول
-        for row in data:
-            # تلوين الصفوف حسب الحالة
-            tags = []
-            if row['status'] == 'معلق':
-                tags.append('pending')
-            elif row['status'] == 'جاري':
-                tags.append('in_progress')
-            elif row['status'] == 'مغلق':
-                tags.append('closed')
-            
-            # تحديد لون حسب تاريخ المتابعة
-            follow_date = datetime.strptime(row['follow_up_date'], '%Y-%m-%d').date()
-            today = date.today()
-            
-            if follow_date < today and row['status'] in ['معلق', 'جاري']:
-                tags.append('overdue')
-            elif follow_date == today and row['status'] in ['معلق', 'جاري']:
-                tags.append('due_today')
-            
-            # تحويل نوع المراسلة للعربية
-            type_display = 'واردة' if row['correspondence_type'] == 'incoming' else 'صادرة'
-            
-            self.tree.insert('', 'end', values=(
-                row['id'],
-                row['follow_up_code'] or '-',
-                type_display,
-                row['correspondence_ref'] or '-',
-                row['follow_up_date'],
-                row['action_required'],
-                row['responsible_person'] or '-',
-                row['status'],
-                row['notes'] or '-'
-            ), tags=tags)
-        
-        # تكوين ألوان الصفوف
-        self.tree.tag_configure('pending', background='#fff3e0')      # معلق - أصفر فاتح
-        self.tree.tag_configure('in_progress', background='#e3f2fd')  # جاري - أزرق فاتح
-        self.tree.tag_configure('closed', background='#f5f5f5')       # مغلق - رمادي فاتح
-        self.tree.tag_configure('overdue', background='#ffebee')      # متأخر - أحمر فاتح
-        self.tree.tag_configure('due_today', background='#f3e5f5')    # اليوم - بنفسجي فاتح
+        self.apply_filters()
+    
+    def insert_row(self, row):
+        """إدراج صف في الجدول"""
+        # تلوين الصفوف حسب الحالة
+        tags = []
+        if row['status'] == 'معلق':
+            tags.append('pending')
+        elif row['status'] == 'جاري':
+            tags.append('in_progress')
+        elif row['status'] == 'مغلق':
+            tags.append('closed')
+        
+        # تحديد لون حسب تاريخ المتابعة
+        follow_date = datetime.strptime(row['follow_up_date'], '%Y-%m-%d').date()
+        today = date.today()
+        
+        if follow_date < today and row['status'] in ['معلق', 'جاري']:
+            tags.append('overdue')
+        elif follow_date == today and row['status'] in ['معلق', 'جاري']:
+            tags.append('due_today')
+        
+        # تحويل نوع المراسلة للعربية
+        type_display = 'واردة' if row['correspondence_type'] == 'incoming' else 'صادرة'
+        
+        self.tree.insert('', 'end', iid=str(row['id']), values=(
+            row['id'],
+            row['follow_up_code'] or '-',
+            type_display,
+            row['correspondence_ref'] or '-',
+            row['follow_up_date'],
+            row['action_required'],
+            row['responsible_person'] or '-',
+            row['status'],
+            row['notes'] or '-'
+        ), tags=tags)
     
     def on_filter_change(self, event=None):
         """تطبيق الفلاتر"""
@@ -237,96 +238,61 @@ class FollowUpTab:
     
     def on_search_change(self, *args):
         """البحث في البيانات"""
-        self.apply_filters()
+        fetch_page = self.build_page_fetcher()
+        
+        # تنفيذ البحث في الخلفية بعد توقف الكتابة
+        self.search_runner.submit(
+            lambda: fetch_page(None),
+            lambda first_page: self.pager.reset(fetch_page, first_page=first_page)
+        )
     
     def apply_filters(self):
         """تطبيق الفلاتر والبحث"""
-        # مسح البيانات الحالية
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # بناء الاستعلام
-        conditions = []
-        params = []
-        
+        # جلب الصفحة الأولى فقط، وباقي الصفحات عند التمرير
+        self.pager.reset(self.build_page_fetcher())
+    
+    def apply_changes(self, changes):
+        """تحديث الصفوف التي تغيرت فقط (من سجل التغييرات)"""
+        row_changes = changes.get('follow_up')
+        if row_changes is None:
+            # تغييرات كثيرة: إعادة تحميل الصفحة الأولى
+            self.refresh_data()
+        else:
+            self.pager.apply_changes(row_changes)
+    
+    def notify_data_changed(self):
+        """طلب تحديث التبويبات بعد التعديل (يتم تحديث الصفوف المتغيرة فقط)"""
+        self.frame.event_generate(ChangeMonitor.DATA_CHANGED)
+    
+    def build_page_fetcher(self):
+        """دالة جلب الصفحات حسب الفلاتر ونص البحث الحاليين"""
         # فلتر الحالة
-        if self.status_var.get() != "الكل":
-            conditions.append("f.status = ?")
-            params.append(self.status_var.get())
+        status = self.status_var.get() if self.status_var.get() != "الكل" else None
         
         # فلتر النوع
+        correspondence_type = None
         if self.type_var.get() != "الكل":
-            type_value = 'incoming' if self.type_var.get() == 'واردة' else 'outgoing'
-            conditions.append("f.correspondence_type = ?")
-            params.append(type_value)
+            correspondence_type = 'incoming' if self.type_var.get() == 'واردة' else 'outgoing'
         
         # البحث
-        search_term = self.search_var.get().strip()
-        if search_term:
-            conditions.append("""(
-                f.action_required LIKE ? OR 
-                f.responsible_person LIKE ? OR 
-                f.notes LIKE ? OR
-                ic.reference_number LIKE ? OR
-                oc.reference_number LIKE ?
-            )""")
-            search_pattern = f'%{search_term}%'
-            params.extend([search_pattern] * 5)
-        
-        # بناء الاستعلام النهائي
-        base_query = '''
-            SELECT f.id, f.correspondence_type, f.correspondence_id, f.follow_up_date,
-                   f.action_required, f.responsible_person, f.status, f.notes,
-                   CASE 
-                       WHEN f.correspondence_type = 'incoming' THEN ic.reference_number
-                       WHEN f.correspondence_type = 'outgoing' THEN oc.reference_number
-                   END as correspondence_ref
-            FROM follow_up f
-            LEFT JOIN incoming_correspondence ic ON f.correspondence_type = 'incoming' AND f.correspondence_id = ic.id
-            LEFT JOIN outgoing_correspondence oc ON f.correspondence_type = 'outgoing' AND f.correspondence_id = oc.id
-        '''
-        
-        if conditions:
-            query = base_query + " WHERE " + " AND ".join(conditions)
-        else:
-            query = base_query
-        
-        query += " ORDER BY f.follow_up_date DESC, f.id DESC"
-        
-        data = self.db_manager.execute_query(query, params if params else None)
-        
-        # إدراج النتائج
-        for row in data:
-            tags = []
-            if row['status'] == 'معلق':
-                tags.append('pending')
-            elif row['status'] == 'قيد التنفيذ':
-                tags.append('in_progress')
-            elif row['status'] == 'مكتمل':
-                tags.append('completed')
-            elif row['status'] == 'ملغي':
-                tags.append('cancelled')
-            
-            follow_date = datetime.strptime(row['follow_up_date'], '%Y-%m-%d').date()
-            today = date.today()
-            
-            if follow_date < today and row['status'] in ['معلق', 'قيد التنفيذ']:
-                tags.append('overdue')
-            elif follow_date == today and row['status'] in ['معلق', 'قيد التنفيذ']:
-                tags.append('due_today')
-            
-            type_display = 'واردة' if row['correspondence_type'] == 'incoming' else 'صادرة'
-            
-            self.tree.insert('', 'end', values=(
-                row['id'],
-                type_display,
-                row['correspondence_ref'] or '-',
-                row['follow_up_date'],
-                row['action_required'],
-                row['responsible_person'] or '-',
-                row['status'],
-                row['notes'] or '-'
-            ), tags=tags)
+        search_term = self.search_var.get().strip() or None
+        
+        def fetch_page(after, ids=None):
+            return self.db_manager.get_follow_up_page(
+                status=status,
+                correspondence_type=correspondence_type,
+                search_term=search_term,
+                after=after,
+                ids=ids
+            )
+        
+        return fetch_page
+    
+    def export_followups(self):
+        """تصدير الجدول الحالي بنفس البحث والفلاتر"""
+        TransferDialog.export_view(
+            self.frame, self.db_manager, self.build_page_fetcher(), 'follow_ups.csv'
+        )
     
     def on_double_click(self, event):
         """عند النقر المزدوج على صف"""
@@ -337,6 +303,10 @@ class FollowUpTab:
         if not self.tree.selection():
             return
         
+        # عدد الصفوف المحددة يظهر مع العمليات الجماعية
+        count = len(self.tree.selection())
+        suffix = f" ({count})" if count > 1 else ""
+        
         context_menu = tk.Menu(self.frame, tearoff=0)
         context_menu.add_command(label="عرض", command=self.view_followup)
         
@@ -347,15 +317,15 @@ class FollowUpTab:
         if self.auth_manager.has_permission('edit_followup'):
             context_menu.add_separator()
             status_menu = tk.Menu(context_menu, tearoff=0)
-            context_menu.add_cascade(label="تغيير الحالة", menu=status_menu)
+            context_menu.add_cascade(label="تغيير الحالة" + suffix, menu=status_menu)
             status_menu.add_command(label="معلق", command=lambda: self.change_status('معلق'))
-            status_menu.add_command(label="قيد التنفيذ", command=lambda: self.change_status('قيد التنفيذ'))
-            status_menu.add_command(label="مكتمل", command=lambda: self.change_status('مكتمل'))
-            status_menu.add_command(label="ملغي", command=lambda: self.change_status('ملغي'))
+            status_menu.add_command(label="جاري", command=lambda: self.change_status('جاري'))
+            if self.auth_manager.has_permission('close_follow_up'):
+                status_menu.add_command(label="مغلق", command=lambda: self.change_status('مغلق'))
         
         if self.auth_manager.has_permission('delete_followup'):
             context_menu.add_separator()
-            context_menu.add_command(label="حذف", command=self.delete_followup)
+            context_menu.add_command(label="حذف" + suffix, command=self.delete_followup)
         
         try:
             context_menu.tk_popup(event.x_root, event.y_root)
@@ -371,7 +341,7 @@ class FollowUpTab:
                 self.db_manager,
                 self.auth_manager,
                 self.user_data,
-                callback=self.refresh_data
+                callback=self.notify_data_changed
             )
         except Exception as e:
             messagebox.showerror("خطأ", f"فشل في فتح نموذج إضافة المتابعة: {e}")
@@ -394,7 +364,7 @@ class FollowUpTab:
                 self.auth_manager,
                 self.user_data,
                 follow_up_id=followup_id,
-                callback=self.refresh_data
+                callback=self.notify_data_changed
             )
         except Exception as e:
             messagebox.showerror("خطأ", f"فشل في فتح نموذج تعديل المتابعة: {e}")
@@ -416,61 +386,64 @@ class FollowUpTab:
             followup_id=followup_id
         )
     
+    def selected_ids(self):
+        """معرفات كل الصفوف المحددة"""
+        return [int(self.tree.item(item)['values'][0]) for item in self.tree.selection()]
+    
+    def select_all(self, event=None):
+        """تحديد كل الصفوف المحملة في الجدول"""
+        self.tree.selection_set(self.tree.get_children())
+        return 'break'
+    
     def delete_followup(self):
-        """حذف المتابعة المحددة"""
-        selected = self.tree.selection()
-        if not selected:
+        """حذف المتابعات المحددة (في معاملة واحدة)"""
+        ids = self.selected_ids()
+        if not ids:
             messagebox.showwarning("تحذير", "يرجى اختيار متابعة للحذف")
             return
         
-        result = messagebox.askyesno("تأكيد الحذف", "هل أنت متأكد من حذف هذه المتابعة؟")
-        if not result:
+        message = "هل أنت متأكد من حذف هذه المتابعة؟" if len(ids) == 1 else f"هل أنت متأكد من حذف {len(ids)} متابعة؟"
+        if not messagebox.askyesno("تأكيد الحذف", message):
             return
         
-        item = self.tree.item(selected[0])
-        followup_id = item['values'][0]
+        deleted = self.db_manager.bulk_delete(
+            'follow_up', ids,
+            user_id=self.user_data['id'],
+            action="حذف متابعة رقم {id}"
+        )
         
-        # حذف المتابعة
-        query = "DELETE FROM follow_up WHERE id = ?"
-        result = self.db_manager.execute_update(query, (followup_id,))
-        
-        if result is not None:
-            # تسجيل النشاط
-            self.db_manager.log_activity(
-                user_id=self.user_data['id'],
-                action=f"حذف متابعة رقم {followup_id}",
-                table_name="follow_up",
-                record_id=followup_id
-            )
-            
-            messagebox.showinfo("نجح", "تم حذف المتابعة بنجاح")
-            self.refresh_data()
+        if deleted is not None:
+            messagebox.showinfo("نجح", "تم حذف المتابعة بنجاح" if len(ids) == 1 else f"تم حذف {deleted} متابعة بنجاح")
+            self.notify_data_changed()
         else:
             messagebox.showerror("خطأ", "فشل في حذف المتابعة")
     
     def change_status(self, new_status):
-        """تغيير حالة المتابعة"""
-        selected = self.tree.selection()
-        if not selected:
+        """تغيير حالة المتابعات المحددة (في معاملة واحدة)"""
+        ids = self.selected_ids()
+        if not ids:
             return
         
-        item = self.tree.item(selected[0])
-        followup_id = item['values'][0]
+        # تحذير عند الإغلاق (نفس تحذير نموذج المتابعة)
+        if new_status == 'مغلق':
+            target = "هذه المتابعة" if len(ids) == 1 else f"{len(ids)} متابعة"
+            if not messagebox.askyesno("تأكيد", f"هل أنت متأكد من إغلاق {target}؟\nلن يمكن تعديلها مرة أخرى إلا بصلاحيات خاصة."):
+                return
+        
+        # المتابعات المغلقة لا يُعاد فتحها إلا بصلاحية تعديل المغلق
+        locked = () if self.auth_manager.has_permission('edit_closed_follow_up') else ('مغلق',)
+        changed = self.db_manager.bulk_update_status(
+            'follow_up', ids, new_status,
+            user_id=self.user_data['id'],
+            action=f"تغيير حالة المتابعة رقم {{id}} إلى {new_status}",
+            locked_statuses=locked
+        )
         
-        # تحديث الحالة
-        query = "UPDATE follow_up SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
-        result = self.db_manager.execute_update(query, (new_status, followup_id))
-        
-        if result is not None:
-            # تسجيل النشاط
-            self.db_manager.log_activity(
-                user_id=self.user_data['id'],
-                action=f"تغيير حالة المتابعة رقم {followup_id} إلى {new_status}",
-                table_name="follow_up",
-                record_id=followup_id
-            )
-            
-            messagebox.showinfo("نجح", f"تم تغيير الحالة إلى {new_status}")
-            self.refresh_data()
+        if changed is not None:
+            if len(ids) == 1 and changed:
+                messagebox.showinfo("نجح", f"تم تغيير الحالة إلى {new_status}")
+            else:
+                messagebox.showinfo("نجح", f"تم تغيير حالة {changed} من {len(ids)} متابعة إلى {new_status}")
+            self.notify_data_changed()
         else:
             messagebox.showerror("خطأ", "فشل في تغيير الحالة")
\ No newline at end of file
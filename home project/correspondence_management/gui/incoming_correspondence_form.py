@@ -390,16 +390,11 @@ class IncomingCorrespondenceForm:
     def set_auto_reference_number(self):
         """تعيين رقم المراسلة تلقائياً"""
         try:
-            # الحصول على آخر رقم مراسلة
-            query = "SELECT MAX(CAST(reference_number AS INTEGER)) as max_ref FROM incoming_correspondence WHERE reference_number GLOB '[0-9]*'"
-            result = self.db_manager.execute_query(query)
+            # الرقم التالي في التسلسل (يُحجز فعلياً عند الحفظ)
+            next_number = self.db_manager.sequences.peek('incoming')
             
-            if result and result[0]['max_ref']:
-                next_number = result[0]['max_ref'] + 1
-            else:
-                next_number = 1
-            
-            self.reference_var.set(str(next_number))
+            self.auto_reference_number = str(next_number)
+            self.reference_var.set(self.auto_reference_number)
             
         except Exception as e:
             # في حالة الخطأ، استخدم التاريخ والوقت
@@ -612,17 +607,28 @@ class IncomingCorrespondenceForm:
             data['priority'], data['status'], data['notes'], self.user_data['id']
         )
         
-        result = self.db_manager.execute_update(query, params)
-        
-        if result:
-            # تسجيل النشاط
+        # حجز الرقم والإدراج وتسجيل النشاط في معاملة واحدة
+        with self.db_manager.transaction(tables=('incoming_correspondence', 'sequences', 'activity_log')) as cursor:
+            data['reference_number'] = self.reserve_reference_number(data['reference_number'], cursor)
+            params = (data['reference_number'],) + params[1:]
+            
+            cursor.execute(query, params)
             self.db_manager.log_activity(
                 user_id=self.user_data['id'],
                 action=f"إضافة مراسلة واردة رقم {data['reference_number']}",
                 table_name="incoming_correspondence",
-                record_id=result
+                record_id=cursor.lastrowid,
+                cursor=cursor
             )
     
+    def reserve_reference_number(self, reference_number, cursor):
+        """حجز رقم المراسلة من التسلسل إذا كان تلقائياً، أو تقديم التسلسل بعد الرقم اليدوي"""
+        if reference_number == getattr(self, 'auto_reference_number', None):
+            return str(self.db_manager.sequences.allocate('incoming', cursor))
+        if reference_number.isdigit():
+            self.db_manager.sequences.advance_to('incoming', int(reference_number), cursor)
+        return reference_number
+    
     def update_correspondence(self, data):
         """تحديث مراسلة موجودة"""
         query = '''
@@ -14,25 +14,61 @@ import os
 # إضافة مسار المشروع
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from gui.incoming_tab import IncomingTab
-from gui.outgoing_tab import OutgoingTab
-from gui.followup_tab import FollowUpTab
-from gui.reports_tab import ReportsTab
-from gui.users_tab import UsersTab
+import importlib
+
+from gui.background_query import BackgroundQueryRunner
+from gui.change_monitor import ChangeMonitor
 
 class MainWindow:
+    # فترة إعادة فحص الموضوعات المتأخرة (بالمللي ثانية)
+    OVERDUE_CHECK_INTERVAL = 15 * 60 * 1000
+    
+    # أرشفة سجل النشاطات: أول تشغيل بعد دقيقة ثم يومياً
+    RETENTION_FIRST_DELAY = 60 * 1000
+    RETENTION_INTERVAL = 24 * 60 * 60 * 1000
+    
+    # التبويبات: (اسم الخاصية, الصلاحية, العنوان, الوحدة, الصنف, الجداول التي يتابعها)
+    # كل تبويب يُنشأ (ويُستورد) عند أول عرض له فقط
+    TABS = (
+        ('incoming_tab', 'view_incoming', "المراسلات الواردة", 'gui.incoming_tab', 'IncomingTab',
+         ('incoming_correspondence',)),
+        ('outgoing_tab', 'view_outgoing', "المراسلات الصادرة", 'gui.outgoing_tab', 'OutgoingTab',
+         ('outgoing_correspondence',)),
+        ('followup_tab', 'view_followup', "متابعة الموضوعات", 'gui.followup_tab', 'FollowUpTab',
+         ('follow_up',)),
+        ('reports_tab', 'view_reports', "التقارير", 'gui.reports_tab', 'ReportsTab',
+         ('incoming_correspondence', 'outgoing_correspondence', 'follow_up')),
+        ('users_tab', 'manage_users', "إدارة المستخدمين", 'gui.users_tab', 'UsersTab',
+         ('users',)),
+    )
+    
     def __init__(self, parent, db_manager, auth_manager, user_data):
         self.parent = parent
         self.db_manager = db_manager
         self.auth_manager = auth_manager
         self.user_data = user_data
         
+        # فحص التأخير يتم في خيط خلفي
+        self.overdue_runner = BackgroundQueryRunner(self.parent, self.db_manager)
+        self.last_overdue_ids = None
+        
+        # النسخ الاحتياطي يتم في خيط خلفي مع عرض التقدم
+        self.backup_runner = BackgroundQueryRunner(self.parent, self.db_manager)
+        self.backup_progress = None
+        
+        # سياسة الاحتفاظ تطبق في الخلفية
+        self.retention_runner = BackgroundQueryRunner(self.parent, self.db_manager)
+        # إجراءات الصيانة اليدوية (منفصلة حتى لا يقاطعها التشغيل الدوري)
+        self.maintenance_runner = BackgroundQueryRunner(self.parent, self.db_manager)
+        
         # إعداد النافذة
         self.setup_window()
         self.create_menu()
         self.create_widgets()
+        self.start_change_monitor()
         self.update_status_bar()
         self.check_overdue_alerts()
+        self.parent.after(self.RETENTION_FIRST_DELAY, self.run_retention)
         
     def setup_window(self):
         """إعداد النافذة الرئيسية"""
@@ -68,6 +104,7 @@ class MainWindow:
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="ملف", menu=file_menu)
         file_menu.add_command(label="نسخة احتياطية", command=self.backup_database)
+        file_menu.add_command(label="نسخة احتياطية تفاضلية", command=self.differential_backup_database)
         file_menu.add_command(label="استعادة", command=self.restore_database)
         file_menu.add_separator()
         file_menu.add_command(label="الإعدادات", command=self.show_settings_window)
@@ -80,6 +117,8 @@ class MainWindow:
             menubar.add_cascade(label="المستخدمين", menu=users_menu)
             users_menu.add_command(label="إدارة المستخدمين", command=self.show_users_tab)
             users_menu.add_command(label="سجل النشاطات", command=self.show_activity_log)
+            users_menu.add_command(label="تشخيص أداء الاستعلامات", command=self.show_diagnostics)
+            users_menu.add_command(label="تفعيل تحرير المساحة التدريجي", command=self.convert_to_incremental_vacuum)
         
         # قائمة المساعدة
         help_menu = tk.Menu(menubar, tearoff=0)
@@ -175,55 +214,58 @@ class MainWindow:
         style = ttk.Style()
         style.configure('TNotebook.Tab', padding=[20, 10])
         
-        # تبويب المراسلات الواردة
-        if self.auth_manager.has_permission('view_incoming'):
-            self.incoming_tab = IncomingTab(
-                self.notebook, 
-                self.db_manager, 
-                self.auth_manager, 
-                self.user_data
-            )
-            self.notebook.add(self.incoming_tab.frame, text="المراسلات الواردة")
-        
-        # تبويب المراسلات الصادرة
-        if self.auth_manager.has_permission('view_outgoing'):
-            self.outgoing_tab = OutgoingTab(
-                self.notebook, 
-                self.db_manager, 
-                self.auth_manager, 
-                self.user_data
-            )
-            self.notebook.add(self.outgoing_tab.frame, text="المراسلات الصادرة")
-        
-        # تبويب المتابعة
-        if self.auth_manager.has_permission('view_followup'):
-            self.followup_tab = FollowUpTab(
-                self.notebook, 
-                self.db_manager, 
-                self.auth_manager, 
-                self.user_data
-            )
-            self.notebook.add(self.followup_tab.frame, text="متابعة الموضوعات")
-        
-        # تبويب التقارير
-        if self.auth_manager.has_permission('view_reports'):
-            self.reports_tab = ReportsTab(
-                self.notebook, 
-                self.db_manager, 
-                self.auth_manager, 
-                self.user_data
-            )
-            self.notebook.add(self.reports_tab.frame, text="التقارير")
+        # إطار فارغ لكل تبويب مسموح به، والتبويب نفسه يُنشأ عند اختياره
+        self.pending_tabs = {}
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        for spec in self.TABS:
+            if self.auth_manager.has_permission(spec[1]):
+                placeholder = ttk.Frame(self.notebook)
+                self.notebook.add(placeholder, text=spec[2])
+                self.pending_tabs[str(placeholder)] = (placeholder, spec)
         
-        # تبويب المستخدمين (للمدير فقط)
-        if self.auth_manager.has_permission('manage_users'):
-            self.users_tab = UsersTab(
-                self.notebook, 
-                self.db_manager, 
-                self.auth_manager, 
-                self.user_data
-            )
-            self.notebook.add(self.users_tab.frame, text="إدارة المستخدمين")
+        # التبويب الظاهر عند الفتح
+        if self.pending_tabs:
+            self.build_tab(self.notebook.select())
+    
+    def on_tab_changed(self, event):
+        """إنشاء التبويب عند أول اختيار له"""
+        self.build_tab(self.notebook.select())
+    
+    def build_tab(self, tab_id):
+        """إنشاء التبويب المؤجل داخل إطاره"""
+        pending = self.pending_tabs.pop(str(tab_id), None)
+        if pending is None:
+            return None
+        
+        placeholder, (name, _, title, module_name, class_name, _) = pending
+        try:
+            tab_class = getattr(importlib.import_module(module_name), class_name)
+            tab = tab_class(placeholder, self.db_manager, self.auth_manager, self.user_data)
+        except Exception as e:
+            print(f"خطأ في إنشاء تبويب {title}: {e}")
+            ttk.Label(placeholder, text=f"تعذر تحميل التبويب: {e}").pack(pady=20)
+            return None
+        
+        tab.frame.pack(fill='both', expand=True)
+        setattr(self, name, tab)
+        return tab
+    
+    def start_change_monitor(self):
+        """تحديث التبويبات بالصفوف المتغيرة فقط (من هذا البرنامج أو من نسخة أخرى)"""
+        self.change_monitor = ChangeMonitor(self.parent, self.db_manager)
+        
+        # التبويبات التي لم تُنشأ بعد تقرأ بياناتها كاملة عند إنشائها
+        for name, permission, _, _, _, tables in self.TABS:
+            if self.auth_manager.has_permission(permission):
+                self.change_monitor.subscribe(tables, lambda changes, name=name: self.apply_tab_changes(name, changes))
+        
+        self.change_monitor.start()
+    
+    def apply_tab_changes(self, name, changes):
+        """تمرير التغييرات للتبويب إذا كان قد أُنشئ"""
+        tab = getattr(self, name, None)
+        if tab is not None:
+            tab.apply_changes(changes)
     
     def create_status_bar(self, parent):
         """إنشاء شريط الحالة"""
@@ -276,7 +318,7 @@ class MainWindow:
     
     def show_users_tab(self):
         """عرض تبويب المستخدمين"""
-        if hasattr(self, 'users_tab'):
+        if self.auth_manager.has_permission('manage_users'):
             # البحث عن فهرس التبويب
             for i in range(self.notebook.index('end')):
                 if self.notebook.tab(i, 'text') == 'إدارة المستخدمين':
@@ -288,6 +330,11 @@ class MainWindow:
         from gui.activity_log_window import ActivityLogWindow
         ActivityLogWindow(self.parent, self.db_manager, self.auth_manager)
     
+    def show_diagnostics(self):
+        """عرض إحصائيات زمن الاستعلامات وخطط تنفيذها"""
+        from gui.diagnostics_window import DiagnosticsWindow
+        DiagnosticsWindow(self.parent, self.db_manager)
+    
     def backup_database(self):
         """إنشاء نسخة احتياطية"""
         from tkinter import filedialog
@@ -295,15 +342,67 @@ class MainWindow:
         filename = filedialog.asksaveasfilename(
             title="حفظ النسخة الاحتياطية",
             defaultextension=".db",
-            filetypes=[("قاعدة بيانات", "*.db"), ("جميع الملفات", "*.*")]
+            filetypes=[
+                ("قاعدة بيانات", "*.db"),
+                ("قاعدة بيانات مضغوطة (gzip)", "*.db.gz"),
+                ("قاعدة بيانات مضغوطة (zstd)", "*.db.zst"),
+                ("جميع الملفات", "*.*")
+            ]
         )
         
         if filename:
-            if self.db_manager.backup_database(filename):
+            self.run_backup(lambda progress: self.db_manager.backup_database(filename, progress))
+    
+    def differential_backup_database(self):
+        """إنشاء نسخة تفاضلية تحتوي على التغييرات منذ آخر نسخة كاملة"""
+        from tkinter import filedialog
+        
+        base_filename = filedialog.askopenfilename(
+            title="اختيار النسخة الكاملة الأساسية",
+            filetypes=[("نسخة احتياطية", "*.db *.db.gz *.db.zst"), ("جميع الملفات", "*.*")]
+        )
+        if not base_filename:
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            title="حفظ النسخة التفاضلية",
+            defaultextension=".diff.gz",
+            filetypes=[("نسخة تفاضلية", "*.diff.gz *.diff.zst"), ("جميع الملفات", "*.*")]
+        )
+        if filename:
+            self.run_backup(
+                lambda progress: self.db_manager.backup_database(filename, progress, base_path=base_filename)
+            )
+    
+    def run_backup(self, work):
+        """تشغيل النسخ الاحتياطي في الخلفية مع تحديث شريط الحالة بالتقدم"""
+        def on_progress(stage, done, total):
+            # يُستدعى من الخيط الخلفي، ويُعرض من الخيط الرئيسي
+            self.backup_progress = (stage, done, total)
+        
+        def on_done(success):
+            self.backup_progress = None
+            if success:
                 messagebox.showinfo("نجح", "تم إنشاء النسخة الاحتياطية بنجاح")
                 self.update_status_bar("تم إنشاء النسخة الاحتياطية")
             else:
                 messagebox.showerror("خطأ", "فشل في إنشاء النسخة الاحتياطية")
+                self.update_status_bar()
+        
+        self.backup_progress = ('copy', 0, 0)
+        self.backup_runner.submit(lambda: work(on_progress), on_done, delay_ms=0)
+        self.show_backup_progress()
+    
+    def show_backup_progress(self):
+        """عرض تقدم النسخ الاحتياطي في شريط الحالة"""
+        if self.backup_progress is None:
+            return
+        
+        stage, done, total = self.backup_progress
+        stages = {'copy': "جاري النسخ", 'compress': "جاري الضغط"}
+        percent = int(done * 100 / total) if total else 0
+        self.update_status_bar(f"{stages.get(stage, 'جاري النسخ')}... {percent}%")
+        self.parent.after(200, self.show_backup_progress)
     
     def restore_database(self):
         """استعادة النسخة الاحتياطية"""
@@ -317,7 +416,10 @@ class MainWindow:
         if result:
             filename = filedialog.askopenfilename(
                 title="اختيار النسخة الاحتياطية",
-                filetypes=[("قاعدة بيانات", "*.db"), ("جميع الملفات", "*.*")]
+                filetypes=[
+                    ("نسخة احتياطية", "*.db *.db.gz *.db.zst *.diff.gz *.diff.zst"),
+                    ("جميع الملفات", "*.*")
+                ]
             )
             
             if filename:
@@ -342,6 +444,8 @@ class MainWindow:
                 self.reports_tab.refresh_data()
             if hasattr(self, 'users_tab'):
                 self.users_tab.refresh_data()
+            # التبويبات محدثة بالكامل، لا داعي لتطبيق التغييرات السابقة
+            self.change_monitor.reset()
         except Exception as e:
             print(f"خطأ في تحديث التبويبات: {e}")
     
@@ -393,38 +497,71 @@ class MainWindow:
         self.notification_bar.pack_forget()
 
     def check_overdue_alerts(self):
-        """فحص الموضوعات المتأخرة والتنبيه عليها"""
-        from datetime import datetime, timedelta
-        now = datetime.now()
+        """فحص الموضوعات المتأخرة في الخلفية وإعادة الفحص بشكل دوري"""
+        self.overdue_runner.submit(
+            lambda: self.db_manager.get_overdue_items(days=3, limit=10),
+            self.show_overdue_alerts,
+            delay_ms=0
+        )
+        self.parent.after(self.OVERDUE_CHECK_INTERVAL, self.check_overdue_alerts)
+    
+    def run_retention(self):
+        """أرشفة سجلات النشاط القديمة في الخلفية حسب سياسة الاحتفاظ"""
+        def on_done(moved):
+            if moved:
+                self.update_status_bar(f"تم أرشفة {moved} سجل نشاط قديم")
+        
+        self.retention_runner.submit(self.db_manager.retention.run, on_done, delay_ms=0)
+        self.parent.after(self.RETENTION_INTERVAL, self.run_retention)
+    
+    def convert_to_incremental_vacuum(self):
+        """تحويل قاعدة البيانات مرة واحدة إلى وضع auto_vacuum=INCREMENTAL (بعد التأكيد)"""
+        retention = self.db_manager.retention
+        if retention.is_incremental():
+            messagebox.showinfo("معلومات", "قاعدة البيانات تعمل بالفعل بوضع تحرير المساحة التدريجي")
+            return
+        
+        result = messagebox.askyesno(
+            "تأكيد",
+            "سيتم إعادة كتابة ملف قاعدة البيانات بالكامل لتفعيل تحرير المساحة التدريجي.\n"
+            "قد يستغرق ذلك وقتاً ولن يمكن الكتابة في قاعدة البيانات حتى ينتهي.\n"
+            "يُنصح بعمل نسخة احتياطية أولاً. هل تريد المتابعة؟"
+        )
+        if not result:
+            return
+        
+        def on_done(converted):
+            if converted:
+                self.update_status_bar("تم تفعيل تحرير المساحة التدريجي")
+                messagebox.showinfo("نجح", "تم تفعيل تحرير المساحة التدريجي")
+            else:
+                messagebox.showerror("خطأ", "فشل في تفعيل تحرير المساحة التدريجي")
+        
+        self.update_status_bar("جاري إعادة كتابة قاعدة البيانات...")
+        self.maintenance_runner.submit(retention.convert_to_incremental, on_done, delay_ms=0)
+    
+    def show_overdue_alerts(self, overdue):
+        """التنبيه على الموضوعات المتأخرة (فقط عند تغيرها منذ آخر تنبيه)"""
+        overdue_ids = (
+            tuple(row['id'] for row in overdue['incoming']),
+            tuple(row['id'] for row in overdue['follow_up']),
+            overdue['incoming_total'],
+            overdue['follow_up_total'],
+        )
+        if overdue_ids == self.last_overdue_ids:
+            return
+        self.last_overdue_ids = overdue_ids
+        
         overdue_msgs = []
-        # فحص الوارد
-        incoming_query = """
-            SELECT reference_number, subject, received_date, status
-            FROM incoming_correspondence
-            WHERE status != 'مغلق'
-        """
-        incoming = self.db_manager.execute_query(incoming_query)
-        for row in incoming:
-            try:
-                received = datetime.strptime(row['received_date'], '%Y-%m-%d')
-                if (now - received).days > 3:
-                    overdue_msgs.append(f"مراسلة واردة رقم {row['reference_number']} بخصوص '{row['subject']}' تجاوزت 3 أيام ولم تغلق.")
-            except:
-                continue
-        # فحص المتابعة
-        followup_query = """
-            SELECT follow_up_code, action_required, follow_up_date, status
-            FROM follow_up
-            WHERE status != 'مغلق'
-        """
-        followups = self.db_manager.execute_query(followup_query)
-        for row in followups:
-            try:
-                follow_date = datetime.strptime(row['follow_up_date'], '%Y-%m-%d')
-                if (now - follow_date).days > 3:
-                    overdue_msgs.append(f"متابعة '{row['action_required']}' (كود: {row['follow_up_code']}) تجاوزت 3 أيام ولم تغلق.")
-            except:
-                continue
+        for row in overdue['incoming']:
+            overdue_msgs.append(f"مراسلة واردة رقم {row['reference_number']} بخصوص '{row['subject']}' تجاوزت 3 أيام ولم تغلق.")
+        for row in overdue['follow_up']:
+            overdue_msgs.append(f"متابعة '{row['action_required']}' (كود: {row['follow_up_code']}) تجاوزت 3 أيام ولم تغلق.")
+        
+        remaining = overdue['incoming_total'] + overdue['follow_up_total'] - len(overdue_msgs)
+        if remaining > 0:
+            overdue_msgs.append(f"و {remaining} موضوعات أخرى متأخرة.")
+        
         if overdue_msgs:
             self.show_notification("\n".join(overdue_msgs), type_="warning", duration=9000)
 
@@ -433,5 +570,6 @@ class MainWindow:
         result = messagebox.askyesno("تأكيد", "هل تريد تسجيل الخروج؟")
         if result:
             self.auth_manager.logout()
+            self.change_monitor.stop()
             self.parent.quit()
             self.parent.destroy()
\ No newline at end of file
@@ -9,6 +9,11 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, date
 
+from gui.paged_tree import PagedTreeLoader
+from gui.background_query import BackgroundQueryRunner
+from gui.transfer_dialog import TransferDialog
+from gui.change_monitor import ChangeMonitor
+
 class OutgoingTab:
     def __init__(self, parent, db_manager, auth_manager, user_data):
         self.parent = parent
@@ -19,6 +24,9 @@ class OutgoingTab:
         # إنشاء الإطار الرئيسي
         self.frame = ttk.Frame(parent)
         
+        # منفذ البحث في الخلفية
+        self.search_runner = BackgroundQueryRunner(self.frame, self.db_manager)
+        
         # إعداد الخطوط
         self.font_normal = ('Arial Unicode MS', 10)
         self.font_bold = ('Arial Unicode MS', 10, 'bold')
@@ -61,6 +69,21 @@ class OutgoingTab:
             )
             delete_btn.pack(side='right', padx=5)
         
+        if self.auth_manager.has_permission('add_outgoing'):
+            import_btn = ttk.Button(
+                buttons_frame,
+                text="استيراد",
+                command=self.import_correspondence
+            )
+            import_btn.pack(side='right', padx=5)
+        
+        export_btn = ttk.Button(
+            buttons_frame,
+            text="تصدير",
+            command=self.export_correspondence
+        )
+        export_btn.pack(side='right', padx=5)
+        
 
         
         # إطار البحث
@@ -126,7 +149,17 @@ class OutgoingTab:
         # إضافة شريط التمرير
         scrollbar_v = ttk.Scrollbar(parent, orient='vertical', command=self.tree.yview)
         scrollbar_h = ttk.Scrollbar(parent, orient='horizontal', command=self.tree.xview)
-        self.tree.configure(yscrollcommand=scrollbar_v.set, xscrollcommand=scrollbar_h.set)
+        self.tree.configure(xscrollcommand=scrollbar_h.set)
+        
+        # تحميل الصفوف على صفحات عند التمرير
+        self.pager = PagedTreeLoader(self.tree, scrollbar_v, self.insert_row, key_columns=('sent_date', 'id'))
+        
+        # تكوين ألوان الصفوف
+        self.tree.tag_configure('urgent', background='#ffebee')
+        self.tree.tag_configure('important', background='#fff3e0')
+        self.tree.tag_configure('draft', background='#f3e5f5')
+        self.tree.tag_configure('sent', background='#e8f5e8')
+        self.tree.tag_configure('archived', background='#f5f5f5')
         
         # تخطيط الجدول وشريط التمرير
         self.tree.grid(row=0, column=0, sticky='nsew')
@@ -140,130 +173,91 @@ class OutgoingTab:
         # ربط الأحداث
         self.tree.bind('<Double-1>', self.on_double_click)
         self.tree.bind('<Button-3>', self.show_context_menu)
+        self.tree.bind('<Control-a>', self.select_all)
     
     def refresh_data(self):
         """تحديث بيانات الجدول"""
-        # مسح البيانات الحالية
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # جلب البيانات من قاعدة البيانات
-        query = '''
-            SELECT oc.id, oc.reference_number, oc.subject_code, oc.subject, oc.recipient, 
-                   oc.recipient_engineer, oc.responsible_engineer, oc.sent_date, 
-                   oc.priority, oc.status, oc.related_incoming_id,
-                   ic.subject_code as related_ref
-            FROM outgoing_correspondence oc
-            LEFT JOIN incoming_correspondence ic ON oc.related_incoming_id = ic.id
-            ORDER BY oc.sent_date DESC, oc.id DESC
-        '''
-        
-        data = self.db_manager.execute_query(query)
-        
-        # إدراج البيانات في الجدول
-        for row in data:
-            # تلوين الصفوف حسب الأولوية
-            tags = []
-            if row['priority'] == 'عاجل':
-                tags.append('urgent')
-            elif row['priority'] == 'مهم':
-                tags.append('important')
-            
-            # تلوين حسب الحالة
-            if row['status'] == 'مسودة':
-                tags.append('draft')
-            elif row['status'] == 'تم الإرسال':
-                tags.append('sent')
-            elif row['status'] == 'مؤرشف':
-                tags.append('archived')
-            
-            # عرض كود المراسلة المرتبطة
-            related_display = row['related_ref'] if row['related_ref'] else '-'
-            
-            self.tree.insert('', 'end', values=(
-                row['id'],
-                row['reference_number'],
-                row['subject_code'] or '-',
-                row['subject'],
-                row['recipient'],
-                row['recipient_engineer'] or '-',
-                row['responsible_engineer'] or '-',
-                row['sent_date'],
-                row['priority'],
-                row['status'],
-                related_display
-            ), tags=tags)
+        # جلب الصفحة الأولى فقط، وباقي الصفحات عند التمرير
+        self.pager.reset(self.build_page_fetcher())
+    
+    def apply_changes(self, changes):
+        """تحديث الصفوف التي تغيرت فقط (من سجل التغييرات)"""
+        row_changes = changes.get('outgoing_correspondence')
+        if row_changes is None or self.search_var.get().strip():
+            # تغييرات كثيرة، أو نتائج بحث مرتبة حسب درجة التطابق: إعادة تحميل الصفحة الأولى
+            self.refresh_data()
+        else:
+            self.pager.apply_changes(row_changes)
+    
+    def notify_data_changed(self):
+        """طلب تحديث التبويبات بعد التعديل (يتم تحديث الصفوف المتغيرة فقط)"""
+        self.frame.event_generate(ChangeMonitor.DATA_CHANGED)
+    
+    def build_page_fetcher(self):
+        """دالة جلب الصفحات حسب نص البحث الحالي"""
+        search_term = self.search_var.get().strip()
         
-        # تكوين ألوان الصفوف
-        self.tree.tag_configure('urgent', background='#ffebee')
-        self.tree.tag_configure('important', background='#fff3e0')
-        self.tree.tag_configure('draft', background='#f3e5f5')
-        self.tree.tag_configure('sent', background='#e8f5e8')
-        self.tree.tag_configure('archived', background='#f5f5f5')
+        def fetch_page(after, ids=None):
+            return self.db_manager.get_outgoing_page(search_term or None, after=after, ids=ids)
+        
+        return fetch_page
+    
+    def insert_row(self, row):
+        """إدراج صف في الجدول"""
+        # تلوين الصفوف حسب الأولوية
+        tags = []
+        if row['priority'] == 'عاجل':
+            tags.append('urgent')
+        elif row['priority'] == 'مهم':
+            tags.append('important')
+        
+        # تلوين حسب الحالة
+        if row['status'] == 'مسودة':
+            tags.append('draft')
+        elif row['status'] == 'تم الإرسال':
+            tags.append('sent')
+        elif row['status'] == 'مؤرشف':
+            tags.append('archived')
+        
+        # عرض كود المراسلة المرتبطة
+        related_display = row['related_ref'] if row['related_ref'] else '-'
+        
+        self.tree.insert('', 'end', iid=str(row['id']), values=(
+            row['id'],
+            row['reference_number'],
+            row['subject_code'] or '-',
+            row['subject'],
+            row['recipient'],
+            row['recipient_engineer'] or '-',
+            row['responsible_engineer'] or '-',
+            row['sent_date'],
+            row['priority'],
+            row['status'],
+            related_display
+        ), tags=tags)
     
     def on_search_change(self, *args):
         """البحث في البيانات"""
-        search_term = self.search_var.get().strip()
+        fetch_page = self.build_page_fetcher()
         
-        # مسح البيانات الحالية
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # تحديد الاستعلام حسب وجود نص البحث
-        if search_term:
-            query = '''
-                SELECT oc.id, oc.reference_number, oc.subject, oc.recipient, 
-                       oc.recipient_department, oc.sent_date, oc.priority, oc.status, 
-                       oc.content, oc.notes, oc.related_incoming_id,
-                       ic.reference_number as related_ref
-                FROM outgoing_correspondence oc
-                LEFT JOIN incoming_correspondence ic ON oc.related_incoming_id = ic.id
-                WHERE oc.reference_number LIKE ? OR oc.subject LIKE ? OR oc.recipient LIKE ?
-                ORDER BY oc.sent_date DESC, oc.id DESC
-            '''
-            search_pattern = f'%{search_term}%'
-            params = (search_pattern, search_pattern, search_pattern)
-        else:
-            query = '''
-                SELECT oc.id, oc.reference_number, oc.subject, oc.recipient, 
-                       oc.recipient_department, oc.sent_date, oc.priority, oc.status, 
-                       oc.content, oc.notes, oc.related_incoming_id,
-                       ic.reference_number as related_ref
-                FROM outgoing_correspondence oc
-                LEFT JOIN incoming_correspondence ic ON oc.related_incoming_id = ic.id
-                ORDER BY oc.sent_date DESC, oc.id DESC
-            '''
-            params = None
-        
-        data = self.db_manager.execute_query(query, params)
-        
-        # إدراج النتائج
-        for row in data:
-            tags = []
-            if row['priority'] == 'عاجل':
-                tags.append('urgent')
-            elif row['priority'] == 'مهم':
-                tags.append('important')
-            
-            if row['status'] == 'مسودة':
-                tags.append('draft')
-            elif row['status'] == 'تم الإرسال':
-                tags.append('sent')
-            elif row['status'] == 'مؤرشف':
-                tags.append('archived')
-            
-            related_display = row['related_ref'] if row['related_ref'] else '-'
-            
-            self.tree.insert('', 'end', values=(
-                row['id'],
-                row['reference_number'],
-                row['subject'],
-                row['recipient'],
-                row['sent_date'],
-                row['priority'],
-                row['status'],
-                related_display
-            ), tags=tags)
+        # تنفيذ البحث في الخلفية بعد توقف الكتابة
+        self.search_runner.submit(
+            lambda: fetch_page(None),
+            lambda first_page: self.pager.reset(fetch_page, first_page=first_page)
+        )
+    
+    def import_correspondence(self):
+        """استيراد مراسلات من ملف (CSV / Excel / JSON)"""
+        TransferDialog.import_file(
+            self.frame, self.db_manager, 'outgoing', self.user_data['id'],
+            on_imported=self.notify_data_changed
+        )
+    
+    def export_correspondence(self):
+        """تصدير الجدول الحالي بنفس البحث"""
+        TransferDialog.export_view(
+            self.frame, self.db_manager, self.build_page_fetcher(), 'outgoing_correspondence.csv'
+        )
     
     def on_double_click(self, event):
         """عند النقر المزدوج على صف"""
@@ -274,6 +268,10 @@ class OutgoingTab:
         if not self.tree.selection():
             return
         
+        # عدد الصفوف المحددة يظهر مع العمليات الجماعية
+        count = len(self.tree.selection())
+        suffix = f" ({count})" if count > 1 else ""
+        
         context_menu = tk.Menu(self.frame, tearoff=0)
         context_menu.add_command(label="عرض", command=self.view_correspondence)
         
@@ -287,7 +285,7 @@ class OutgoingTab:
         if self.auth_manager.has_permission('edit_outgoing'):
             context_menu.add_separator()
             status_menu = tk.Menu(context_menu, tearoff=0)
-            context_menu.add_cascade(label="تغيير الحالة", menu=status_menu)
+            context_menu.add_cascade(label="تغيير الحالة" + suffix, menu=status_menu)
             status_menu.add_command(label="مسودة", command=lambda: self.change_status('مسودة'))
             status_menu.add_command(label="تم الإرسال", command=lambda: self.change_status('تم الإرسال'))
             status_menu.add_command(label="تم الاستلام", command=lambda: self.change_status('تم الاستلام'))
@@ -295,7 +293,7 @@ class OutgoingTab:
         
         if self.auth_manager.has_permission('delete_outgoing'):
             context_menu.add_separator()
-            context_menu.add_command(label="حذف", command=self.delete_correspondence)
+            context_menu.add_command(label="حذف" + suffix, command=self.delete_correspondence)
         
         try:
             context_menu.tk_popup(event.x_root, event.y_root)
@@ -311,7 +309,7 @@ class OutgoingTab:
                 self.db_manager, 
                 self.auth_manager, 
                 self.user_data,
-                callback=self.refresh_data
+                callback=self.notify_data_changed
             )
         except Exception as e:
             messagebox.showerror("خطأ", f"فشل في فتح نموذج إضافة المراسلة: {e}")
@@ -334,7 +332,7 @@ class OutgoingTab:
                 self.auth_manager, 
                 self.user_data,
                 correspondence_id=correspondence_id,
-                callback=self.refresh_data
+                callback=self.notify_data_changed
             )
         except Exception as e:
             messagebox.showerror("خطأ", f"فشل في فتح نموذج تعديل المراسلة: {e}")
@@ -357,62 +355,56 @@ class OutgoingTab:
             correspondence_id=correspondence_id
         )
     
+    def selected_ids(self):
+        """معرفات كل الصفوف المحددة"""
+        return [int(self.tree.item(item)['values'][0]) for item in self.tree.selection()]
+    
+    def select_all(self, event=None):
+        """تحديد كل الصفوف المحملة في الجدول"""
+        self.tree.selection_set(self.tree.get_children())
+        return 'break'
+    
     def delete_correspondence(self):
-        """حذف المراسلة المحددة"""
-        selected = self.tree.selection()
-        if not selected:
+        """حذف المراسلات المحددة (في معاملة واحدة)"""
+        ids = self.selected_ids()
+        if not ids:
             messagebox.showwarning("تحذير", "يرجى اختيار مراسلة للحذف")
             return
         
-        result = messagebox.askyesno("تأكيد الحذف", "هل أنت متأكد من حذف هذه المراسلة؟")
-        if not result:
+        message = "هل أنت متأكد من حذف هذه المراسلة؟" if len(ids) == 1 else f"هل أنت متأكد من حذف {len(ids)} مراسلة؟"
+        if not messagebox.askyesno("تأكيد الحذف", message):
             return
         
-        item = self.tree.item(selected[0])
-        correspondence_id = item['values'][0]
+        deleted = self.db_manager.bulk_delete(
+            'outgoing_correspondence', ids,
+            user_id=self.user_data['id'],
+            action="حذف مراسلة صادرة رقم {id}"
+        )
         
-        # حذف المراسلة
-        query = "DELETE FROM outgoing_correspondence WHERE id = ?"
-        result = self.db_manager.execute_update(query, (correspondence_id,))
-        
-        if result is not None:
-            # تسجيل النشاط
-            self.db_manager.log_activity(
-                user_id=self.user_data['id'],
-                action=f"حذف مراسلة صادرة رقم {correspondence_id}",
-                table_name="outgoing_correspondence",
-                record_id=correspondence_id
-            )
-            
-            messagebox.showinfo("نجح", "تم حذف المراسلة بنجاح")
-            self.refresh_data()
+        if deleted is not None:
+            messagebox.showinfo("نجح", "تم حذف المراسلة بنجاح" if len(ids) == 1 else f"تم حذف {deleted} مراسلة بنجاح")
+            self.notify_data_changed()
         else:
             messagebox.showerror("خطأ", "فشل في حذف المراسلة")
     
     def change_status(self, new_status):
-        """تغيير حالة المراسلة"""
-        selected = self.tree.selection()
-        if not selected:
+        """تغيير حالة المراسلات المحددة (في معاملة واحدة)"""
+        ids = self.selected_ids()
+        if not ids:
             return
         
-        item = self.tree.item(selected[0])
-        correspondence_id = item['values'][0]
+        changed = self.db_manager.bulk_update_status(
+            'outgoing_correspondence', ids, new_status,
+            user_id=self.user_data['id'],
+            action=f"تغيير حالة المراسلة الصادرة رقم {{id}} إلى {new_status}"
+        )
         
-        # تحديث الحالة
-        query = "UPDATE outgoing_correspondence SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
-        result = self.db_manager.execute_update(query, (new_status, correspondence_id))
-        
-        if result is not None:
-            # تسجيل النشاط
-            self.db_manager.log_activity(
-                user_id=self.user_data['id'],
-                action=f"تغيير حالة المراسلة الصادرة رقم {correspondence_id} إلى {new_status}",
-                table_name="outgoing_correspondence",
-                record_id=correspondence_id
-            )
-            
-            messagebox.showinfo("نجح", f"تم تغيير الحالة إلى {new_status}")
-            self.refresh_data()
+        if changed is not None:
+            if len(ids) == 1:
+                messagebox.showinfo("نجح", f"تم تغيير الحالة إلى {new_status}")
+            else:
+                messagebox.showinfo("نجح", f"تم تغيير حالة {changed} من {len(ids)} مراسلة إلى {new_status}")
+            self.notify_data_changed()
         else:
             messagebox.showerror("خطأ", "فشل في تغيير الحالة")
     
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تحميل الجداول على دفعات
+Paged Treeview Loader
+"""
+
+class PagedTreeLoader:
+    """تحميل صفوف Treeview على صفحات عند الاقتراب من نهاية التمرير"""
+    
+    def __init__(self, tree, scrollbar, insert_row, threshold=0.9, key_columns=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.insert_row = insert_row
+        self.threshold = threshold
+        
+        # أعمدة ترتيب الصفوف (تنازلياً) لإدراج الصفوف الجديدة في مكانها عند التحديث الجزئي
+        self.key_columns = key_columns
+        self.keys = {}
+        
+        self.fetch_page = None
+        self.next_key = None
+        self.exhausted = True
+        self._loading = False
+        
+        # مراقبة موضع التمرير لجلب الصفحة التالية
+        self.tree.configure(yscrollcommand=self.on_scroll)
+    
+    def reset(self, fetch_page, first_page=None):
+        """إعادة تحميل الجدول من الصفحة الأولى
+        
+        fetch_page: دالة تستقبل مفتاح الصفحة السابقة وتعيد (الصفوف, المفتاح التالي)
+                    (وتقبل ids لجلب صفوف محددة عند التحديث الجزئي)
+        first_page: الصفحة الأولى إذا كانت محملة مسبقاً
+        """
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self.keys.clear()
+        
+        self.fetch_page = fetch_page
+        self.next_key = None
+        self.exhausted = False
+        self.load_more(first_page)
+    
+    def load_more(self, page=None):
+        """جلب الصفحة التالية وإضافتها للجدول"""
+        if self.exhausted or self.fetch_page is None or self._loading:
+            return
+        
+        self._loading = True
+        try:
+            rows, next_key = page if page is not None else self.fetch_page(self.next_key)
+            for row in rows:
+                self.insert_row(row)
+                if self.key_columns:
+                    self.keys[str(row['id'])] = self.row_key(row)
+            self.next_key = next_key
+            self.exhausted = next_key is None
+        finally:
+            self._loading = False
+    
+    def on_scroll(self, first, last):
+        """تحديث شريط التمرير وجلب المزيد عند الاقتراب من النهاية"""
+        self.scrollbar.set(first, last)
+        if not self.exhausted and float(last) >= self.threshold:
+            self.tree.after_idle(self.load_more)
+    
+    def row_key(self, row):
+        """مفتاح ترتيب الصف"""
+        return tuple(row[column] for column in self.key_columns)
+    
+    def position(self, key):
+        """موضع الصف في الجدول حسب مفتاحه (بحث ثنائي في الصفوف المحملة)"""
+        children = self.tree.get_children()
+        low, high = 0, len(children)
+        while low < high:
+            middle = (low + high) // 2
+            if self.keys.get(children[middle], ()) > key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def apply_changes(self, changes):
+        """تطبيق التغييرات على الصفوف المحملة فقط بدلاً من إعادة تحميل الجدول
+        
+        changes: {معرف الصف: العملية} من سجل التغييرات
+        """
+        if self.fetch_page is None or not self.key_columns:
+            return
+        
+        # الصفوف التي ما زالت تطابق الفلاتر الحالية
+        ids = [row_id for row_id, operation in changes.items() if operation != 'delete']
+        rows = {}
+        if ids:
+            fetched, _ = self.fetch_page(None, ids=ids)
+            rows = {row['id']: row for row in fetched}
+        
+        selection = set(self.tree.selection())
+        for row_id in changes:
+            iid = str(row_id)
+            if self.tree.exists(iid):
+                self.tree.delete(iid)
+                self.keys.pop(iid, None)
+            
+            row = rows.get(row_id)
+            if row is None:
+                continue
+            
+            key = self.row_key(row)
+            if not self.exhausted and self.next_key is not None and key < tuple(self.next_key):
+                # سيظهر الصف عند تحميل الصفحات التالية
+                continue
+            
+            index = self.position(key)
+            self.insert_row(row)
+            self.tree.move(iid, '', index)
+            self.keys[iid] = key
+            if iid in selection:
+                self.tree.selection_add(iid)
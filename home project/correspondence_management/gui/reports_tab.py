@@ -8,13 +8,8 @@ Reports Tab
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, date, timedelta
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
 from collections import defaultdict
-
-# تعيين الخط العربي لـ matplotlib
-plt.rcParams['font.family'] = ['Arial Unicode MS', 'Tahoma', 'DejaVu Sans']
+from gui.chart_manager import ChartManager
 
 class ReportsTab:
     def __init__(self, parent, db_manager, auth_manager, user_data):
@@ -26,6 +21,10 @@ class ReportsTab:
         # إنشاء الإطار الرئيسي
         self.frame = ttk.Frame(parent)
         
+        # الرسوم البيانية تُرسم في الخلفية
+        self.chart_manager = ChartManager(self.frame, self.db_manager)
+        self.chart_image = None
+        
         # إعداد الخطوط
         self.font_normal = ('Arial Unicode MS', 10)
         self.font_bold = ('Arial Unicode MS', 10, 'bold')
@@ -89,17 +88,20 @@ class ReportsTab:
         for widget in self.stats_frame.winfo_children():
             widget.destroy()
 
+        # جميع العدادات من لقطة واحدة (مسح واحد لكل جدول)
+        stats = self.db_manager.statistics.snapshot()
+        
         # تصميم عصري: بطاقات كبيرة مع أيقونات وألوان واضحة
         card_data = [
-            ("المراسلات الواردة", self.get_incoming_count(), "#3498db", "📥"),
-            ("المراسلات الصادرة", self.get_outgoing_count(), "#2ecc71", "📤"),
-            ("المتابعات المعلقة", self.get_pending_followups_count(), "#e67e22", "⏳"),
-            ("المراسلات الجديدة", self.get_new_incoming_count(), "#f39c12", "🆕"),
-            ("واردة هذا الشهر", self.get_monthly_incoming_count(datetime.now().strftime('%Y-%m')), "#9b59b6", "🗓️"),
-            ("صادرة هذا الشهر", self.get_monthly_outgoing_count(datetime.now().strftime('%Y-%m')), "#1abc9c", "🗓️"),
-            ("متابعات مكتملة", self.get_completed_followups_count(), "#27ae60", "✅"),
-            ("متابعات جارية", self.get_ongoing_followups_count(), "#3498db", "🔄"),
-            ("مراسلات مؤرشفة", self.get_archived_count(), "#95a5a6", "🗄️"),
+            ("المراسلات الواردة", stats['total_incoming'], "#3498db", "📥"),
+            ("المراسلات الصادرة", stats['total_outgoing'], "#2ecc71", "📤"),
+            ("المتابعات المعلقة", stats['pending_followups'], "#e67e22", "⏳"),
+            ("المراسلات الجديدة", stats['new_incoming'], "#f39c12", "🆕"),
+            ("واردة هذا الشهر", stats['incoming_this_month'], "#9b59b6", "🗓️"),
+            ("صادرة هذا الشهر", stats['outgoing_this_month'], "#1abc9c", "🗓️"),
+            ("متابعات مكتملة", stats['completed_followups'], "#27ae60", "✅"),
+            ("متابعات جارية", stats['ongoing_followups'], "#3498db", "🔄"),
+            ("مراسلات مؤرشفة", stats['archived'], "#95a5a6", "🗄️"),
         ]
 
         cards_frame = tk.Frame(self.stats_frame, bg="#f8f9fa")
@@ -171,14 +173,14 @@ class ReportsTab:
         tree.column('percentage', width=120, anchor='center')
         
         # إضافة البيانات
-        current_month = datetime.now().strftime('%Y-%m')
+        stats = self.db_manager.statistics.snapshot()
         
         data = [
-            ('المراسلات الواردة', self.get_incoming_count(), self.get_monthly_incoming_count(current_month)),
-            ('المراسلات الصادرة', self.get_outgoing_count(), self.get_monthly_outgoing_count(current_month)),
-            ('المتابعات المعلقة', self.get_pending_followups_count(), 0),
-            ('المتابعات الجارية', self.get_ongoing_followups_count(), 0),
-            ('المتابعات المكتملة', self.get_completed_followups_count(), 0),
+            ('المراسلات الواردة', stats['total_incoming'], stats['incoming_this_month']),
+            ('المراسلات الصادرة', stats['total_outgoing'], stats['outgoing_this_month']),
+            ('المتابعات المعلقة', stats['pending_followups'], 0),
+            ('المتابعات الجارية', stats['ongoing_followups'], 0),
+            ('المتابعات المكتملة', stats['completed_followups'], 0),
         ]
         
         for category, total, monthly in data:
@@ -322,57 +324,46 @@ class ReportsTab:
         """تحديث البيانات"""
         self.refresh_statistics()
     
+    def apply_changes(self, changes):
+        """تحديث الإحصائيات عند تغير المراسلات أو المتابعات"""
+        self.refresh_data()
+    
     def refresh_statistics(self):
         """تحديث الإحصائيات"""
         self.create_statistics_cards()
     
-    # دوال الحصول على الإحصائيات
+    # دوال الحصول على الإحصائيات (من لقطة الإحصائيات المخزنة)
     def get_incoming_count(self):
         """عدد المراسلات الواردة"""
-        result = self.db_manager.execute_query("SELECT COUNT(*) as count FROM incoming_correspondence")
-        return result[0]['count'] if result else 0
+        return self.db_manager.statistics.snapshot()['total_incoming']
     
     def get_outgoing_count(self):
         """عدد المراسلات الصادرة"""
-        result = self.db_manager.execute_query("SELECT COUNT(*) as count FROM outgoing_correspondence")
-        return result[0]['count'] if result else 0
+        return self.db_manager.statistics.snapshot()['total_outgoing']
     
     def get_pending_followups_count(self):
         """عدد المتابعات المعلقة"""
-        result = self.db_manager.execute_query("SELECT COUNT(*) as count FROM follow_up WHERE status = 'معلق'")
-        return result[0]['count'] if result else 0
+        return self.db_manager.statistics.snapshot()['pending_followups']
     
     def get_new_incoming_count(self):
         """عدد المراسلات الواردة الجديدة"""
-        result = self.db_manager.execute_query("SELECT COUNT(*) as count FROM incoming_correspondence WHERE status = 'جديد'")
-        return result[0]['count'] if result else 0
+        return self.db_manager.statistics.snapshot()['new_incoming']
     
     def get_completed_followups_count(self):
         """عدد المتابعات المكتملة"""
-        result = self.db_manager.execute_query("SELECT COUNT(*) as count FROM follow_up WHERE status = 'مكتمل'")
-        return result[0]['count'] if result else 0
+        return self.db_manager.statistics.snapshot()['completed_followups']
     
     def get_archived_count(self):
         """عدد المراسلات المؤرشفة"""
-        incoming = self.db_manager.execute_query("SELECT COUNT(*) as count FROM incoming_correspondence WHERE status = 'مؤرشف'")
-        outgoing = self.db_manager.execute_query("SELECT COUNT(*) as count FROM outgoing_correspondence WHERE status = 'مؤرشف'")
-        return (incoming[0]['count'] if incoming else 0) + (outgoing[0]['count'] if outgoing else 0)
+        return self.db_manager.statistics.snapshot()['archived']
     
     def get_monthly_incoming_count(self, month):
         """عدد المراسلات الواردة في شهر معين"""
-        result = self.db_manager.execute_query(
-            "SELECT COUNT(*) as count FROM incoming_correspondence WHERE strftime('%Y-%m', received_date) = ?",
-            (month,)
-        )
-        return result[0]['count'] if result else 0
+        return self.db_manager.statistics.monthly_count('incoming', month)
     
     def get_monthly_outgoing_count(self, month):
         """عدد المراسلات الصادرة في شهر معين"""
-        result = self.db_manager.execute_query(
-            "SELECT COUNT(*) as count FROM outgoing_correspondence WHERE strftime('%Y-%m', sent_date) = ?",
-            (month,)
-        )
-        return result[0]['count'] if result else 0
+        return self.db_manager.statistics.monthly_count('outgoing', month)
     
     def generate_monthly_report(self):
         """إنشاء التقرير الشهري"""
@@ -397,8 +388,10 @@ class ReportsTab:
         stats_frame = ttk.LabelFrame(self.monthly_report_frame, text="إحصائيات الشهر")
         stats_frame.pack(fill='x', padx=20, pady=10)
         
-        incoming_count = self.get_monthly_incoming_count(period)
-        outgoing_count = self.get_monthly_outgoing_count(period)
+        month_start, month_end = self.db_manager.statistics.period_range(period)
+        month_counts = self.db_manager.get_time_series(month_start, month_end, 'month')[0]
+        incoming_count = month_counts['incoming']
+        outgoing_count = month_counts['outgoing']
         
         stats_text = f"""
 المراسلات الواردة: {incoming_count}
@@ -440,24 +433,26 @@ class ReportsTab:
         tree.column('date', width=100, anchor='center')
         tree.column('status', width=100, anchor='center')
         
-        # جلب البيانات
+        # جلب البيانات (مدى تاريخ بدلاً من strftime حتى يُستخدم فهرس التاريخ)
+        month_start, month_end = self.db_manager.statistics.period_range(period)
+        
         # المراسلات الواردة
         incoming_query = """
             SELECT 'واردة' as type, reference_number, subject, received_date as date, status
             FROM incoming_correspondence
-            WHERE strftime('%Y-%m', received_date) = ?
+            WHERE received_date >= ? AND received_date < ?
             ORDER BY received_date DESC
         """
-        incoming_data = self.db_manager.execute_query(incoming_query, (period,))
+        incoming_data = self.db_manager.execute_query(incoming_query, (month_start, month_end))
         
         # المراسلات الصادرة
         outgoing_query = """
             SELECT 'صادرة' as type, reference_number, subject, sent_date as date, status
             FROM outgoing_correspondence
-            WHERE strftime('%Y-%m', sent_date) = ?
+            WHERE sent_date >= ? AND sent_date < ?
             ORDER BY sent_date DESC
         """
-        outgoing_data = self.db_manager.execute_query(outgoing_query, (period,))
+        outgoing_data = self.db_manager.execute_query(outgoing_query, (month_start, month_end))
         
         # دمج البيانات وإدراجها
         all_data = list(incoming_data) + list(outgoing_data)
@@ -610,140 +605,25 @@ class ReportsTab:
         for widget in self.chart_frame.winfo_children():
             widget.destroy()
         
-        chart_type = self.chart_type_var.get()
+        tk.Label(self.chart_frame, text="جاري إنشاء الرسم البياني...", font=self.font_normal).pack(pady=20)
         
-        if chart_type == "شهري":
-            self.create_monthly_chart()
-        elif chart_type == "حسب الحالة":
-            self.create_status_chart()
-        elif chart_type == "حسب الأولوية":
-            self.create_priority_chart()
+        # تجهيز البيانات والرسم في الخلفية ثم العرض هنا
+        self.chart_manager.render(self.chart_type_var.get(), self.show_chart)
     
-    def create_monthly_chart(self):
-        """إنشاء رسم بياني شهري"""
-        # جلب البيانات للأشهر الـ 12 الماضية
-        months_data = []
-        current_date = datetime.now()
-        
-        for i in range(12):
-            month_date = current_date - timedelta(days=30*i)
-            month_str = month_date.strftime('%Y-%m')
-            
-            incoming = self.get_monthly_incoming_count(month_str)
-            outgoing = self.get_monthly_outgoing_count(month_str)
-            
-            months_data.append({
-                'month': month_date.strftime('%Y-%m'),
-                'incoming': incoming,
-                'outgoing': outgoing
-            })
-        
-        months_data.reverse()  # ترتيب تصاعدي
-        
-        # إنشاء الرسم البياني
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        months = [data['month'] for data in months_data]
-        incoming_counts = [data['incoming'] for data in months_data]
-        outgoing_counts = [data['outgoing'] for data in months_data]
-        
-        x = range(len(months))
-        width = 0.35
-        
-        ax.bar([i - width/2 for i in x], incoming_counts, width, label='واردة', color='#3498db')
-        ax.bar([i + width/2 for i in x], outgoing_counts, width, label='صادرة', color='#2ecc71')
-        
-        ax.set_xlabel('الشهر')
-        ax.set_ylabel('عدد المراسلات')
-        ax.set_title('إحصائيات المراسلات الشهرية')
-        ax.set_xticks(x)
-        ax.set_xticklabels(months, rotation=45)
-        ax.legend()
-        
-        plt.tight_layout()
+    def show_chart(self, image):
+        """عرض صورة الرسم البياني الجاهزة"""
+        for widget in self.chart_frame.winfo_children():
+            widget.destroy()
         
-        # إدراج الرسم في الواجهة
-        canvas = FigureCanvasTkAgg(fig, self.chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True)
-    
-    def create_status_chart(self):
-        """إنشاء رسم بياني حسب الحالة"""
-        # جلب بيانات الحالات
-        incoming_statuses = self.db_manager.execute_query("""
-            SELECT status, COUNT(*) as count 
-            FROM incoming_correspondence 
-            GROUP BY status
-        """)
-        
-        outgoing_statuses = self.db_manager.execute_query("""
-            SELECT status, COUNT(*) as count 
-            FROM outgoing_correspondence 
-            GROUP BY status
-        """)
-        
-        # إنشاء الرسم البياني
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-        
-        # رسم المراسلات الواردة
-        if incoming_statuses:
-            labels1 = [row['status'] for row in incoming_statuses]
-            sizes1 = [row['count'] for row in incoming_statuses]
-            ax1.pie(sizes1, labels=labels1, autopct='%1.1f%%', startangle=90)
-            ax1.set_title('المراسلات الواردة حسب الحالة')
-        
-        # رسم المراسلات الصادرة
-        if outgoing_statuses:
-            labels2 = [row['status'] for row in outgoing_statuses]
-            sizes2 = [row['count'] for row in outgoing_statuses]
-            ax2.pie(sizes2, labels=labels2, autopct='%1.1f%%', startangle=90)
-            ax2.set_title('المراسلات الصادرة حسب الحالة')
-        
-        plt.tight_layout()
-        
-        # إدراج الرسم في الواجهة
-        canvas = FigureCanvasTkAgg(fig, self.chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True)
-    
-    def create_priority_chart(self):
-        """إنشاء رسم بياني حسب الأولوية"""
-        # جلب بيانات الأولويات
-        priority_data = self.db_manager.execute_query("""
-            SELECT priority, COUNT(*) as count FROM (
-                SELECT priority FROM incoming_correspondence
-                UNION ALL
-                SELECT priority FROM outgoing_correspondence
-            ) GROUP BY priority
-        """)
-        
-        if not priority_data:
+        # الاحتفاظ بمرجع للصورة حتى لا تُحذف
+        self.chart_image = image
+        if image is None:
+            if not self.chart_manager.available:
+                tk.Label(self.chart_frame, text="الرسوم البيانية تتطلب تثبيت matplotlib", font=self.font_normal).pack(pady=20)
             return
         
-        # إنشاء الرسم البياني
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        priorities = [row['priority'] for row in priority_data]
-        counts = [row['count'] for row in priority_data]
-        
-        colors = {'عاجل': '#e74c3c', 'مهم': '#f39c12', 'عادي': '#3498db'}
-        bar_colors = [colors.get(p, '#95a5a6') for p in priorities]
-        
-        ax.bar(priorities, counts, color=bar_colors)
-        ax.set_xlabel('الأولوية')
-        ax.set_ylabel('عدد المراسلات')
-        ax.set_title('توزيع المراسلات حسب الأولوية')
-        
-        # إضافة القيم على الأعمدة
-        for i, v in enumerate(counts):
-            ax.text(i, v + 0.1, str(v), ha='center', va='bottom')
-        
-        plt.tight_layout()
-        
-        # إدراج الرسم في الواجهة
-        canvas = FigureCanvasTkAgg(fig, self.chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True)
+        chart_label = tk.Label(self.chart_frame, image=image)
+        chart_label.pack(fill='both', expand=True)
     
     def export_statistics_report(self):
         """تصدير تقرير الإحصائيات"""
@@ -927,10 +807,8 @@ class ReportsTab:
     
     def get_closed_followups_count(self):
         """عدد المتابعات المغلقة"""
-        result = self.db_manager.execute_query("SELECT COUNT(*) as count FROM follow_up WHERE status = 'مغلق'")
-        return result[0]['count'] if result else 0
+        return self.db_manager.statistics.snapshot()['closed_followups']
     
     def get_ongoing_followups_count(self):
         """عدد المتابعات الجارية"""
-        result = self.db_manager.execute_query("SELECT COUNT(*) as count FROM follow_up WHERE status = 'جاري'")
-        return result[0]['count'] if result else 0
\ No newline at end of file
+        return self.db_manager.statistics.snapshot()['ongoing_followups']
\ No newline at end of file
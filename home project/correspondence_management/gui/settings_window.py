@@ -56,7 +56,7 @@ class SettingsWindow(tk.Toplevel):
         if not self.auth_manager.verify_user(self.user_data['username'], current):
             messagebox.showerror("خطأ", "كلمة المرور الحالية غير صحيحة.")
             return
-        self.auth_manager.change_password(self.user_data['username'], new)
+        self.auth_manager.change_password(self.user_data['id'], new)
         messagebox.showinfo("تم", "تم تغيير كلمة المرور بنجاح.")
         self.current_password_entry.delete(0, 'end')
         self.new_password_entry.delete(0, 'end')
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نافذة الاستيراد والتصدير
+Bulk Transfer Dialog
+"""
+
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+from gui.background_query import BackgroundQueryRunner
+
+class TransferDialog:
+    """تشغيل الاستيراد أو التصدير في الخلفية مع عرض عدد السجلات التي تمت معالجتها"""
+    
+    FILE_TYPES = [
+        ("CSV", "*.csv"),
+        ("Excel", "*.xlsx"),
+        ("JSON", "*.json"),
+        ("JSON Lines", "*.jsonl"),
+        ("جميع الملفات", "*.*")
+    ]
+    
+    def __init__(self, parent, db_manager, title):
+        self.db_manager = db_manager
+        self.processed = 0
+        self.running = False
+        
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("400x130")
+        self.window.transient(parent.winfo_toplevel())
+        self.window.protocol("WM_DELETE_WINDOW", lambda: None)
+        
+        frame = ttk.Frame(self.window)
+        frame.pack(fill='both', expand=True, padx=20, pady=20)
+        
+        self.status_label = tk.Label(frame, text=title, font=('Arial Unicode MS', 10))
+        self.status_label.pack(pady=(0, 10))
+        
+        self.progress = ttk.Progressbar(frame, mode='indeterminate', length=340)
+        self.progress.pack()
+        
+        self.runner = BackgroundQueryRunner(self.window, db_manager, delay_ms=0)
+    
+    def run(self, work, on_done):
+        """تنفيذ work(progress) في الخلفية ثم استدعاء on_done(النتيجة) في الخيط الرئيسي"""
+        def on_progress(processed):
+            # يُستدعى من الخيط الخلفي، ويُعرض من الخيط الرئيسي
+            self.processed = processed
+        
+        def wrapped_work():
+            try:
+                return work(on_progress), None
+            except Exception as e:
+                return None, e
+        
+        def finished(outcome):
+            self.running = False
+            self.progress.stop()
+            self.runner.close()
+            self.window.destroy()
+            on_done(*outcome)
+        
+        self.running = True
+        self.progress.start(15)
+        self.runner.submit(wrapped_work, finished)
+        self.show_progress()
+    
+    def show_progress(self):
+        """تحديث عدد السجلات المعالجة"""
+        if not self.running:
+            return
+        self.status_label.config(text=f"تمت معالجة {self.processed} سجل...")
+        self.window.after(200, self.show_progress)
+    
+    # واجهات الاستخدام من التبويبات
+    @classmethod
+    def export_view(cls, parent, db_manager, fetch_page, default_name):
+        """تصدير الجدول الحالي (بنفس الفلاتر والبحث) إلى ملف"""
+        filename = filedialog.asksaveasfilename(
+            title="تصدير البيانات",
+            initialfile=default_name,
+            defaultextension=".csv",
+            filetypes=cls.FILE_TYPES
+        )
+        if not filename:
+            return
+        
+        def on_done(exported, error):
+            if error is not None:
+                messagebox.showerror("خطأ", f"فشل في تصدير البيانات: {error}")
+            else:
+                messagebox.showinfo("نجح", f"تم تصدير {exported} سجل بنجاح")
+        
+        dialog = cls(parent, db_manager, "تصدير البيانات")
+        dialog.run(lambda progress: db_manager.bulk_io.export_pages(fetch_page, filename, progress), on_done)
+    
+    @classmethod
+    def import_file(cls, parent, db_manager, kind, user_id, on_imported=None):
+        """استيراد مراسلات من ملف"""
+        filename = filedialog.askopenfilename(
+            title="استيراد مراسلات",
+            filetypes=cls.FILE_TYPES
+        )
+        if not filename:
+            return
+        
+        def on_done(result, error):
+            if error is not None:
+                messagebox.showerror("خطأ", f"فشل في استيراد الملف: {error}")
+                return
+            
+            message = (
+                f"عدد السجلات: {result['total']}\n"
+                f"تمت إضافة: {result['inserted']}\n"
+                f"مكرر (تم تجاهله): {result['duplicates']}\n"
+                f"مرفوض: {result['rejected']}"
+            )
+            if result['errors']:
+                details = "\n".join(f"سجل {number}: {error}" for number, error in result['errors'][:10])
+                message += f"\n\n{details}"
+            messagebox.showinfo("نتيجة الاستيراد", message)
+            
+            if on_imported and result['inserted']:
+                on_imported()
+        
+        dialog = cls(parent, db_manager, "استيراد مراسلات")
+        dialog.run(lambda progress: db_manager.bulk_io.import_file(kind, filename, user_id, progress), on_done)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قائمة منسدلة مع البحث أثناء الكتابة
+Type-ahead Combobox
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+from gui.background_query import BackgroundQueryRunner
+
+class TypeaheadCombobox(ttk.Combobox):
+    """قائمة منسدلة تجلب الخيارات المطابقة للنص المكتوب بدلاً من تحميل كل السجلات
+    
+    search(prefix) تعيد قائمة أزواج (نص العرض, القيمة) ويتم تنفيذها في الخلفية
+    بعد توقف الكتابة. القيمة المختارة متاحة من get_value() أو من القاموس mapping.
+    """
+    
+    def __init__(self, parent, db_manager, search, delay_ms=200, **kwargs):
+        self.text_var = kwargs.pop('textvariable', None) or tk.StringVar()
+        super().__init__(parent, textvariable=self.text_var, **kwargs)
+        
+        self.search = search
+        # نص العرض -> القيمة (يُحدث في نفس القاموس حتى تبقى المراجع الخارجية صالحة)
+        self.mapping = {}
+        self._last_prefix = None
+        
+        self.runner = BackgroundQueryRunner(self, db_manager, delay_ms=delay_ms)
+        self.bind('<KeyRelease>', self.on_key_release)
+        self.bind('<Destroy>', lambda event: self.runner.close() if event.widget is self else None)
+    
+    def reload(self, prefix=''):
+        """تحميل الخيارات المطابقة للنص مباشرة (بدون انتظار)"""
+        self._last_prefix = prefix
+        self.set_options(self.search(prefix))
+    
+    def set_options(self, options):
+        """تعيين الخيارات المعروضة في القائمة"""
+        # الاحتفاظ بالقيمة المختارة حالياً حتى لو لم تعد ضمن نتائج البحث
+        selected = self.text_var.get()
+        kept = {selected: self.mapping[selected]} if selected in self.mapping else {}
+        
+        self.mapping.clear()
+        self.mapping.update(kept)
+        for display_text, value in options:
+            self.mapping[display_text] = value
+        self['values'] = [display_text for display_text, _ in options]
+    
+    def on_key_release(self, event):
+        """البحث بعد توقف الكتابة"""
+        if event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        
+        prefix = self.text_var.get().strip()
+        if prefix == self._last_prefix or prefix in self.mapping:
+            return
+        self._last_prefix = prefix
+        
+        self.runner.submit(lambda: self.search(prefix), self.set_options)
+    
+    def get_value(self):
+        """القيمة المرتبطة بالنص المختار (أو None)"""
+        return self.mapping.get(self.text_var.get())
+    
+    def set_value(self, display_text, value):
+        """اختيار قيمة محددة (مثل القيمة المحفوظة عند التعديل)"""
+        self.mapping[display_text] = value
+        self.text_var.set(display_text)
+    
+    def clear(self):
+        """مسح النص المختار"""
+        self.text_var.set('')
@@ -8,6 +8,8 @@ Users Management Tab
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from gui.change_monitor import ChangeMonitor
+
 class UsersTab:
     def __init__(self, parent, db_manager, auth_manager, user_data):
         self.parent = parent
@@ -135,6 +137,14 @@ class UsersTab:
         self.tree.bind('<Double-1>', self.on_double_click)
         self.tree.bind('<Button-3>', self.show_context_menu)
     
+    def apply_changes(self, changes):
+        """إعادة تحميل قائمة المستخدمين عند تغيرها (من سجل التغييرات)"""
+        self.refresh_data()
+    
+    def notify_data_changed(self):
+        """طلب تحديث التبويبات بعد التعديل"""
+        self.frame.event_generate(ChangeMonitor.DATA_CHANGED)
+    
     def refresh_data(self):
         """تحديث بيانات الجدول"""
         # مسح البيانات الحالية
@@ -264,7 +274,7 @@ class UsersTab:
             self.db_manager,
             self.auth_manager,
             self.user_data,
-            callback=self.refresh_data,
+            callback=self.notify_data_changed,
             notify=getattr(self.parent, 'show_notification', None)
         )
     
@@ -285,7 +295,7 @@ class UsersTab:
             self.auth_manager,
             self.user_data,
             user_id=user_id,
-            callback=self.refresh_data,
+            callback=self.notify_data_changed,
             notify=getattr(self.parent, 'show_notification', None)
         )
     
@@ -312,7 +322,7 @@ class UsersTab:
         # تعطيل المستخدم
         if self.auth_manager.update_user(user_id, is_active=False):
             messagebox.showinfo("نجح", "تم تعطيل المستخدم بنجاح")
-            self.refresh_data()
+            self.notify_data_changed()
         else:
             messagebox.showerror("خطأ", "فشل في تعطيل المستخدم")
     
@@ -334,7 +344,7 @@ class UsersTab:
         # تفعيل المستخدم
         if self.auth_manager.update_user(user_id, is_active=True):
             messagebox.showinfo("نجح", "تم تفعيل المستخدم بنجاح")
-            self.refresh_data()
+            self.notify_data_changed()
         else:
             messagebox.showerror("خطأ", "فشل في تفعيل المستخدم")
     
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة التخزين المؤقت لقوائم الاختيار
+Lookup Cache Module
+"""
+
+import threading
+from collections import OrderedDict
+
+class LookupCache:
+    """تخزين مشترك لقوائم الاختيار في النماذج (قراءة عند الطلب وحذف عند الكتابة)
+    
+    كل قائمة محفوظة مع الجداول التي تعتمد عليها، وعند الكتابة في أحد هذه الجداول
+    (execute_update أو transaction) تُحذف القوائم المتأثرة فقط لتُقرأ من جديد عند
+    أول طلب. البحث بالبادئة يُخزن أيضاً بحيث لا يتكرر نفس الاستعلام أثناء الكتابة.
+    """
+    
+    # جداول المراسلات حسب النوع
+    TABLES = {
+        'incoming': 'incoming_correspondence',
+        'outgoing': 'outgoing_correspondence',
+    }
+    DATE_COLUMNS = {
+        'incoming': 'received_date',
+        'outgoing': 'sent_date',
+    }
+    
+    def __init__(self, db_manager, max_entries=256, limit=50):
+        self.db_manager = db_manager
+        self.max_entries = max_entries
+        self.limit = limit
+        
+        # المفتاح -> (الجداول المعتمد عليها, القيمة)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # يزيد مع كل حذف حتى لا تُحفظ قائمة بدأ تحميلها قبل الكتابة
+        self._generation = 0
+        
+        db_manager.add_write_listener(self.invalidate)
+    
+    def get(self, key, tables, loader):
+        """قراءة قائمة من الذاكرة أو تحميلها بـ loader وحفظها"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][1]
+            generation = self._generation
+        
+        value = loader()
+        
+        with self._lock:
+            if generation != self._generation:
+                return value
+            self._entries[key] = (frozenset(tables), value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+    
+    def invalidate(self, tables=None):
+        """حذف القوائم المعتمدة على الجداول المعدلة (أو الكل إذا كانت الجداول غير معروفة)"""
+        with self._lock:
+            self._generation += 1
+            if tables is None:
+                self._entries.clear()
+                return
+            tables = set(tables)
+            for key in [key for key, (depends, _) in self._entries.items() if depends & tables]:
+                del self._entries[key]
+    
+    # قوائم المراسلات
+    def recent_correspondence(self, kind, open_only=False):
+        """آخر المراسلات (لعرضها في القائمة قبل الكتابة)"""
+        return self.search_correspondence(kind, '', open_only)
+    
+    def search_correspondence(self, kind, prefix, open_only=False):
+        """المراسلات التي يبدأ رقمها أو كود موضوعها أو موضوعها بالنص المكتوب
+        
+        open_only: استبعاد المراسلات التي آخر متابعة لها مغلقة
+        """
+        prefix = (prefix or '').strip()
+        key = ('correspondence', kind, prefix, open_only)
+        # حالة آخر متابعة تتغير مع جدول المتابعات (عبر المشغلات)
+        tables = (self.TABLES[kind], 'follow_up') if open_only else (self.TABLES[kind],)
+        return self.get(key, tables, lambda: self._query_correspondence(kind, prefix, open_only))
+    
+    def _query_correspondence(self, kind, prefix, open_only):
+        table = self.TABLES[kind]
+        date_column = self.DATE_COLUMNS[kind]
+        
+        conditions = []
+        params = []
+        if open_only:
+            conditions.append("COALESCE(last_follow_up_status, '') != 'مغلق'")
+        
+        if prefix:
+            # GLOB بالبادئة يستخدم فهرس reference_number
+            pattern = prefix.replace('[', '[[]').replace('*', '[*]').replace('?', '[?]') + '*'
+            matches = ["reference_number GLOB ?", "subject_code GLOB ?"]
+            params.extend([pattern, pattern.upper()])
+            
+            # الموضوع من الفهرس النصي (بادئات الكلمات)، أو بادئة النص إذا كان الفهرس غير متاح
+            search_index = self.db_manager.search_index
+            match = search_index.match_expression(prefix) if search_index.enabled else None
+            if match:
+                matches.append(f"id IN (SELECT rowid FROM {kind}_fts WHERE {kind}_fts MATCH ?)")
+                params.append(match)
+            else:
+                matches.append("subject GLOB ?")
+                params.append(pattern)
+            conditions.append(f"({' OR '.join(matches)})")
+        
+        query = f"SELECT id, reference_number, subject_code, subject FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {date_column} DESC, id DESC LIMIT ?"
+        params.append(self.limit)
+        
+        return [dict(row) for row in self.db_manager.execute_query(query, params)]
+    
+    def correspondence_by_id(self, kind, correspondence_id):
+        """مراسلة واحدة بالمعرف (لتحديد القيمة المحفوظة عند التعديل)"""
+        table = self.TABLES[kind]
+        key = ('correspondence_id', kind, correspondence_id)
+        
+        def load():
+            rows = self.db_manager.execute_query(
+                f"SELECT id, reference_number, subject_code, subject FROM {table} WHERE id = ?",
+                (correspondence_id,)
+            )
+            return dict(rows[0]) if rows else None
+        
+        return self.get(key, (table,), load)
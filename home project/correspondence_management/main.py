@@ -8,6 +8,11 @@ Correspondence Management System
 التاريخ: 2025
 """
 
+import time
+
+# بداية التشغيل (لقياس زمن ظهور نافذة تسجيل الدخول)
+STARTUP_STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3    #
@@ -15,16 +20,19 @@ import hashlib
 from datetime import datetime
 import os
 import sys
+import argparse
 
 # إضافة مسار المشروع لاستيراد الوحدات
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database import DatabaseManager
 from auth import AuthManager
-from gui.main_window import MainWindow
+
+# الحد المقبول لزمن فتح النوافذ (بالمللي ثانية)
+STARTUP_BUDGET_MS = 1000
 
 class CorrespondenceApp:
-    def __init__(self):
+    def __init__(self, db_manager=None, auth_class=AuthManager):
         self.root = tk.Tk()
         self.root.title("نظام إدارة المراسلات")
         self.root.geometry("1200x800")
@@ -33,9 +41,9 @@ class CorrespondenceApp:
         # تعيين الخط العربي
         self.setup_fonts()
         
-        # إنشاء قاعدة البيانات
-        self.db_manager = DatabaseManager()
-        self.auth_manager = AuthManager(self.db_manager)
+        # إنشاء قاعدة البيانات (أو الاتصال بخادم قاعدة البيانات)
+        self.db_manager = db_manager or DatabaseManager()
+        self.auth_manager = auth_class(self.db_manager)
         
         # إنشاء المستخدم الافتراضي (admin)
         self.create_default_admin()
@@ -60,14 +68,7 @@ class CorrespondenceApp:
         """إنشاء مستخدم المدير الافتراضي"""
         try:
             # التحقق من وجود مستخدم admin
-            if not self.auth_manager.user_exists('admin'):
-                self.auth_manager.create_user(
-                    username='admin',
-                    password='admin123',
-                    full_name='مدير النظام',
-                    role='admin',
-                    department='الإدارة'
-                )
+            if self.auth_manager.create_default_admin():
                 print("تم إنشاء مستخدم المدير الافتراضي:")
                 print("اسم المستخدم: admin")
                 print("كلمة المرور: admin123")
@@ -78,9 +79,21 @@ class CorrespondenceApp:
         """عرض نافذة تسجيل الدخول"""
         from gui.login_window import LoginWindow
         login_window = LoginWindow(self.root, self.auth_manager, self.on_login_success)
+        self.root.after_idle(lambda: self.report_startup_time("نافذة تسجيل الدخول", STARTUP_STARTED))
+    
+    def report_startup_time(self, label, started):
+        """طباعة زمن فتح النافذة مع تحذير إذا تجاوز الحد"""
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"زمن فتح {label}: {elapsed:.0f} ms")
+        if elapsed > STARTUP_BUDGET_MS:
+            print(f"تحذير: زمن فتح {label} تجاوز الحد ({STARTUP_BUDGET_MS} ms)")
         
     def on_login_success(self, user_data):
         """عند نجاح تسجيل الدخول"""
+        started = time.perf_counter()
+        # النافذة الرئيسية والتبويبات تُستورد بعد تسجيل الدخول فقط
+        from gui.main_window import MainWindow
+        
         # إغلاق نافذة تسجيل الدخول
         for widget in self.root.winfo_children():
             widget.destroy()
@@ -92,6 +105,8 @@ class CorrespondenceApp:
             self.auth_manager, 
             user_data
         )
+        self.root.after_idle(lambda: self.report_startup_time("النافذة الرئيسية", started))
+        
         # رسالة ترحيب فورية
         self.root.after(500, lambda: self.main_window.show_notification(f"مرحبًا {user_data['full_name']}! تم تسجيل الدخول بنجاح.", type_="success", duration=4000))
         
@@ -104,8 +119,44 @@ class CorrespondenceApp:
             pass
             
         # تشغيل الحلقة الرئيسية
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            # إغلاق الاتصالات الدائمة بقاعدة البيانات
+            self.db_manager.close()
+
+def parse_args(argv=None):
+    """خيارات التشغيل: برنامج عادي، أو خادم قاعدة بيانات، أو عميل لخادم"""
+    parser = argparse.ArgumentParser(description="نظام إدارة المراسلات")
+    parser.add_argument('--db', default='correspondence.db', help="ملف قاعدة البيانات")
+    parser.add_argument('--server', nargs='?', const='127.0.0.1:8765', metavar='HOST:PORT',
+                        help="تشغيل خادم قاعدة البيانات لعدة أجهزة (بدون واجهة، عنوان غير 127.0.0.1 يتطلب --token)")
+    parser.add_argument('--connect', metavar='URL', help="الاتصال بخادم قاعدة البيانات (مثل 192.168.1.10:8765)")
+    parser.add_argument('--token', help="رمز الدخول المشترك بين الخادم والأجهزة")
+    parser.add_argument('--profile', metavar='FILE', help="حفظ إحصائيات زمن الاستعلامات في ملف JSON عند الخروج")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    app = CorrespondenceApp()
-    app.run()
\ No newline at end of file
+    args = parse_args()
+    
+    if args.server:
+        from server import serve, DEFAULT_PORT
+        host, _, port = args.server.partition(':')
+        serve(args.db, host or '127.0.0.1', int(port or DEFAULT_PORT), token=args.token, profile_path=args.profile)
+    else:
+        db_manager = None
+        auth_class = AuthManager
+        if args.connect:
+            from remote_client import RemoteDatabaseManager, RemoteAuthManager
+            db_manager = RemoteDatabaseManager(args.connect, token=args.token)
+            auth_class = RemoteAuthManager
+        elif args.db != 'correspondence.db':
+            db_manager = DatabaseManager(args.db)
+        
+        app = CorrespondenceApp(db_manager, auth_class)
+        try:
+            app.run()
+        finally:
+            if args.profile:
+                from query_profiler import save_snapshot
+                save_snapshot(app.db_manager.profiler.snapshot(), args.profile)
\ No newline at end of file
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة ترقية مخطط قاعدة البيانات
+Schema Migrations Module
+"""
+
+import sqlite3
+
+class SchemaMigrations:
+    """ترقية مخطط قاعدة البيانات بخطوات مرقمة تُطبق مرة واحدة فقط
+    
+    رقم آخر خطوة مطبقة محفوظ في PRAGMA user_version (في رأس ملف قاعدة البيانات)،
+    فالتشغيل العادي يقرأ الرقم فقط بدون إنشاء أو فحص للجداول. الخطوات المعلقة
+    تُطبق كلها في معاملة واحدة مع تحديث الرقم: إما أن تُطبق جميعها أو لا شيء.
+    
+    كل خطوة يجب أن تكون قابلة للتكرار (IF NOT EXISTS وفحص الأعمدة)، لأن قواعد
+    البيانات المنشأة قبل هذا النظام (الرقم 0) قد تحتوي على جزء منها بالفعل.
+    
+    جمل كل خطوة مكتوبة هنا كما طُبقت (بدون الاعتماد على ثوابت أو دوال الوحدات
+    الأخرى)، فلا يتغير ما تفعله خطوة مرقمة. أي تغيير في المخطط (مشغل أو عرض أو
+    أعمدة فهرس) يُضاف كخطوة جديدة في آخر القائمة برقم جديد، ولا تُعدل الخطوات السابقة.
+    """
+    
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        
+        # (الرقم, الوصف, الدالة) - الدالة تستقبل مؤشر المعاملة
+        self.steps = (
+            (1, "الجداول الأساسية", self._create_tables),
+            (2, "أعمدة الأكواد والمسئولين", self._add_columns),
+            (3, "توحيد حالات المتابعة", self._normalize_follow_up_statuses),
+            (4, "نوع النشاط وفهارس سجل النشاطات", self._activity_log_type),
+            (5, "فهرس البحث النصي", self._search_index),
+            (6, "جدول التجميع الشهري", self._monthly_counts),
+            (7, "عدادات المتابعات وعرض جدول المتابعات", self._follow_up_summary),
+            (8, "جدول الإعدادات", self._app_settings),
+            (9, "جدول التسلسلات", self._sequences),
+            (10, "سجل التغييرات", self._change_feed),
+        )
+    
+    @property
+    def latest_version(self):
+        """رقم آخر خطوة"""
+        return self.steps[-1][0]
+    
+    @staticmethod
+    def current_version(cursor):
+        """رقم آخر خطوة مطبقة على قاعدة البيانات"""
+        cursor.execute("PRAGMA user_version")
+        return cursor.fetchone()[0]
+    
+    def migrate(self):
+        """تطبيق الخطوات المعلقة (يعيد عدد الخطوات المطبقة)"""
+        with self.db_manager.connection() as conn:
+            if self.current_version(conn.cursor()) >= self.latest_version:
+                return 0
+        
+        with self.db_manager.transaction() as cursor:
+            # إعادة القراءة بعد حجز قفل الكتابة (نسخة أخرى قد تكون طبقت الخطوات)
+            version = self.current_version(cursor)
+            applied = 0
+            for number, description, step in self.steps:
+                if number <= version:
+                    continue
+                step(cursor)
+                applied += 1
+                print(f"تم تطبيق ترقية قاعدة البيانات {number}: {description}")
+            
+            if applied:
+                cursor.execute(f"PRAGMA user_version = {self.latest_version}")
+        return applied
+    
+    # الخطوات
+    @staticmethod
+    def _columns(cursor, table):
+        cursor.execute(f"PRAGMA table_info({table})")
+        return [column[1] for column in cursor.fetchall()]
+    
+    def _create_tables(self, cursor):
+        """الجداول الأساسية وفهارسها"""
+        # جدول المستخدمين
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                full_name TEXT NOT NULL,
+                role TEXT NOT NULL CHECK (role IN ('admin', 'employee', 'viewer')),
+                department TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                is_active BOOLEAN DEFAULT 1
+            )
+        ''')
+        
+        # جدول المراسلات الواردة
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS incoming_correspondence (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                reference_number TEXT UNIQUE NOT NULL,
+                subject TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                sender_department TEXT,
+                received_date DATE NOT NULL,
+                priority TEXT DEFAULT 'عادي' CHECK (priority IN ('عاجل', 'مهم', 'عادي')),
+                status TEXT DEFAULT 'جديد' CHECK (status IN ('جديد', 'قيد المراجعة', 'تم الرد', 'مؤرشف')),
+                content TEXT,
+                notes TEXT,
+                created_by INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (created_by) REFERENCES users (id)
+            )
+        ''')
+        
+        # جدول المراسلات الصادرة
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS outgoing_correspondence (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                reference_number TEXT UNIQUE NOT NULL,
+                subject TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                recipient_department TEXT,
+                sent_date DATE NOT NULL,
+                priority TEXT DEFAULT 'عادي' CHECK (priority IN ('عاجل', 'مهم', 'عادي')),
+                status TEXT DEFAULT 'مسودة' CHECK (status IN ('مسودة', 'تم الإرسال', 'تم الاستلام', 'مؤرشف')),
+                content TEXT,
+                notes TEXT,
+                related_incoming_id INTEGER,
+                created_by INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (related_incoming_id) REFERENCES incoming_correspondence (id),
+                FOREIGN KEY (created_by) REFERENCES users (id)
+            )
+        ''')
+        
+        # جدول متابعة الموضوعات
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS follow_up (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                correspondence_type TEXT NOT NULL CHECK (correspondence_type IN ('incoming', 'outgoing')),
+                correspondence_id INTEGER NOT NULL,
+                follow_up_date DATE NOT NULL,
+                action_required TEXT NOT NULL,
+                responsible_person TEXT,
+                status TEXT DEFAULT 'معلق' CHECK (status IN ('معلق', 'جاري', 'مغلق')),
+                notes TEXT,
+                created_by INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (created_by) REFERENCES users (id)
+            )
+        ''')
+        
+        # جدول سجل النشاطات
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS activity_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                action TEXT NOT NULL,
+                table_name TEXT,
+                record_id INTEGER,
+                old_values TEXT,
+                new_values TEXT,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
+        # إنشاء فهارس لتحسين الأداء
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_incoming_ref ON incoming_correspondence(reference_number)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_outgoing_ref ON outgoing_correspondence(reference_number)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_incoming_date ON incoming_correspondence(received_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_outgoing_date ON outgoing_correspondence(sent_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_follow_up_date ON follow_up(follow_up_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_incoming_status_date ON incoming_correspondence(status, received_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_follow_up_status_date ON follow_up(status, follow_up_date)')
+    
+    def _add_columns(self, cursor):
+        """أعمدة الأكواد والمسئولين وفهارس البحث بالبادئة"""
+        added = {
+            'incoming_correspondence': (
+                ('subject_code', "تم إضافة عمود كود الموضوع"),
+                ('responsible_person', "تم إضافة عمود المسئول"),
+            ),
+            'follow_up': (
+                ('follow_up_code', "تم إضافة عمود كود المتابعة"),
+            ),
+            'outgoing_correspondence': (
+                ('subject_code', "تم إضافة عمود كود الموضوع للصادرة"),
+                ('recipient_engineer', "تم إضافة عمود المهندس المستلم"),
+                ('responsible_engineer', "تم إضافة عمود المهندس المسئول"),
+                ('engineer', "تم إضافة عمود مهندس/مهندسة"),
+            ),
+        }
+        for table, columns in added.items():
+            existing = self._columns(cursor, table)
+            for column, message in columns:
+                if column not in existing:
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} TEXT')
+                    print(message)
+        
+        # فهارس البحث بالبادئة في قوائم الاختيار
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_incoming_subject_code ON incoming_correspondence(subject_code)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_outgoing_subject_code ON outgoing_correspondence(subject_code)')
+    
+    def _normalize_follow_up_statuses(self, cursor):
+        """تحويل حالات المتابعة القديمة إلى الحالات الحالية"""
+        cursor.execute('''
+            UPDATE follow_up SET status = CASE status
+                WHEN 'قيد التنفيذ' THEN 'جاري'
+                ELSE 'مغلق'
+            END
+            WHERE status IN ('قيد التنفيذ', 'مكتمل', 'ملغي')
+        ''')
+        if cursor.rowcount:
+            print("تم تحديث حالات المتابعة")
+    
+    def _activity_log_type(self, cursor):
+        """نوع النشاط يحدد عند الكتابة بدلاً من تصنيفه عند العرض، وفهارس التصفح حسب الوقت"""
+        if 'action_type' not in self._columns(cursor, 'activity_log'):
+            cursor.execute('ALTER TABLE activity_log ADD COLUMN action_type TEXT')
+            cursor.execute('''
+                UPDATE activity_log SET action_type = CASE
+                    WHEN instr(lower(action), 'حذف') > 0 OR instr(lower(action), 'delete') > 0 THEN 'delete'
+                    WHEN instr(lower(action), 'تعديل') > 0 OR instr(lower(action), 'تحديث') > 0
+                         OR instr(lower(action), 'edit') > 0 THEN 'edit'
+                    WHEN instr(lower(action), 'إضافة') > 0 OR instr(lower(action), 'add') > 0
+                         OR instr(lower(action), 'إنشاء') > 0 THEN 'add'
+                    WHEN instr(lower(action), 'دخول') > 0 OR instr(lower(action), 'login') > 0 THEN 'login'
+                    ELSE 'default'
+                END
+            ''')
+            print("تم إضافة عمود نوع النشاط")
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_time ON activity_log(timestamp, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_user ON activity_log(user_id, timestamp, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_table ON activity_log(table_name, timestamp, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_type ON activity_log(action_type, timestamp, id)')
+    
+    @staticmethod
+    def _normalize_arabic_sql(expression):
+        """نفس توحيد SearchIndex.normalize كتعبير SQL لمشغلات الخطوة 5
+        
+        تغيير التوحيد يتطلب خطوة جديدة تعيد إنشاء المشغلات وبناء الفهرس.
+        """
+        replacements = (
+            ('\u064b', ''), ('\u064c', ''), ('\u064d', ''), ('\u064e', ''),
+            ('\u064f', ''), ('\u0650', ''), ('\u0651', ''), ('\u0652', ''),
+            ('\u0670', ''), ('\u0640', ''),
+            ('أ', 'ا'), ('إ', 'ا'), ('آ', 'ا'), ('ٱ', 'ا'),
+            ('ى', 'ي'), ('ة', 'ه'),
+        )
+        sql = f"COALESCE({expression}, '')"
+        for source, target in replacements:
+            sql = f"replace({sql}, '{source}', '{target}')"
+        return sql
+    
+    def _search_index(self, cursor):
+        """جداول FTS5 للمراسلات والمتابعات والمشغلات التي تبقيها متزامنة"""
+        fts_tables = {
+            'incoming_correspondence': ('incoming_fts', ('reference_number', 'subject_code', 'subject', 'sender', 'notes')),
+            'outgoing_correspondence': ('outgoing_fts', ('reference_number', 'subject_code', 'subject', 'recipient', 'notes')),
+            'follow_up': ('follow_up_fts', ('follow_up_code', 'action_required', 'responsible_person', 'notes')),
+        }
+        try:
+            for table, (fts_table, columns) in fts_tables.items():
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,))
+                exists = cursor.fetchone() is not None
+                
+                cursor.execute(f'''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                        {', '.join(columns)},
+                        tokenize = 'unicode61 remove_diacritics 2',
+                        prefix = '2 3'
+                    )
+                ''')
+                
+                column_list = ', '.join(columns)
+                new_values = ', '.join(self._normalize_arabic_sql(f'new.{column}') for column in columns)
+                
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN
+                        INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.id, {new_values});
+                    END
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN
+                        DELETE FROM {fts_table} WHERE rowid = old.id;
+                    END
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {column_list} ON {table} BEGIN
+                        DELETE FROM {fts_table} WHERE rowid = old.id;
+                        INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.id, {new_values});
+                    END
+                ''')
+                
+                # بناء الفهرس للبيانات الموجودة عند إنشائه لأول مرة
+                if not exists:
+                    row_values = ', '.join(self._normalize_arabic_sql(column) for column in columns)
+                    cursor.execute(f'''
+                        INSERT INTO {fts_table} (rowid, {column_list})
+                        SELECT id, {row_values} FROM {table}
+                    ''')
+        except sqlite3.OperationalError as e:
+            # FTS5 غير متوفر في نسخة SQLite الحالية، يتم الرجوع للبحث بـ LIKE
+            print(f"تحذير: تعذر إنشاء فهرس البحث النصي: {e}")
+    
+    def _monthly_counts(self, cursor):
+        """جدول التجميع الشهري للمراسلات والمشغلات التي تحدثه"""
+        sources = {
+            'incoming': ('incoming_correspondence', 'received_date'),
+            'outgoing': ('outgoing_correspondence', 'sent_date'),
+        }
+        try:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'monthly_counts'")
+            exists = cursor.fetchone() is not None
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS monthly_counts (
+                    kind TEXT NOT NULL,
+                    year_month TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (kind, year_month)
+                ) WITHOUT ROWID
+            ''')
+            
+            for kind, (table, date_column) in sources.items():
+                increment = f'''
+                    INSERT INTO monthly_counts (kind, year_month, count)
+                    VALUES ('{kind}', substr(new.{date_column}, 1, 7), 1)
+                    ON CONFLICT (kind, year_month) DO UPDATE SET count = count + 1;
+                '''
+                decrement = f'''
+                    UPDATE monthly_counts SET count = count - 1
+                    WHERE kind = '{kind}' AND year_month = substr(old.{date_column}, 1, 7);
+                '''
+                
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS monthly_{kind}_ai AFTER INSERT ON {table}
+                    WHEN new.{date_column} IS NOT NULL BEGIN
+                        {increment}
+                    END
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS monthly_{kind}_ad AFTER DELETE ON {table}
+                    WHEN old.{date_column} IS NOT NULL BEGIN
+                        {decrement}
+                    END
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS monthly_{kind}_au AFTER UPDATE OF {date_column} ON {table}
+                    WHEN substr(old.{date_column}, 1, 7) IS NOT substr(new.{date_column}, 1, 7) BEGIN
+                        {decrement}
+                        INSERT INTO monthly_counts (kind, year_month, count)
+                        SELECT '{kind}', substr(new.{date_column}, 1, 7), 1
+                        WHERE new.{date_column} IS NOT NULL
+                        ON CONFLICT (kind, year_month) DO UPDATE SET count = count + 1;
+                    END
+                ''')
+                
+                # تعبئة الجدول من البيانات الموجودة عند إنشائه لأول مرة
+                if not exists:
+                    cursor.execute(f'''
+                        INSERT INTO monthly_counts (kind, year_month, count)
+                        SELECT '{kind}', substr({date_column}, 1, 7), COUNT(*)
+                        FROM {table}
+                        WHERE {date_column} IS NOT NULL
+                        GROUP BY substr({date_column}, 1, 7)
+                    ''')
+        except sqlite3.OperationalError as e:
+            print(f"تحذير: تعذر إنشاء جدول التجميع الشهري: {e}")
+    
+    def _follow_up_summary(self, cursor):
+        """عداد المتابعات وآخر حالة على كل مراسلة (تحدثها المشغلات) وعرض جدول المتابعات"""
+        parents = {
+            'incoming': 'incoming_correspondence',
+            'outgoing': 'outgoing_correspondence',
+        }
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_follow_up_correspondence
+            ON follow_up(correspondence_type, correspondence_id, follow_up_date, id)
+        ''')
+        
+        refresh_statements = []
+        for correspondence_type, table in parents.items():
+            summary = f'''
+                follow_up_count = (
+                    SELECT COUNT(*) FROM follow_up f
+                    WHERE f.correspondence_type = '{correspondence_type}' AND f.correspondence_id = {table}.id
+                ),
+                last_follow_up_status = (
+                    SELECT f.status FROM follow_up f
+                    WHERE f.correspondence_type = '{correspondence_type}' AND f.correspondence_id = {table}.id
+                    ORDER BY f.follow_up_date DESC, f.id DESC LIMIT 1
+                )
+            '''
+            
+            if 'follow_up_count' not in self._columns(cursor, table):
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN follow_up_count INTEGER DEFAULT 0')
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN last_follow_up_status TEXT')
+                # تعبئة العدادات للبيانات الموجودة
+                cursor.execute(f'UPDATE {table} SET {summary}')
+                print(f"تم إضافة عداد المتابعات لجدول {table}")
+            
+            for row in ('new', 'old'):
+                refresh_statements.append((row, f'''
+                    UPDATE {table} SET {summary}
+                    WHERE {row}.correspondence_type = '{correspondence_type}' AND id = {row}.correspondence_id;
+                '''))
+        
+        new_refresh = ''.join(sql for row, sql in refresh_statements if row == 'new')
+        old_refresh = ''.join(sql for row, sql in refresh_statements if row == 'old')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS follow_up_summary_ai AFTER INSERT ON follow_up BEGIN
+                {new_refresh}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS follow_up_summary_ad AFTER DELETE ON follow_up BEGIN
+                {old_refresh}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS follow_up_summary_au
+            AFTER UPDATE OF status, follow_up_date, correspondence_type, correspondence_id ON follow_up BEGIN
+                {old_refresh}
+                {new_refresh}
+            END
+        ''')
+        
+        # عرض جدول المتابعات: رقم المراسلة المرتبطة يُقرأ بالمفتاح الأساسي لكل صف معروض فقط
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS follow_up_grid AS
+            SELECT f.id, f.follow_up_code, f.correspondence_type, f.correspondence_id, f.follow_up_date,
+                   f.action_required, f.responsible_person, f.status, f.notes,
+                   CASE f.correspondence_type
+                       WHEN 'incoming' THEN (SELECT reference_number FROM incoming_correspondence WHERE id = f.correspondence_id)
+                       WHEN 'outgoing' THEN (SELECT reference_number FROM outgoing_correspondence WHERE id = f.correspondence_id)
+                   END as correspondence_ref
+            FROM follow_up f
+        ''')
+    
+    def _app_settings(self, cursor):
+        """جدول الإعدادات (سياسة الاحتفاظ وإعدادات كلمات المرور)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS app_settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+    
+    def _sequences(self, cursor):
+        """جدول التسلسلات (صف لكل سلسلة أرقام)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sequences (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+    
+    def _change_feed(self, cursor):
+        """جدول التغييرات ومشغلات تسجيل كل إضافة وتعديل وحذف"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS changes (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                operation TEXT NOT NULL CHECK (operation IN ('insert', 'update', 'delete'))
+            )
+        ''')
+        
+        for table in ('incoming_correspondence', 'outgoing_correspondence', 'follow_up', 'users'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS changes_{table}_ai AFTER INSERT ON {table} BEGIN
+                    INSERT INTO changes (table_name, row_id, operation) VALUES ('{table}', new.id, 'insert');
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS changes_{table}_au AFTER UPDATE ON {table} BEGIN
+                    INSERT INTO changes (table_name, row_id, operation) VALUES ('{table}', new.id, 'update');
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS changes_{table}_ad AFTER DELETE ON {table} BEGIN
+                    INSERT INTO changes (table_name, row_id, operation) VALUES ('{table}', old.id, 'delete');
+                END
+            ''')
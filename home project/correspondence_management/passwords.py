@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة تشفير كلمات المرور
+Password Hashing Module
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class PasswordHasher:
+    """تشفير كلمات المرور بملح عشوائي وتكلفة قابلة للتعديل (PBKDF2 أو scrypt)
+    
+    الصيغة المحفوظة: algorithm$cost$salt$hash
+        pbkdf2_sha256$600000$<salt>$<hash>     التكلفة = عدد التكرارات
+        scrypt$16384:8:1$<salt>$<hash>         التكلفة = n:r:p
+    القيم القديمة (SHA-256 بدون ملح) تُقبل عند التحقق، وneeds_rehash تحدد متى
+    يجب إعادة التشفير بالإعدادات الحالية (عند تسجيل الدخول).
+    """
+    
+    DEFAULT_COSTS = {
+        'pbkdf2_sha256': '600000',
+        'scrypt': '16384:8:1',
+    }
+    SALT_BYTES = 16
+    
+    def __init__(self, algorithm='pbkdf2_sha256', cost=None, cache_size=32, cache_ttl=300):
+        if algorithm not in self.DEFAULT_COSTS:
+            raise ValueError(f"خوارزمية غير مدعومة: {algorithm}")
+        if algorithm == 'scrypt' and not hasattr(hashlib, 'scrypt'):
+            raise ValueError("scrypt غير متاح في هذه النسخة من Python")
+        self.algorithm = algorithm
+        self.cost = str(cost or self.DEFAULT_COSTS[algorithm])
+        
+        # التحققات الناجحة الأخيرة: (القيمة المحفوظة, HMAC لكلمة المرور) -> وقت التحقق
+        # المفتاح عشوائي لكل تشغيل فلا يُحفظ في الذاكرة ما يمكن مقارنته بكلمة المرور مباشرة
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache = OrderedDict()
+        self._cache_key = os.urandom(32)
+        self._lock = threading.Lock()
+    
+    # التشفير
+    @staticmethod
+    def _derive(algorithm, cost, password, salt):
+        password = password.encode('utf-8')
+        if algorithm == 'pbkdf2_sha256':
+            return hashlib.pbkdf2_hmac('sha256', password, salt, int(cost))
+        n, r, p = (int(value) for value in cost.split(':'))
+        return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + (1 << 20))
+    
+    def hash(self, password):
+        """تشفير كلمة مرور جديدة بالإعدادات الحالية"""
+        salt = os.urandom(self.SALT_BYTES)
+        digest = self._derive(self.algorithm, self.cost, password, salt)
+        return f"{self.algorithm}${self.cost}${salt.hex()}${digest.hex()}"
+    
+    @staticmethod
+    def is_legacy(stored):
+        """قيمة SHA-256 القديمة (بدون ملح)"""
+        return '$' not in (stored or '')
+    
+    def verify(self, password, stored):
+        """التحقق من كلمة المرور مقابل القيمة المحفوظة (الجديدة أو القديمة)"""
+        if not stored:
+            return False
+        
+        cache_key = (stored, hmac.new(self._cache_key, password.encode('utf-8'), 'sha256').digest())
+        now = time.monotonic()
+        with self._lock:
+            verified_at = self._cache.get(cache_key)
+            if verified_at is not None and now - verified_at < self.cache_ttl:
+                self._cache.move_to_end(cache_key)
+                return True
+        
+        if self.is_legacy(stored):
+            candidate = hashlib.sha256(password.encode('utf-8')).hexdigest()
+            valid = hmac.compare_digest(candidate, stored)
+        else:
+            try:
+                algorithm, cost, salt, digest = stored.split('$')
+                candidate = self._derive(algorithm, cost, password, bytes.fromhex(salt))
+                valid = hmac.compare_digest(candidate, bytes.fromhex(digest))
+            except ValueError:
+                print("تحذير: صيغة كلمة مرور محفوظة غير معروفة")
+                return False
+        
+        if valid:
+            with self._lock:
+                self._cache[cache_key] = now
+                self._cache.move_to_end(cache_key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return valid
+    
+    def needs_rehash(self, stored):
+        """هل القيمة المحفوظة قديمة أو بإعدادات غير الإعدادات الحالية"""
+        if self.is_legacy(stored):
+            return True
+        algorithm, cost = stored.split('$')[:2]
+        return algorithm != self.algorithm or cost != self.cost
+    
+    def clear_cache(self):
+        """حذف التحققات المخزنة (عند تغيير كلمة المرور أو تسجيل الخروج)"""
+        with self._lock:
+            self._cache.clear()
+    
+    def dummy_verify(self, password):
+        """تحقق بنفس التكلفة لمستخدم غير موجود (حتى لا يكشف زمن الاستجابة وجود المستخدم)"""
+        self._derive(self.algorithm, self.cost, password, b'\0' * self.SALT_BYTES)
+
+def benchmark(password='admin123', rounds=5):
+    """زمن تسجيل الدخول لكل خوارزمية وتكلفة (بالمللي ثانية)"""
+    settings = [
+        ('legacy sha256', None, None),
+        ('pbkdf2_sha256', 'pbkdf2_sha256', '200000'),
+        ('pbkdf2_sha256', 'pbkdf2_sha256', '600000'),
+        ('pbkdf2_sha256', 'pbkdf2_sha256', '1000000'),
+    ]
+    if hasattr(hashlib, 'scrypt'):
+        settings += [
+            ('scrypt', 'scrypt', '16384:8:1'),
+            ('scrypt', 'scrypt', '32768:8:1'),
+        ]
+    
+    results = []
+    for label, algorithm, cost in settings:
+        if algorithm is None:
+            hasher = PasswordHasher(cache_size=0)
+            stored = hashlib.sha256(password.encode('utf-8')).hexdigest()
+        else:
+            hasher = PasswordHasher(algorithm, cost, cache_size=0)
+            stored = hasher.hash(password)
+        
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            hasher.verify(password, stored)
+            timings.append((time.perf_counter() - start) * 1000)
+        
+        # التحقق المتكرر من الذاكرة (نافذة تأكيد كلمة مرور المدير)
+        hasher.cache_size = 1
+        hasher.verify(password, stored)
+        start = time.perf_counter()
+        hasher.verify(password, stored)
+        cached = (time.perf_counter() - start) * 1000
+        
+        results.append({
+            'algorithm': label, 'cost': cost or '-',
+            'login_ms': round(sorted(timings)[len(timings) // 2], 2),
+            'cached_ms': round(cached, 3),
+        })
+    return results
+
+if __name__ == "__main__":
+    print(f"{'algorithm':<16}{'cost':<12}{'login (ms)':>12}{'cached (ms)':>14}")
+    for row in benchmark():
+        print(f"{row['algorithm']:<16}{row['cost']:<12}{row['login_ms']:>12}{row['cached_ms']:>14}")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة قياس أداء الاستعلامات
+Query Profiler Module
+"""
+
+import bisect
+import json
+import re
+import threading
+from collections import deque
+from datetime import datetime
+
+def save_snapshot(snapshot, path):
+    """حفظ إحصائيات QueryProfiler.snapshot (محلية أو من الخادم) في ملف JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=2)
+    return path
+
+class QueryProfiler:
+    """إحصائيات زمن كل استعلام ينفذه execute_query / execute_update
+    
+    لكل جملة SQL (بعد توحيد القيم الثابتة وقوائم ?): عدد المرات والأخطاء
+    والزمن الكلي والأقصى وتوزيع الأزمنة وعدد الصفوف. الاستعلام الذي يتجاوز
+    slow_ms يُسجل في قائمة الاستعلامات البطيئة ويُحفظ EXPLAIN QUERY PLAN له
+    (مرة واحدة لكل جملة) لمعرفة المسح الكامل للجداول.
+    
+    مع trace=True تُحسب أيضاً كل الجمل المنفذة على الاتصالات (set_trace_callback)
+    بما فيها المعاملات والإحصائيات التي لا تمر عبر execute_query (بدون زمن).
+    """
+    
+    # حدود فئات توزيع الأزمنة (بالمللي ثانية) والفئة الأخيرة لما بعدها
+    BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+    
+    # توحيد الجمل: القيم الثابتة وقوائم المعاملات والمسافات
+    _LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+    _PLACEHOLDER_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+    _SPACES = re.compile(r"\s+")
+    
+    def __init__(self, slow_ms=100, enabled=True, trace=False, max_statements=500, slow_log_size=100):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.trace = trace
+        self.max_statements = max_statements
+        
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._traced = {}
+        self._slow_log = deque(maxlen=slow_log_size)
+        self._dropped = 0
+        self._started_at = datetime.now()
+    
+    @classmethod
+    def normalize(cls, query):
+        """شكل موحد للجملة (نفس الجملة بقيم مختلفة لها نفس الشكل)"""
+        query = cls._LITERALS.sub('?', query)
+        query = cls._PLACEHOLDER_LISTS.sub('?, ...', query)
+        return cls._SPACES.sub(' ', query).strip()
+    
+    def _entry(self, key):
+        """سجل الجملة (أو None عند الوصول للحد الأقصى لعدد الجمل)"""
+        entry = self._statements.get(key)
+        if entry is None:
+            if len(self._statements) >= self.max_statements:
+                self._dropped += 1
+                return None
+            entry = self._statements[key] = {
+                'count': 0, 'errors': 0, 'last_error': None,
+                'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                'histogram': [0] * (len(self.BUCKETS_MS) + 1),
+                'plan': None, 'full_scans': [],
+            }
+        return entry
+    
+    def record(self, query, params, elapsed_ms, rows=None, error=None, conn=None):
+        """تسجيل تنفيذ جملة (conn لحساب خطة التنفيذ إذا كانت بطيئة)"""
+        if not self.enabled:
+            return
+        
+        key = self.normalize(query)
+        slow = elapsed_ms >= self.slow_ms
+        with self._lock:
+            entry = self._entry(key)
+            if entry is None:
+                return
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['histogram'][bisect.bisect_left(self.BUCKETS_MS, elapsed_ms)] += 1
+            if rows is not None and rows > 0:
+                entry['rows'] += rows
+            if error is not None:
+                entry['errors'] += 1
+                entry['last_error'] = str(error)
+            if slow:
+                self._slow_log.append({
+                    'sql': key, 'ms': round(elapsed_ms, 2), 'rows': rows,
+                    'at': datetime.now().isoformat(timespec='seconds'),
+                })
+            needs_plan = slow and error is None and conn is not None and entry['plan'] is None
+        
+        if needs_plan:
+            plan = self.explain(conn, query, params)
+            with self._lock:
+                entry['plan'] = plan
+                entry['full_scans'] = self.full_scans(plan)
+    
+    @staticmethod
+    def explain(conn, query, params=None):
+        """خطوات EXPLAIN QUERY PLAN كسطور مع إزاحة حسب المستوى"""
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params or ()).fetchall()
+        except Exception as e:
+            return [f"تعذر حساب خطة التنفيذ: {e}"]
+        
+        depths = {0: -1}
+        plan = []
+        for row in rows:
+            node_id, parent, detail = row[0], row[1], row[3]
+            depths[node_id] = depths.get(parent, -1) + 1
+            plan.append('  ' * depths[node_id] + detail)
+        return plan
+    
+    @staticmethod
+    def full_scans(plan):
+        """خطوات المسح الكامل لجدول (بدون فهرس) في خطة التنفيذ"""
+        return [
+            step.strip() for step in plan or ()
+            if step.strip().startswith('SCAN ') and 'VIRTUAL TABLE' not in step and 'USING' not in step
+        ]
+    
+    # set_trace_callback
+    def attach(self, conn):
+        """تفعيل أو إلغاء تتبع كل الجمل على اتصال حسب self.trace"""
+        conn.set_trace_callback(self._trace if self.trace and self.enabled else None)
+    
+    def _trace(self, statement):
+        key = self.normalize(statement)
+        with self._lock:
+            if key in self._traced or len(self._traced) < self.max_statements:
+                self._traced[key] = self._traced.get(key, 0) + 1
+            else:
+                self._dropped += 1
+    
+    def configure(self, slow_ms=None, enabled=None):
+        """تعديل حد الاستعلام البطيء أو إيقاف/تشغيل القياس"""
+        if slow_ms is not None:
+            self.slow_ms = float(slow_ms)
+        if enabled is not None:
+            self.enabled = bool(enabled)
+    
+    # النتائج
+    def _percentile(self, histogram, count, fraction):
+        """حد الفئة التي يقع فيها الترتيب المطلوب (تقريبي)"""
+        target = count * fraction
+        seen = 0
+        for index, bucket_count in enumerate(histogram):
+            seen += bucket_count
+            if seen >= target and bucket_count:
+                return self.BUCKETS_MS[index] if index < len(self.BUCKETS_MS) else None
+        return None
+    
+    def bucket_labels(self):
+        labels = [f"<={limit}ms" for limit in self.BUCKETS_MS]
+        return labels + [f">{self.BUCKETS_MS[-1]}ms"]
+    
+    def snapshot(self):
+        """كل الإحصائيات كقاموس قابل للتحويل إلى JSON (الأبطأ إجمالاً أولاً)"""
+        labels = self.bucket_labels()
+        with self._lock:
+            statements = []
+            for sql, entry in self._statements.items():
+                count = entry['count']
+                statements.append({
+                    'sql': sql,
+                    'count': count,
+                    'errors': entry['errors'],
+                    'last_error': entry['last_error'],
+                    'total_ms': round(entry['total_ms'], 2),
+                    'avg_ms': round(entry['total_ms'] / count, 3) if count else 0,
+                    'max_ms': round(entry['max_ms'], 2),
+                    'p50_ms': self._percentile(entry['histogram'], count, 0.5),
+                    'p95_ms': self._percentile(entry['histogram'], count, 0.95),
+                    'rows': entry['rows'],
+                    'histogram': dict(zip(labels, entry['histogram'])),
+                    'plan': entry['plan'],
+                    'full_scans': list(entry['full_scans']),
+                })
+            traced = sorted(self._traced.items(), key=lambda item: item[1], reverse=True)
+            slow_queries = list(self._slow_log)
+            dropped = self._dropped
+        
+        statements.sort(key=lambda item: item['total_ms'], reverse=True)
+        return {
+            'started_at': self._started_at.isoformat(timespec='seconds'),
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'enabled': self.enabled,
+            'slow_ms': self.slow_ms,
+            'trace': self.trace,
+            'dropped': dropped,
+            'statements': statements,
+            'slow_queries': slow_queries,
+            'traced': [{'sql': sql, 'count': count} for sql, count in traced],
+        }
+    
+    def dump(self, path):
+        """حفظ الإحصائيات في ملف JSON"""
+        return save_snapshot(self.snapshot(), path)
+    
+    def reset(self):
+        """بدء القياس من جديد"""
+        with self._lock:
+            self._statements.clear()
+            self._traced.clear()
+            self._slow_log.clear()
+            self._dropped = 0
+            self._started_at = datetime.now()
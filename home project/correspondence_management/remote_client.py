@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+الاتصال بخادم قاعدة البيانات من جهاز آخر
+Remote Database Client
+"""
+
+import http.client
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from database import DatabaseManager
+from server import DEFAULT_PORT, encode_value, decode_value
+from stats_engine import StatisticsEngine
+from activity_log import ActivityLogWriter
+from auth import AuthManager
+from sequences import SequenceAllocator
+from bulk_io import BulkIO
+
+class RemoteError(Exception):
+    """خطأ من الخادم أو في الاتصال به"""
+
+class RemoteRow(tuple):
+    """صف بنفس سلوك sqlite3.Row: القراءة بالرقم أو باسم العمود و keys()"""
+    
+    def __new__(cls, columns, values):
+        row = super().__new__(cls, values)
+        row._columns = columns
+        return row
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._columns.index(key))
+        return tuple.__getitem__(self, key)
+    
+    def keys(self):
+        return list(self._columns)
+
+class RemoteCursor:
+    """مؤشر داخل معاملة على الخادم (execute / executemany / fetchone / fetchall)"""
+    
+    def __init__(self, client, session):
+        self.client = client
+        self.session = session
+        self._rows = []
+        self.lastrowid = None
+        self.rowcount = -1
+        self.description = None
+    
+    def execute(self, query, params=None):
+        return self._run(query, list(params) if params else None, many=False)
+    
+    def executemany(self, query, params):
+        return self._run(query, [list(item) for item in params], many=True)
+    
+    def _run(self, query, params, many):
+        result = self.client.request('/transaction/execute', {
+            'session': self.session, 'query': query, 'params': params, 'many': many,
+        })
+        self._rows = list(result['rows'])
+        self.lastrowid = result['lastrowid']
+        self.rowcount = result['rowcount']
+        return self
+    
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+    
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+class _ReadConnection:
+    """اتصال للقراءة فقط خارج المعاملات (لدوال مثل SequenceAllocator.peek)"""
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def cursor(self):
+        return _ReadCursor(self.client)
+
+class _ReadCursor(RemoteCursor):
+    def __init__(self, client):
+        super().__init__(client, None)
+    
+    def _run(self, query, params, many):
+        self._rows = list(self.client.call('execute_query', query, params))
+        return self
+
+class _RemoteNamespace:
+    """تمرير دوال كائن فرعي (مثل lookups) إلى نفس الكائن على الخادم"""
+    
+    def __init__(self, client, name):
+        self._client = client
+        self._name = name
+    
+    def __getattr__(self, attribute):
+        method = f"{self._name}.{attribute}"
+        return lambda *args, **kwargs: self._client.call(method, *args, **kwargs)
+
+class _RemoteStatistics(StatisticsEngine):
+    """الإحصائيات من الخادم (المخزنة هناك) مع دوال الفترات المحلية"""
+    
+    def snapshot(self):
+        return self.db_manager.call('statistics.snapshot')
+    
+    def time_series(self, start, end, granularity='month', kinds=('incoming', 'outgoing')):
+        return self.db_manager.call('statistics.time_series', start, end, granularity, tuple(kinds))
+    
+    def invalidate(self):
+        pass
+
+class RemoteAuthManager(AuthManager):
+    """المصادقة وإدارة المستخدمين على خادم قاعدة البيانات
+    
+    العميل لا يقرأ كلمات المرور المشفرة ولا يكتب في جدول المستخدمين بـ SQL:
+    التحقق يتم بـ auth.login (ويُحفظ مفتاح تسجيل الدخول لباقي الطلبات)،
+    والإنشاء والتعديل وتغيير كلمة المرور بدوال auth.* التي يتحقق الخادم من صلاحيتها.
+    """
+    
+    def verify_user(self, username, password):
+        try:
+            result = self.db_manager.call('auth.login', username, password)
+        except RemoteError as e:
+            print(f"خطأ في التحقق من المستخدم: {e}")
+            return None
+        if result is None:
+            return None
+        
+        self._end_login()
+        self.db_manager.login_key = result['login']
+        return result['user']
+    
+    def logout(self):
+        super().logout()
+        self._end_login()
+    
+    def _end_login(self):
+        """إنهاء تسجيل الدخول الحالي على الخادم"""
+        if self.db_manager.login_key is None:
+            return
+        try:
+            self.db_manager.call('auth.logout')
+        except RemoteError as e:
+            print(f"خطأ في تسجيل الخروج من الخادم: {e}")
+        self.db_manager.login_key = None
+    
+    def _write(self, method, *args, **kwargs):
+        """تنفيذ دالة auth.* على الخادم وإشعار الواجهة بتغير المستخدمين (None عند الفشل)"""
+        try:
+            result = self.db_manager.call(method, *args, **kwargs)
+        except RemoteError as e:
+            print(f"خطأ في إدارة المستخدمين: {e}")
+            return None
+        self.db_manager.write_version += 1
+        self.db_manager.notify_write(('users',))
+        return result
+    
+    def create_user(self, username, password, full_name, role, department=None):
+        return self._write('auth.create_user', username, password, full_name, role, department)
+    
+    def update_user(self, user_id, username=None, full_name=None, role=None, department=None, is_active=None):
+        return bool(self._write(
+            'auth.update_user', user_id, username=username, full_name=full_name,
+            role=role, department=department, is_active=is_active
+        ))
+    
+    def delete_user(self, user_id):
+        return bool(self._write('auth.delete_user', user_id))
+    
+    def change_password(self, user_id, new_password):
+        return bool(self._write('auth.change_password', user_id, new_password))
+
+class RemoteDatabaseManager:
+    """بديل DatabaseManager يعمل عبر خادم قاعدة البيانات (server.py)
+    
+    نفس الدوال التي تستخدمها الواجهة: الاستعلامات وصفحات الجداول والإحصائيات
+    تُنفذ على الخادم (مع التخزين هناك)، والمعاملات تُفتح على الخادم ويُرسل
+    كل execute داخلها، فتعمل النماذج وحجز الأرقام والاستيراد بدون تعديل.
+    """
+    
+    FOLLOW_UP_PARENTS = DatabaseManager.FOLLOW_UP_PARENTS
+    PAGE_SIZE = DatabaseManager.PAGE_SIZE
+    BULK_TABLES = DatabaseManager.BULK_TABLES
+    BULK_CHUNK = DatabaseManager.BULK_CHUNK
+    
+    def __init__(self, url, token=None, timeout=60):
+        parts = urlsplit(url if '://' in url else f"http://{url}")
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or DEFAULT_PORT
+        self.db_path = url
+        self.token = token
+        # مفتاح تسجيل الدخول من auth.login (يُرسل مع كل طلب)
+        self.login_key = None
+        self.timeout = timeout
+        
+        # المعاملة المفتوحة لكل خيط (للمعاملات المتداخلة)
+        self._local = threading.local()
+        self._write_listeners = []
+        self.write_version = 0
+        
+        self.statistics = _RemoteStatistics(self)
+        self.activity_writer = ActivityLogWriter(self)
+        self.sequences = SequenceAllocator(self)
+        self.bulk_io = BulkIO(self)
+        self.lookups = _RemoteNamespace(self, 'lookups')
+        self.change_feed = _RemoteNamespace(self, 'change_feed')
+        self.retention = _RemoteNamespace(self, 'retention')
+        # إحصائيات الاستعلامات على الخادم (حيث تُنفذ)
+        self.profiler = _RemoteNamespace(self, 'profiler')
+    
+    # الاتصال بالخادم
+    def request(self, path, payload):
+        """إرسال طلب JSON وإرجاع النتيجة (أو رفع الخطأ بنفس نوعه في sqlite3 إن أمكن)"""
+        body = json.dumps(encode_value(payload), ensure_ascii=False).encode('utf-8')
+        headers = {'Content-Type': 'application/json; charset=utf-8'}
+        if self.token:
+            headers['X-Auth-Token'] = self.token
+        if self.login_key:
+            headers['X-Login'] = self.login_key
+        
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request('POST', path, body, headers)
+            response = conn.getresponse()
+            data = json.loads(response.read() or b'{}')
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            raise RemoteError(f"تعذر الاتصال بالخادم {self.host}:{self.port}: {e}") from e
+        finally:
+            conn.close()
+        
+        if 'error' in data:
+            error_type = getattr(sqlite3, data.get('type', ''), None)
+            if isinstance(error_type, type) and issubclass(error_type, sqlite3.Error):
+                raise error_type(data['error'])
+            raise RemoteError(data['error'])
+        return decode_value(data.get('result'), RemoteRow)
+    
+    def call(self, method, *args, **kwargs):
+        """استدعاء دالة على الخادم"""
+        return self.request('/call', {'method': method, 'args': list(args), 'kwargs': kwargs})
+    
+    def batch(self, calls):
+        """عدة استدعاءات في طلب واحد: calls = [(method, args, kwargs), ...]
+        
+        يعيد قائمة النتائج بنفس الترتيب (الاستدعاء الفاشل نتيجته None).
+        """
+        results = self.request('/batch', {'calls': [
+            {'method': method, 'args': list(args), 'kwargs': kwargs or {}} for method, args, kwargs in calls
+        ]})
+        for call, result in zip(calls, results):
+            if 'error' in result:
+                print(f"خطأ في تنفيذ {call[0]} على الخادم: {result['error']}")
+        return [result.get('result') for result in results]
+    
+    # نفس واجهة DatabaseManager
+    @contextmanager
+    def connection(self):
+        """اتصال قراءة (كل استعلام يُرسل للخادم)"""
+        yield _ReadConnection(self)
+    
+    @contextmanager
+    def transaction(self, tables=None):
+        """معاملة على الخادم: commit عند النجاح و rollback عند حدوث خطأ"""
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is not None:
+            # معاملة متداخلة: نفس المعاملة الخارجية
+            yield cursor
+            return
+        
+        session = self.request('/transaction/begin', {'tables': list(tables) if tables else None})
+        self._local.cursor = cursor = RemoteCursor(self, session)
+        try:
+            yield cursor
+            self.request('/transaction/commit', {'session': session})
+            self.write_version += 1
+            self.notify_write(tables)
+        except Exception:
+            try:
+                self.request('/transaction/rollback', {'session': session})
+            except Exception as e:
+                print(f"خطأ في إلغاء المعاملة على الخادم: {e}")
+            raise
+        finally:
+            self._local.cursor = None
+    
+    def add_write_listener(self, listener):
+        self._write_listeners.append(listener)
+    
+    def remove_write_listener(self, listener):
+        if listener in self._write_listeners:
+            self._write_listeners.remove(listener)
+    
+    def notify_write(self, tables=None):
+        for listener in list(self._write_listeners):
+            try:
+                listener(tables)
+            except Exception as e:
+                print(f"خطأ في معالجة إشعار الكتابة: {e}")
+    
+    def get_data_version(self):
+        """رقم إصدار البيانات على الخادم"""
+        return self.call('get_data_version')
+    
+    def set_query_trace(self, enabled):
+        """تتبع كل الجمل المنفذة على الخادم"""
+        return self.call('set_query_trace', enabled)
+    
+    def release_thread_connection(self):
+        """لا توجد اتصالات محلية لكل خيط (كل طلب اتصال مستقل بالخادم)"""
+    
+    def interrupt(self, thread_ident):
+        """لا يمكن مقاطعة استعلام على الخادم (النتيجة تُهمل فقط)"""
+    
+    def close(self):
+        """كتابة سجل النشاطات المعلق"""
+        self.activity_writer.close()
+    
+    def execute_query(self, query, params=None):
+        """تنفيذ استعلام قراءة"""
+        try:
+            return self.call('execute_query', query, list(params) if params else None)
+        except Exception as e:
+            print(f"خطأ في تنفيذ الاستعلام: {e}")
+            return []
+    
+    def execute_update(self, query, params=None):
+        """تنفيذ استعلام تحديث/إدراج/حذف"""
+        try:
+            result = self.call('execute_update', query, list(params) if params else None)
+        except Exception as e:
+            print(f"خطأ في تنفيذ التحديث: {e}")
+            return None
+        if result is not None:
+            self.write_version += 1
+            self.notify_write(DatabaseManager.written_tables(query))
+        return result
+    
+    def log_activity(self, user_id, action, table_name=None, record_id=None, old_values=None, new_values=None, cursor=None):
+        """تسجيل نشاط المستخدم (على دفعات، أو داخل المعاملة مع cursor)"""
+        if cursor is not None:
+            return self.activity_writer.write_now(cursor, user_id, action, table_name, record_id, old_values, new_values)
+        self.activity_writer.write(user_id, action, table_name, record_id, old_values, new_values)
+    
+    # العمليات الجماعية: نفس التنفيذ داخل معاملة على الخادم
+    _bulk_ids = DatabaseManager._bulk_ids
+    bulk_update_status = DatabaseManager.bulk_update_status
+    bulk_delete = DatabaseManager.bulk_delete
+    
+    def get_incoming_page(self, search_term=None, after=None, limit=None, ids=None):
+        return self.call('get_incoming_page', search_term, after=after, limit=limit, ids=ids)
+    
+    def get_outgoing_page(self, search_term=None, after=None, limit=None, ids=None):
+        return self.call('get_outgoing_page', search_term, after=after, limit=limit, ids=ids)
+    
+    def get_follow_up_page(self, status=None, correspondence_type=None, search_term=None, after=None, limit=None, ids=None):
+        return self.call(
+            'get_follow_up_page', status, correspondence_type, search_term,
+            after=after, limit=limit, ids=ids
+        )
+    
+    def get_statistics(self):
+        return DatabaseManager.get_statistics(self)
+    
+    def get_activity_page(self, user_id=None, table_name=None, action_type=None, after=None, limit=None):
+        self.activity_writer.flush()
+        return self.call('get_activity_page', user_id, table_name, action_type, after=after, limit=limit)
+    
+    def get_activity_tables(self):
+        return self.call('get_activity_tables')
+    
+    def get_overdue_items(self, days=3, limit=20):
+        return self.call('get_overdue_items', days, limit)
+    
+    def get_time_series(self, start, end, granularity='month', kinds=('incoming', 'outgoing')):
+        return self.statistics.time_series(start, end, granularity, kinds)
+    
+    def backup_database(self, backup_path, progress=None, base_path=None):
+        """نسخ احتياطي في مجلد النسخ على جهاز الخادم (يُستخدم اسم الملف فقط)"""
+        try:
+            self.activity_writer.flush()
+            return self.call(
+                'backup_database', os.path.basename(backup_path),
+                base_name=os.path.basename(base_path) if base_path else None
+            )
+        except Exception as e:
+            print(f"خطأ في إنشاء النسخة الاحتياطية: {e}")
+            return False
+    
+    def restore_database(self, backup_path, progress=None):
+        """استعادة نسخة احتياطية من مجلد النسخ على جهاز الخادم (باسم الملف)"""
+        try:
+            self.activity_writer.flush()
+            result = self.call('restore_database', os.path.basename(backup_path))
+        except Exception as e:
+            print(f"خطأ في استعادة النسخة الاحتياطية: {e}")
+            return False
+        self.write_version += 1
+        self.notify_write()
+        return result
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة الاحتفاظ بالبيانات وأرشفة سجل النشاطات
+Retention and Archival Module
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+from datetime import date, timedelta
+
+class RetentionManager:
+    """نقل سجلات النشاط القديمة إلى قواعد أرشيف شهرية مضغوطة
+    
+    - كل شهر له ملف أرشيف مستقل activity_YYYY-MM.db (مضغوط بـ gzip بعد الكتابة)
+      يمكن إرفاقه بـ ATTACH للاستعلام عند الحاجة.
+    - بعد النقل يتم تحرير المساحة باستخدام incremental_vacuum (في وضع INCREMENTAL فقط).
+    - سياسة الاحتفاظ قابلة للتعديل ومحفوظة في جدول app_settings.
+    """
+    
+    DEFAULT_POLICY = {
+        'activity_log_days': 365,
+        'compress_archives': True,
+        'vacuum_pages': 2000,
+    }
+    
+    ARCHIVE_COLUMNS = (
+        'id', 'user_id', 'action', 'action_type', 'table_name',
+        'record_id', 'old_values', 'new_values', 'timestamp'
+    )
+    
+    def __init__(self, db_manager, archive_dir=None):
+        self.db_manager = db_manager
+        self.archive_dir = archive_dir or os.path.join(
+            os.path.dirname(os.path.abspath(db_manager.db_path)), 'archive'
+        )
+        
+        # الأرشيفات المرفقة حالياً: اسم المخطط -> الشهر
+        self._attached = {}
+    
+    # سياسة الاحتفاظ
+    def get_policy(self):
+        """سياسة الاحتفاظ الحالية (القيم الافتراضية مع ما تم حفظه)"""
+        policy = dict(self.DEFAULT_POLICY)
+        keys = [f'retention.{key}' for key in policy]
+        rows = self.db_manager.execute_query(
+            f"SELECT key, value FROM app_settings WHERE key IN ({', '.join('?' for _ in keys)})",
+            keys
+        )
+        for row in rows:
+            key = row['key'].split('.', 1)[1]
+            default = self.DEFAULT_POLICY[key]
+            if isinstance(default, bool):
+                policy[key] = row['value'] == '1'
+            else:
+                policy[key] = type(default)(row['value'])
+        return policy
+    
+    def set_policy(self, **values):
+        """حفظ قيم جديدة لسياسة الاحتفاظ"""
+        with self.db_manager.transaction(tables=('app_settings',)) as cursor:
+            for key, value in values.items():
+                if key not in self.DEFAULT_POLICY:
+                    raise KeyError(f"إعداد غير معروف: {key}")
+                if isinstance(value, bool):
+                    value = '1' if value else '0'
+                cursor.execute(
+                    "INSERT INTO app_settings (key, value) VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                    (f'retention.{key}', str(value))
+                )
+    
+    # ملفات الأرشيف
+    def archive_path(self, month, compressed=False):
+        """مسار ملف أرشيف شهر معين (YYYY-MM)"""
+        path = os.path.join(self.archive_dir, f'activity_{month}.db')
+        return path + '.gz' if compressed else path
+    
+    def list_archives(self):
+        """الأشهر التي لها ملفات أرشيف"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        months = set()
+        for name in os.listdir(self.archive_dir):
+            if name.startswith('activity_') and (name.endswith('.db') or name.endswith('.db.gz')):
+                months.add(name[len('activity_'):].split('.', 1)[0])
+        return sorted(months)
+    
+    def _open_archive(self, month):
+        """تجهيز ملف الأرشيف غير المضغوط للكتابة أو الإرفاق"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = self.archive_path(month)
+        compressed_path = self.archive_path(month, compressed=True)
+        if not os.path.exists(path) and os.path.exists(compressed_path):
+            with gzip.open(compressed_path, 'rb') as source, open(path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+        return path
+    
+    def _compress_archive(self, month):
+        """ضغط ملف الأرشيف وحذف النسخة غير المضغوطة"""
+        path = self.archive_path(month)
+        compressed_path = self.archive_path(month, compressed=True)
+        temp_path = compressed_path + '.tmp'
+        with open(path, 'rb') as source, gzip.open(temp_path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.replace(temp_path, compressed_path)
+        os.remove(path)
+    
+    def attach_archive(self, month, schema=None):
+        """إرفاق أرشيف شهر بالاتصال الحالي للاستعلام منه (يعيد اسم المخطط)"""
+        schema = schema or f"archive_{month.replace('-', '_')}"
+        path = self._open_archive(month)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"لا يوجد أرشيف للشهر {month}")
+        with self.db_manager.connection() as conn:
+            conn.execute("ATTACH DATABASE ? AS " + schema, (path,))
+        self._attached[schema] = month
+        return schema
+    
+    def detach_archive(self, schema):
+        """فصل أرشيف تم إرفاقه (وحذف النسخة غير المضغوطة المؤقتة)"""
+        with self.db_manager.connection() as conn:
+            conn.execute("DETACH DATABASE " + schema)
+        month = self._attached.pop(schema, None)
+        if month and os.path.exists(self.archive_path(month, compressed=True)):
+            os.remove(self.archive_path(month))
+    
+    # الأرشفة
+    def archive_activity_log(self, before, compress=True):
+        """نقل سجلات النشاط الأقدم من before (YYYY-MM-DD) إلى أرشيفات شهرية
+        
+        يعيد عدد السجلات التي تم نقلها.
+        """
+        # التأكد من كتابة الإدخالات المعلقة أولاً
+        self.db_manager.activity_writer.flush()
+        
+        before = str(before)
+        months = [
+            row['month'] for row in self.db_manager.execute_query(
+                "SELECT DISTINCT substr(timestamp, 1, 7) as month FROM activity_log WHERE timestamp < ?",
+                (before,)
+            )
+        ]
+        
+        columns = ', '.join(self.ARCHIVE_COLUMNS)
+        moved = 0
+        for month in months:
+            year, month_number = (int(part) for part in month.split('-'))
+            month_start = date(year, month_number, 1).isoformat()
+            month_end = self.db_manager.statistics.month_range(date(year, month_number, 1))[1]
+            range_end = min(month_end, before)
+            
+            path = self._open_archive(month)
+            conn = self.db_manager.get_connection()
+            try:
+                conn.execute("ATTACH DATABASE ? AS archive", (path,))
+                try:
+                    # النقل والحذف في معاملة واحدة على نفس الاتصال المرفق به الأرشيف
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        cursor = conn.cursor()
+                        cursor.execute('''
+                            CREATE TABLE IF NOT EXISTS archive.activity_log (
+                                id INTEGER PRIMARY KEY,
+                                user_id INTEGER,
+                                action TEXT NOT NULL,
+                                action_type TEXT,
+                                table_name TEXT,
+                                record_id INTEGER,
+                                old_values TEXT,
+                                new_values TEXT,
+                                timestamp TIMESTAMP
+                            )
+                        ''')
+                        cursor.execute(
+                            'CREATE INDEX IF NOT EXISTS archive.idx_activity_time ON activity_log(timestamp, id)'
+                        )
+                        cursor.execute(f'''
+                            INSERT OR IGNORE INTO archive.activity_log ({columns})
+                            SELECT {columns} FROM main.activity_log
+                            WHERE timestamp >= ? AND timestamp < ?
+                        ''', (month_start, range_end))
+                        cursor.execute(
+                            "DELETE FROM main.activity_log WHERE timestamp >= ? AND timestamp < ?",
+                            (month_start, range_end)
+                        )
+                        moved += cursor.rowcount
+                        conn.commit()
+                        self.db_manager.write_version += 1
+                        self.db_manager.notify_write(('activity_log',))
+                    except Exception:
+                        conn.rollback()
+                        raise
+                finally:
+                    conn.execute("DETACH DATABASE archive")
+            finally:
+                self.db_manager.release_connection(conn)
+            
+            if compress:
+                self._compress_archive(month)
+        
+        return moved
+    
+    def vacuum(self, pages=None):
+        """تحرير الصفحات الفارغة من ملف قاعدة البيانات
+        
+        يعمل فقط في وضع auto_vacuum=INCREMENTAL. التحويل إلى هذا الوضع يعيد
+        كتابة الملف بالكامل لذلك لا يتم تلقائياً (انظر convert_to_incremental).
+        """
+        with self.db_manager.connection() as conn:
+            mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            if mode != 2:
+                print("تم تخطي تحرير المساحة: قاعدة البيانات ليست في وضع auto_vacuum=INCREMENTAL")
+                return False
+            if pages:
+                conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            else:
+                conn.execute("PRAGMA incremental_vacuum").fetchall()
+            return True
+    
+    def is_incremental(self):
+        """هل قاعدة البيانات في وضع auto_vacuum=INCREMENTAL"""
+        with self.db_manager.connection() as conn:
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    
+    def convert_to_incremental(self):
+        """تحويل قاعدة البيانات مرة واحدة إلى وضع auto_vacuum=INCREMENTAL
+        
+        يتطلب VACUUM كامل (إعادة كتابة الملف مع قفل قاعدة البيانات طوال المدة)،
+        لذلك يُستدعى فقط كإجراء صيانة يدوي من المدير بعد التأكيد.
+        """
+        try:
+            with self.db_manager.connection() as conn:
+                if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                    return True
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        except sqlite3.Error as e:
+            print(f"خطأ في تحويل وضع تحرير المساحة: {e}")
+            return False
+    
+    def run(self):
+        """تطبيق سياسة الاحتفاظ: أرشفة السجلات القديمة ثم تحرير المساحة"""
+        policy = self.get_policy()
+        cutoff = (date.today() - timedelta(days=policy['activity_log_days'])).isoformat()
+        
+        try:
+            moved = self.archive_activity_log(cutoff, compress=policy['compress_archives'])
+            # سجل التغييرات يحتفظ بآخر الإصدارات فقط
+            self.db_manager.change_feed.prune()
+            if moved:
+                self.vacuum(policy['vacuum_pages'])
+            return moved
+        except sqlite3.Error as e:
+            print(f"خطأ في أرشفة سجل النشاطات: {e}")
+            return 0
@@ -7,27 +7,18 @@ Correspondence Management System Launcher
 
 import sys
 import os
+import importlib.util
 import tkinter as tk
 from tkinter import messagebox
 
 def check_requirements():
-    """التحقق من المتطلبات"""
-    missing_modules = []
-    
-    try:
-        import matplotlib
-    except ImportError:
-        missing_modules.append('matplotlib')
-    
-    try:
-        import numpy
-    except ImportError:
-        missing_modules.append('numpy')
-    
-    try:
-        from PIL import Image
-    except ImportError:
-        missing_modules.append('Pillow')
+    """التحقق من المتطلبات (بدون استيرادها، فهي تُستورد عند الحاجة فقط)"""
+    # اسم الوحدة -> اسم الحزمة للتثبيت
+    requirements = {'matplotlib': 'matplotlib', 'numpy': 'numpy', 'PIL': 'Pillow'}
+    missing_modules = [
+        package for module, package in requirements.items()
+        if importlib.util.find_spec(module) is None
+    ]
     
     if missing_modules:
         root = tk.Tk()
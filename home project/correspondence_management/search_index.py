@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة فهرس البحث النصي
+Full-Text Search Index Module
+"""
+
+class SearchIndex:
+    """فهرس FTS5 للمراسلات والمتابعات مع توحيد الحروف العربية"""
+    
+    # الجدول الأصلي: (جدول الفهرس, الأعمدة المفهرسة)
+    # (الجداول ومشغلاتها تُنشأ في migrations.py: أي تغيير هنا يتطلب خطوة ترقية جديدة)
+    TABLES = {
+        'incoming_correspondence': ('incoming_fts', ('reference_number', 'subject_code', 'subject', 'sender', 'notes')),
+        'outgoing_correspondence': ('outgoing_fts', ('reference_number', 'subject_code', 'subject', 'recipient', 'notes')),
+        'follow_up': ('follow_up_fts', ('follow_up_code', 'action_required', 'responsible_person', 'notes')),
+    }
+    
+    # التشكيل والتطويل يُحذفان، وأشكال الألف والياء والتاء المربوطة توحد
+    # (نفس التوحيد في مشغلات الفهرس في migrations.py)
+    ARABIC_REPLACEMENTS = (
+        ('\u064b', ''), ('\u064c', ''), ('\u064d', ''), ('\u064e', ''),
+        ('\u064f', ''), ('\u0650', ''), ('\u0651', ''), ('\u0652', ''),
+        ('\u0670', ''), ('\u0640', ''),
+        ('أ', 'ا'), ('إ', 'ا'), ('آ', 'ا'), ('ٱ', 'ا'),
+        ('ى', 'ي'), ('ة', 'ه'),
+    )
+    
+    def __init__(self):
+        self.enabled = False
+    
+    @classmethod
+    def normalize(cls, text):
+        """توحيد النص العربي قبل الفهرسة أو البحث"""
+        if not text:
+            return ''
+        for source, target in cls.ARABIC_REPLACEMENTS:
+            text = text.replace(source, target)
+        return text
+    
+    def detect(self, cursor):
+        """تفعيل البحث النصي إذا كانت جداول الفهرس موجودة"""
+        fts_tables = [fts_table for fts_table, _ in self.TABLES.values()]
+        cursor.execute(
+            f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({', '.join('?' for _ in fts_tables)})",
+            fts_tables
+        )
+        self.enabled = cursor.fetchone()[0] == len(fts_tables)
+        return self.enabled
+    
+    def match_expression(self, search_term, column=None):
+        """تحويل نص البحث إلى تعبير MATCH يطابق بادئات الكلمات"""
+        terms = []
+        for word in self.normalize(search_term).split():
+            terms.append('"' + word.replace('"', '""') + '"*')
+        if not terms:
+            return None
+        
+        expression = ' '.join(terms)
+        if column:
+            expression = f"{column} : ({expression})"
+        return expression
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة تسلسل الأرقام التلقائية
+Sequence Allocator Module
+"""
+
+import sqlite3
+
+class SequenceAllocator:
+    """توليد أرقام المراسلات وأكواد الموضوعات والمتابعات من جدول تسلسلات
+    
+    كل سلسلة لها صف واحد في جدول sequences يتم زيادته بشكل ذري
+    (UPDATE ... RETURNING داخل معاملة BEGIN IMMEDIATE)، فلا يحصل مستخدمان
+    على نفس الرقم ولا حاجة لمسح الجداول لإيجاد آخر رقم.
+    
+    السلاسل:
+        incoming                          أرقام المراسلات الواردة
+        outgoing                          أرقام المراسلات الصادرة
+        subject:<PREFIX>-<LETTERS>        أكواد موضوعات الصادرة (مثل OUT-CHR12)
+        follow_up:<type>:<id>             رقم المتابعة لكل مراسلة
+    """
+    
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.supports_returning = sqlite3.sqlite_version_info >= (3, 35, 0)
+    
+    # أسماء السلاسل
+    @staticmethod
+    def subject_series(prefix, letters):
+        """اسم سلسلة كود الموضوع"""
+        return f"subject:{prefix}-{letters}"
+    
+    @staticmethod
+    def follow_up_series(correspondence_type, correspondence_id):
+        """اسم سلسلة المتابعات لمراسلة معينة"""
+        return f"follow_up:{correspondence_type}:{correspondence_id}"
+    
+    def _seed(self, cursor, name):
+        """القيمة الابتدائية للسلسلة من البيانات الموجودة (تُحسب مرة واحدة فقط)"""
+        if name in ('incoming', 'outgoing'):
+            table = f"{name}_correspondence"
+            cursor.execute(
+                f"SELECT MAX(CAST(reference_number AS INTEGER)) FROM {table} WHERE reference_number GLOB '[0-9]*'"
+            )
+        elif name.startswith('subject:'):
+            code = name.split(':', 1)[1]
+            cursor.execute(
+                "SELECT MAX(CAST(substr(subject_code, ?) AS INTEGER)) FROM outgoing_correspondence "
+                "WHERE subject_code GLOB ?",
+                (len(code) + 1, code.replace('[', '[[]') + '[0-9]*')
+            )
+        elif name.startswith('follow_up:'):
+            # عداد المتابعات المحفوظ على صف المراسلة
+            _, correspondence_type, correspondence_id = name.split(':', 2)
+            table = self.db_manager.FOLLOW_UP_PARENTS[correspondence_type]
+            cursor.execute(f"SELECT follow_up_count FROM {table} WHERE id = ?", (int(correspondence_id),))
+        else:
+            return 0
+        
+        row = cursor.fetchone()
+        return (row[0] or 0) if row else 0
+    
+    def _current(self, cursor, name):
+        """القيمة الحالية للسلسلة (أو None إذا لم تُنشأ بعد)"""
+        cursor.execute("SELECT value FROM sequences WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def peek(self, name):
+        """الرقم التالي للعرض في النموذج بدون حجزه"""
+        with self.db_manager.connection() as conn:
+            cursor = conn.cursor()
+            current = self._current(cursor, name)
+            if current is None:
+                current = self._seed(cursor, name)
+        return current + 1
+    
+    def _allocate(self, cursor, name):
+        """حجز الرقم التالي باستخدام مؤشر داخل معاملة كتابة"""
+        if self.supports_returning:
+            cursor.execute("UPDATE sequences SET value = value + 1 WHERE name = ? RETURNING value", (name,))
+            row = cursor.fetchone()
+            if row:
+                return row[0]
+        else:
+            cursor.execute("UPDATE sequences SET value = value + 1 WHERE name = ?", (name,))
+            if cursor.rowcount:
+                return self._current(cursor, name)
+        
+        # أول استخدام للسلسلة: تهيئتها من البيانات الموجودة
+        value = self._seed(cursor, name) + 1
+        cursor.execute("INSERT INTO sequences (name, value) VALUES (?, ?)", (name, value))
+        return value
+    
+    def allocate(self, name, cursor=None):
+        """حجز الرقم التالي في السلسلة بشكل ذري
+        
+        مع cursor يتم الحجز داخل معاملة المستدعي (يُلغى الحجز إذا فشلت المعاملة).
+        """
+        if cursor is not None:
+            return self._allocate(cursor, name)
+        with self.db_manager.transaction(tables=('sequences',)) as cursor:
+            return self._allocate(cursor, name)
+    
+    def advance_to(self, name, value, cursor=None):
+        """التأكد من أن السلسلة لا تعيد رقماً تم إدخاله يدوياً"""
+        def advance(cursor):
+            current = self._current(cursor, name)
+            if current is None:
+                current = self._seed(cursor, name)
+                cursor.execute("INSERT INTO sequences (name, value) VALUES (?, ?)", (name, max(current, value)))
+            elif value > current:
+                cursor.execute("UPDATE sequences SET value = ? WHERE name = ?", (value, name))
+        
+        if cursor is not None:
+            advance(cursor)
+        else:
+            with self.db_manager.transaction(tables=('sequences',)) as cursor:
+                advance(cursor)
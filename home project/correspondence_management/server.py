@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+خادم قاعدة البيانات لتشغيل عدة أجهزة على نفس البيانات
+Database Server
+"""
+
+import hmac
+import ipaddress
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from auth import AuthManager
+from database import DatabaseManager
+from lookup_cache import LookupCache
+
+DEFAULT_PORT = 8765
+
+def encode_value(value):
+    """تحويل نتائج DatabaseManager إلى JSON مع الحفاظ على الصفوف والمفاتيح والـ tuple"""
+    if isinstance(value, sqlite3.Row):
+        return {'$row': [list(value.keys()), [encode_value(item) for item in value]]}
+    if isinstance(value, list):
+        if value and all(isinstance(item, sqlite3.Row) for item in value):
+            # الأعمدة مرة واحدة لكل القائمة بدلاً من تكرارها في كل صف
+            return {'$rows': [list(value[0].keys()), [[encode_value(item) for item in row] for row in value]]}
+        return [encode_value(item) for item in value]
+    if isinstance(value, tuple):
+        return {'$tuple': [encode_value(item) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: encode_value(item) for key, item in value.items()}
+        return {'$items': [[encode_value(key), encode_value(item)] for key, item in value.items()]}
+    if isinstance(value, bytes):
+        return {'$bytes': value.hex()}
+    return value
+
+def decode_value(value, row_factory=dict):
+    """عكس encode_value (row_factory تبني الصف من الأعمدة والقيم)"""
+    if isinstance(value, list):
+        return [decode_value(item, row_factory) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if len(value) == 1:
+        (tag, payload), = value.items()
+        if tag == '$row':
+            columns, values = payload
+            return row_factory(columns, decode_value(values, row_factory))
+        if tag == '$rows':
+            columns, rows = payload
+            return [row_factory(columns, decode_value(values, row_factory)) for values in rows]
+        if tag == '$tuple':
+            return tuple(decode_value(item, row_factory) for item in payload)
+        if tag == '$items':
+            return {decode_value(key, row_factory): decode_value(item, row_factory) for key, item in payload}
+        if tag == '$bytes':
+            return bytes.fromhex(payload)
+    return {key: decode_value(item, row_factory) for key, item in value.items()}
+
+class RemoteCallError(Exception):
+    """خطأ في طلب غير مسموح أو غير صحيح"""
+
+def is_loopback(host):
+    """هل العنوان على نفس الجهاز فقط (localhost / 127.x / ::1)"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+class _Session:
+    """معاملة مفتوحة لعميل على اتصال مخصص"""
+    
+    def __init__(self, conn, tables):
+        self.conn = conn
+        self.tables = tables
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+class _Login:
+    """تسجيل دخول مستخدم من جهاز (مفتاحه يُرسل مع كل طلب في X-Login)"""
+    
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.last_used = time.monotonic()
+
+class DatabaseServer:
+    """تشغيل عمليات DatabaseManager لعدة أجهزة عبر HTTP/JSON
+    
+    ملف قاعدة البيانات يُفتح من هذا الخادم فقط، فلا تتنافس الأجهزة على قفل
+    الملف عبر الشبكة. الطلبات تُنفذ على مجموعة ثابتة من الخيوط (لكل خيط اتصال
+    دائم)، ونتائج الجداول والإحصائيات تُخزن وتُحذف عند الكتابة في جداولها.
+    
+    جمل SQL القادمة من العملاء (execute_query / execute_update والمعاملات) تُنفذ
+    مع authorize_client_sql: قراءة وكتابة صفوف الجداول فقط، بدون ATTACH أو PRAGMA
+    أو تعديل المخطط أو الكتابة في جدول المستخدمين أو قراءة كلمات المرور.
+    إدارة المستخدمين عبر دوال auth.* فقط، وتتطلب تسجيل دخول بـ auth.login:
+    المدير لكل المستخدمين، وغيره لتغيير كلمة مروره فقط.
+    النسخ الاحتياطي والاستعادة بأسماء ملفات داخل مجلد النسخ على الخادم فقط.
+    """
+    
+    # الدوال المسموح بها: الاسم -> الجداول التي تعتمد عليها النتيجة (None = بدون تخزين)
+    METHODS = {
+        'execute_query': None,
+        'execute_update': None,
+        'get_data_version': None,
+        'get_incoming_page': ('incoming_correspondence', 'follow_up'),
+        'get_outgoing_page': ('outgoing_correspondence', 'incoming_correspondence', 'follow_up'),
+        'get_follow_up_page': ('follow_up', 'incoming_correspondence', 'outgoing_correspondence'),
+        'get_activity_page': ('activity_log', 'users'),
+        'get_activity_tables': ('activity_log',),
+        'get_overdue_items': ('incoming_correspondence', 'follow_up'),
+        'statistics.snapshot': ('incoming_correspondence', 'outgoing_correspondence', 'follow_up'),
+        'statistics.time_series': ('incoming_correspondence', 'outgoing_correspondence', 'follow_up'),
+        'lookups.search_correspondence': None,
+        'lookups.correspondence_by_id': None,
+        'change_feed.latest_version': None,
+        'change_feed.changes_since': None,
+        'backup_database': None,
+        'restore_database': None,
+        'auth.login': None,
+        'auth.logout': None,
+        'auth.create_user': None,
+        'auth.update_user': None,
+        'auth.delete_user': None,
+        'auth.change_password': None,
+        'retention.run': None,
+        'retention.is_incremental': None,
+        'retention.convert_to_incremental': None,
+        'profiler.snapshot': None,
+        'profiler.reset': None,
+        'profiler.configure': None,
+        'set_query_trace': None,
+    }
+    
+    # الدوال التي ينفذها الخادم نفسه: الاسم -> المسار من كائن الخادم (الباقي من DatabaseManager)
+    SERVER_METHODS = {
+        'execute_query': 'query',
+        'execute_update': 'update',
+        'get_data_version': 'get_data_version',
+        'backup_database': 'backup_database',
+        'restore_database': 'restore_database',
+        'auth.login': 'login',
+        'auth.logout': 'logout',
+        'auth.create_user': 'create_user',
+        'auth.update_user': 'update_user',
+        'auth.delete_user': 'delete_user',
+        'auth.change_password': 'change_password',
+    }
+    
+    # العمليات المسموح بها في جمل العملاء (الباقي مرفوض: ATTACH و PRAGMA و CREATE/DROP/ALTER ...)
+    CLIENT_SQL_ACTIONS = {
+        sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_INSERT,
+        sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE, sqlite3.SQLITE_FUNCTION,
+        sqlite3.SQLITE_RECURSIVE, sqlite3.SQLITE_TRANSACTION, sqlite3.SQLITE_SAVEPOINT,
+    }
+    
+    # PRAGMA مسموح بقراءته فقط (يستخدمه FTS5 داخلياً عند تعديل الجداول المفهرسة)
+    CLIENT_READ_PRAGMAS = {'data_version'}
+    
+    # جداول لا يكتب فيها العملاء إلا عبر دوال auth.*
+    PROTECTED_TABLES = {'users'}
+    
+    # أعمدة لا يقرؤها العملاء (القراءة تعيد NULL)
+    PROTECTED_COLUMNS = {('users', 'password_hash')}
+    
+    # المعاملة المتروكة (انقطاع العميل) تُلغى بعد هذه المدة بالثواني
+    SESSION_TIMEOUT = 30
+    
+    # تسجيل الدخول غير المستخدم ينتهي بعد هذه المدة بالثواني
+    LOGIN_TIMEOUT = 12 * 60 * 60
+    
+    def __init__(self, db_manager, host='127.0.0.1', port=DEFAULT_PORT, token=None, pool_size=8, backup_dir=None):
+        if not token and not is_loopback(host):
+            raise ValueError(f"لا يمكن تشغيل الخادم على {host} بدون رمز دخول (--token)")
+        
+        self.db_manager = db_manager
+        self.token = token
+        self.cache = LookupCache(db_manager, max_entries=512)
+        self.auth = AuthManager(db_manager)
+        self.backup_dir = os.path.abspath(backup_dir or os.path.join(
+            os.path.dirname(os.path.abspath(db_manager.db_path)), 'backups'
+        ))
+        
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        
+        self._logins = {}
+        self._logins_lock = threading.Lock()
+        # مفتاح تسجيل الدخول للطلب الجاري في كل خيط
+        self._request = threading.local()
+        
+        self.httpd = _PooledHTTPServer((host, port), _RequestHandler, pool_size)
+        self.httpd.app = self
+    
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def serve_forever(self):
+        """تشغيل الخادم حتى الإيقاف"""
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.close()
+    
+    def shutdown(self):
+        """إيقاف الخادم (من خيط آخر)"""
+        self.httpd.shutdown()
+    
+    def close(self):
+        """إلغاء المعاملات المفتوحة وإغلاق الاتصالات"""
+        with self._sessions_lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            self._end_session(session, commit=False)
+        self.httpd.server_close()
+        self.db_manager.close()
+    
+    # الاستدعاءات
+    def call(self, method, args=(), kwargs=None):
+        """تنفيذ دالة مسموح بها (من الذاكرة إن أمكن)"""
+        if method not in self.METHODS:
+            raise RemoteCallError(f"دالة غير مسموح بها: {method}")
+        kwargs = kwargs or {}
+        
+        if method in self.SERVER_METHODS:
+            target, path = self, self.SERVER_METHODS[method]
+        else:
+            target, path = self.db_manager, method
+        for part in path.split('.'):
+            target = getattr(target, part)
+        
+        tables = self.METHODS[method]
+        if tables is None:
+            return target(*args, **kwargs)
+        
+        # النتائج المعتمدة على تاريخ اليوم (المتأخرات، الشهر الحالي) تتغير مع اليوم أيضاً
+        key = ('call', method, date.today().isoformat(), json.dumps([args, kwargs], sort_keys=True, default=str))
+        return self.cache.get(key, tables, lambda: target(*args, **kwargs))
+    
+    def batch(self, calls):
+        """تنفيذ عدة استدعاءات في طلب واحد (نتيجة أو خطأ لكل استدعاء)"""
+        results = []
+        for call in calls:
+            try:
+                results.append({'result': self.call(call['method'], call.get('args', ()), call.get('kwargs'))})
+            except Exception as e:
+                results.append({'error': str(e), 'type': type(e).__name__})
+        return results
+    
+    # جمل SQL من العملاء
+    def authorize_client_sql(self, action, arg1, arg2, database, trigger):
+        """sqlite3 authorizer لجمل العملاء (arg1/arg2 الجدول والعمود في القراءة والتعديل)"""
+        if action == sqlite3.SQLITE_PRAGMA:
+            allowed = arg1 in self.CLIENT_READ_PRAGMAS and arg2 is None
+            return sqlite3.SQLITE_OK if allowed else sqlite3.SQLITE_DENY
+        if action not in self.CLIENT_SQL_ACTIONS:
+            return sqlite3.SQLITE_DENY
+        if action == sqlite3.SQLITE_READ and (arg1, arg2) in self.PROTECTED_COLUMNS:
+            return sqlite3.SQLITE_IGNORE
+        if action in (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE) and arg1 in self.PROTECTED_TABLES:
+            return sqlite3.SQLITE_DENY
+        return sqlite3.SQLITE_OK
+    
+    def _client_sql(self, method, query, params):
+        """تنفيذ جملة العميل على اتصال هذا الخيط مع authorize_client_sql
+        
+        تغيير الـ authorizer يلغي الجمل المحضرة مسبقاً على الاتصال، فلا تُستخدم
+        جملة حُضرت لدوال الخادم بدون فحص.
+        """
+        conn = self.db_manager.get_connection()
+        conn.set_authorizer(self.authorize_client_sql)
+        try:
+            return method(query, params)
+        finally:
+            conn.set_authorizer(None)
+            self.db_manager.release_connection(conn)
+    
+    def query(self, query, params=None):
+        """execute_query للعملاء"""
+        return self._client_sql(self.db_manager.execute_query, query, params)
+    
+    def update(self, query, params=None):
+        """execute_update للعملاء"""
+        return self._client_sql(self.db_manager.execute_update, query, params)
+    
+    # المستخدمين
+    def login(self, username, password):
+        """التحقق من كلمة المرور وإنشاء تسجيل دخول (بيانات المستخدم ومفتاح X-Login)"""
+        user_data = self.auth.verify_user(username, password)
+        if user_data is None:
+            return None
+        
+        key = uuid.uuid4().hex
+        with self._logins_lock:
+            self._logins[key] = _Login(user_data['id'])
+        return {'user': user_data, 'login': key}
+    
+    def logout(self):
+        """إنهاء تسجيل الدخول المرسل مع الطلب"""
+        with self._logins_lock:
+            self._logins.pop(getattr(self._request, 'login', None), None)
+    
+    def caller(self):
+        """المستخدم النشط صاحب تسجيل الدخول في الطلب الجاري (أو None)"""
+        with self._logins_lock:
+            login = self._logins.get(getattr(self._request, 'login', None))
+            if login is not None:
+                login.last_used = time.monotonic()
+        if login is None:
+            return None
+        # البيانات الحالية (قد يتغير الدور أو يُعطل المستخدم بعد تسجيل الدخول)
+        user_data = self.auth.get_user_by_id(login.user_id)
+        return user_data if user_data and user_data['is_active'] else None
+    
+    def _caller_auth(self, user_id=None):
+        """AuthManager باسم المستخدم الحالي: المدير، أو نفس المستخدم إذا حُدد user_id"""
+        user_data = self.caller()
+        if user_data is None:
+            raise RemoteCallError("يجب تسجيل الدخول أولاً")
+        if user_data['role'] != 'admin' and (user_id is None or user_data['id'] != user_id):
+            raise RemoteCallError("ليست لديك صلاحية لهذه العملية")
+        
+        auth = AuthManager(self.db_manager, hasher=self.auth.hasher)
+        auth.current_user = user_data
+        return auth
+    
+    def create_user(self, username, password, full_name, role, department=None):
+        return self._caller_auth().create_user(username, password, full_name, role, department)
+    
+    def update_user(self, user_id, **fields):
+        return self._caller_auth().update_user(user_id, **fields)
+    
+    def delete_user(self, user_id):
+        return self._caller_auth().delete_user(user_id)
+    
+    def change_password(self, user_id, new_password):
+        return self._caller_auth(user_id).change_password(user_id, new_password)
+    
+    # النسخ الاحتياطي
+    def backup_file(self, name):
+        """مسار ملف داخل مجلد النسخ الاحتياطية (اسم ملف فقط، بدون مجلدات أو ..)"""
+        if (not isinstance(name, str) or not name or name.startswith('.')
+                or os.path.isabs(name) or any(separator in name for separator in ('/', '\\', ':'))):
+            raise RemoteCallError(f"اسم ملف نسخة احتياطية غير صحيح: {name}")
+        path = os.path.join(self.backup_dir, name)
+        if os.path.dirname(os.path.realpath(path)) != os.path.realpath(self.backup_dir):
+            raise RemoteCallError(f"اسم ملف نسخة احتياطية غير صحيح: {name}")
+        return path
+    
+    def backup_database(self, name, base_name=None):
+        """نسخة احتياطية (أو تفاضلية من base_name) في مجلد النسخ على الخادم"""
+        backup_path = self.backup_file(name)
+        base_path = self.backup_file(base_name) if base_name else None
+        os.makedirs(self.backup_dir, exist_ok=True)
+        return self.db_manager.backup_database(backup_path, base_path=base_path)
+    
+    def restore_database(self, name):
+        """استعادة نسخة من مجلد النسخ على الخادم"""
+        return self.db_manager.restore_database(self.backup_file(name))
+    
+    # المعاملات
+    def begin(self, tables=None):
+        """بدء معاملة كتابة على اتصال مخصص (جمل العميل فيها مع authorize_client_sql)"""
+        conn = self.db_manager._open_connection()
+        self.db_manager._apply_pragmas(conn)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            conn.close()
+            raise
+        conn.set_authorizer(self.authorize_client_sql)
+        
+        session_id = uuid.uuid4().hex
+        with self._sessions_lock:
+            self._sessions[session_id] = _Session(conn, tuple(tables) if tables else None)
+        return session_id
+    
+    def _session(self, session_id):
+        with self._sessions_lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise RemoteCallError("المعاملة غير موجودة أو انتهت مدتها")
+        return session
+    
+    def execute(self, session_id, query, params=None, many=False):
+        """تنفيذ جملة داخل المعاملة وإرجاع الصفوف ورقم آخر صف"""
+        session = self._session(session_id)
+        with session.lock:
+            session.last_used = time.monotonic()
+            cursor = session.conn.cursor()
+            if many:
+                cursor.executemany(query, params or [])
+            elif params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            return {
+                'rows': cursor.fetchall() if cursor.description else [],
+                'lastrowid': cursor.lastrowid,
+                'rowcount': cursor.rowcount,
+            }
+    
+    def end(self, session_id, commit=True):
+        """إنهاء المعاملة (commit أو rollback)"""
+        with self._sessions_lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            raise RemoteCallError("المعاملة غير موجودة أو انتهت مدتها")
+        self._end_session(session, commit)
+    
+    def _end_session(self, session, commit):
+        with session.lock:
+            try:
+                if commit:
+                    session.conn.commit()
+                else:
+                    session.conn.rollback()
+            finally:
+                session.conn.close()
+        if commit:
+            self.db_manager.write_version += 1
+            self.db_manager.notify_write(session.tables)
+    
+    def expire_sessions(self):
+        """إلغاء المعاملات المتروكة (حتى لا يبقى قفل الكتابة محجوزاً) وتسجيلات الدخول المنتهية"""
+        deadline = time.monotonic() - self.SESSION_TIMEOUT
+        with self._sessions_lock:
+            expired = [session_id for session_id, session in self._sessions.items() if session.last_used < deadline]
+            sessions = [self._sessions.pop(session_id) for session_id in expired]
+        for session in sessions:
+            print("تحذير: إلغاء معاملة متروكة")
+            self._end_session(session, commit=False)
+        
+        deadline = time.monotonic() - self.LOGIN_TIMEOUT
+        with self._logins_lock:
+            for key in [key for key, login in self._logins.items() if login.last_used < deadline]:
+                del self._logins[key]
+    
+    def get_data_version(self):
+        """رقم إصدار البيانات للعملاء (عداد الكتابة في الخادم مع آخر إصدار في سجل التغييرات)"""
+        return self.db_manager.get_data_version()
+    
+    def handle(self, path, request, login=None):
+        """توجيه الطلب حسب المسار (login: مفتاح تسجيل الدخول من X-Login)"""
+        self._request.login = login
+        if path == '/call':
+            return self.call(request['method'], request.get('args', ()), request.get('kwargs'))
+        if path == '/batch':
+            return self.batch(request['calls'])
+        if path == '/transaction/begin':
+            return self.begin(request.get('tables'))
+        if path == '/transaction/execute':
+            return self.execute(request['session'], request['query'], request.get('params'), request.get('many', False))
+        if path == '/transaction/commit':
+            return self.end(request['session'], commit=True)
+        if path == '/transaction/rollback':
+            return self.end(request['session'], commit=False)
+        raise RemoteCallError(f"مسار غير معروف: {path}")
+
+class _PooledHTTPServer(HTTPServer):
+    """خادم HTTP ينفذ الطلبات على عدد ثابت من الخيوط (اتصال دائم لكل خيط)"""
+    
+    def __init__(self, address, handler, pool_size):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='db-server')
+    
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+    
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+    
+    def service_actions(self):
+        self.app.expire_sessions()
+    
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        app = self.server.app
+        if app.token and not hmac.compare_digest(
+            (self.headers.get('X-Auth-Token') or '').encode('utf-8'), app.token.encode('utf-8')
+        ):
+            self._send(403, {'error': "رمز الدخول غير صحيح", 'type': 'PermissionError'})
+            return
+        
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            request = decode_value(json.loads(self.rfile.read(length) or b'{}'))
+            self._send(200, {'result': app.handle(self.path, request, self.headers.get('X-Login'))})
+        except RemoteCallError as e:
+            self._send(400, {'error': str(e), 'type': 'RemoteCallError'})
+        except Exception as e:
+            self._send(500, {'error': str(e), 'type': type(e).__name__})
+    
+    def _send(self, status, payload):
+        body = json.dumps(encode_value(payload), ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # بدون طباعة كل طلب
+        pass
+
+def serve(db_path="correspondence.db", host='127.0.0.1', port=DEFAULT_PORT, token=None, pool_size=8, profile_path=None):
+    """تشغيل الخادم على ملف قاعدة بيانات (مع حفظ إحصائيات الاستعلامات عند الإيقاف)"""
+    if not token and not is_loopback(host):
+        print(f"خطأ: لا يمكن تشغيل الخادم على {host} بدون رمز دخول (--token)")
+        return
+    
+    db_manager = DatabaseManager(db_path)
+    server = DatabaseServer(db_manager, host, port, token, pool_size)
+    # العملاء لا ينشئون المستخدمين قبل تسجيل الدخول، فالمدير الافتراضي يُنشأ هنا
+    if server.auth.create_default_admin():
+        print("تم إنشاء مستخدم المدير الافتراضي: admin / admin123")
+    print(f"خادم قاعدة البيانات يعمل على {server.address} ({db_path})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("تم إيقاف الخادم")
+    finally:
+        if profile_path:
+            db_manager.profiler.dump(profile_path)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+وحدة محرك الإحصائيات
+Statistics Engine Module
+"""
+
+import threading
+from datetime import date, timedelta
+
+class StatisticsEngine:
+    """حساب جميع عدادات لوحة الإحصائيات بمسح واحد لكل جدول مع تخزين مؤقت"""
+    
+    # النوع في جدول التجميع الشهري: (الجدول, عمود التاريخ)
+    # (المشغلات التي تحدث الجدول في migrations.py: أي تغيير هنا يتطلب خطوة ترقية جديدة)
+    MONTHLY_SOURCES = {
+        'incoming': ('incoming_correspondence', 'received_date'),
+        'outgoing': ('outgoing_correspondence', 'sent_date'),
+    }
+    
+    # مصادر السلاسل الزمنية (تشمل المتابعات)
+    SERIES_SOURCES = dict(MONTHLY_SOURCES, follow_up=('follow_up', 'follow_up_date'))
+    
+    # تعبير SQL لمفتاح الفترة حسب الدقة (الأسبوع يبدأ يوم الاثنين)
+    GRANULARITIES = {
+        'day': "substr({column}, 1, 10)",
+        'week': "date(substr({column}, 1, 10), '-6 days', 'weekday 1')",
+        'month': "substr({column}, 1, 7)",
+    }
+    
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.Lock()
+        self._cache_key = None
+        self._snapshot = None
+    
+    @staticmethod
+    def month_range(day=None):
+        """بداية الشهر وبداية الشهر التالي بصيغة YYYY-MM-DD"""
+        day = day or date.today()
+        start = day.replace(day=1)
+        if start.month == 12:
+            end = start.replace(year=start.year + 1, month=1)
+        else:
+            end = start.replace(month=start.month + 1)
+        return start.isoformat(), end.isoformat()
+    
+    @staticmethod
+    def period_range(period):
+        """تحويل شهر بصيغة YYYY-MM إلى مدى تاريخ [البداية, النهاية)"""
+        year, month = (int(part) for part in period.split('-')[:2])
+        return StatisticsEngine.month_range(date(year, month, 1))
+    
+    @staticmethod
+    def last_months(count, day=None):
+        """قائمة آخر count شهر بصيغة YYYY-MM بترتيب تصاعدي (تنتهي بالشهر الحالي)"""
+        day = day or date.today()
+        year, month = day.year, day.month
+        months = []
+        for _ in range(count):
+            months.append(f"{year:04d}-{month:02d}")
+            month -= 1
+            if month == 0:
+                year, month = year - 1, 12
+        months.reverse()
+        return months
+    
+    @staticmethod
+    def period_keys(start, end, granularity):
+        """جميع مفاتيح الفترات في المدى [start, end) بالترتيب لملء الفترات الفارغة بأصفار"""
+        start = date.fromisoformat(str(start)[:10])
+        end = date.fromisoformat(str(end)[:10])
+        keys = []
+        
+        if granularity == 'day':
+            current = start
+            step = timedelta(days=1)
+        elif granularity == 'week':
+            current = start - timedelta(days=start.weekday())
+            step = timedelta(days=7)
+        else:
+            current = start.replace(day=1)
+            step = None
+        
+        while current < end:
+            if step is None:
+                keys.append(current.strftime('%Y-%m'))
+                current = date.fromisoformat(StatisticsEngine.month_range(current)[1])
+            else:
+                keys.append(current.isoformat())
+                current += step
+        return keys
+    
+    def time_series(self, start, end, granularity='month', kinds=('incoming', 'outgoing')):
+        """عدد المراسلات لكل فترة في المدى [start, end) باستعلام مجمع واحد
+        
+        تعيد قائمة مرتبة من القواميس: {'period': ..., 'incoming': ..., 'outgoing': ...}
+        """
+        if granularity not in self.GRANULARITIES:
+            raise ValueError(f"دقة غير معروفة: {granularity}")
+        
+        start, end = str(start)[:10], str(end)[:10]
+        keys = self.period_keys(start, end, granularity)
+        series = {key: dict.fromkeys(kinds, 0) for key in keys}
+        if not keys:
+            return []
+        
+        # الأشهر الكاملة تقرأ من جدول التجميع بدلاً من جداول المراسلات
+        use_rollup = (
+            granularity == 'month' and start.endswith('-01') and end.endswith('-01')
+            and all(kind in self.MONTHLY_SOURCES for kind in kinds)
+        )
+        
+        if use_rollup:
+            placeholders = ', '.join('?' for _ in kinds)
+            rows = self.db_manager.execute_query(f'''
+                SELECT kind, year_month as period, count FROM monthly_counts
+                WHERE kind IN ({placeholders}) AND year_month >= ? AND year_month <= ?
+            ''', (*kinds, keys[0], keys[-1]))
+        else:
+            selects, params = [], []
+            for kind in kinds:
+                table, column = self.SERIES_SOURCES[kind]
+                bucket = self.GRANULARITIES[granularity].format(column=column)
+                selects.append(f'''
+                    SELECT '{kind}' as kind, {bucket} as period, COUNT(*) as count
+                    FROM {table}
+                    WHERE {column} >= ? AND {column} < ?
+                    GROUP BY period
+                ''')
+                params.extend((start, end))
+            rows = self.db_manager.execute_query(' UNION ALL '.join(selects), params)
+        
+        for row in rows:
+            if row['period'] in series:
+                series[row['period']][row['kind']] = row['count']
+        
+        return [dict(counts, period=key) for key, counts in series.items()]
+    
+    def monthly_count(self, kind, period):
+        """عدد مراسلات نوع معين في شهر معين (YYYY-MM)"""
+        month_start, month_end = self.period_range(period)
+        series = self.time_series(month_start, month_end, 'month', kinds=(kind,))
+        return series[0][kind] if series else 0
+    
+    def invalidate(self):
+        """إلغاء النسخة المخزنة"""
+        with self._lock:
+            self._cache_key = None
+            self._snapshot = None
+    
+    def snapshot(self):
+        """الحصول على الإحصائيات (من الذاكرة إذا لم تتغير البيانات)"""
+        month_start, month_end = self.month_range()
+        cache_key = (self.db_manager.get_data_version(), month_start)
+        
+        with self._lock:
+            if self._snapshot is not None and self._cache_key == cache_key:
+                return self._snapshot
+        
+        snapshot = self._compute(month_start, month_end)
+        
+        with self._lock:
+            self._cache_key = cache_key
+            self._snapshot = snapshot
+        return snapshot
+    
+    def _grouped_counts(self, table, date_column, month_start, month_end, with_priority=True):
+        """مسح واحد للجدول مجمع حسب الحالة (والأولوية)"""
+        group_columns = "status, priority" if with_priority else "status"
+        rows = self.db_manager.execute_query(f'''
+            SELECT {group_columns}, COUNT(*) as count,
+                   SUM({date_column} >= ? AND {date_column} < ?) as this_month
+            FROM {table}
+            GROUP BY {group_columns}
+        ''', (month_start, month_end))
+        
+        result = {'total': 0, 'this_month': 0, 'by_status': {}, 'by_priority': {}}
+        for row in rows:
+            count = row['count']
+            result['total'] += count
+            result['this_month'] += row['this_month'] or 0
+            result['by_status'][row['status']] = result['by_status'].get(row['status'], 0) + count
+            if with_priority:
+                result['by_priority'][row['priority']] = result['by_priority'].get(row['priority'], 0) + count
+        return result
+    
+    def _compute(self, month_start, month_end):
+        """حساب جميع الإحصائيات"""
+        incoming = self._grouped_counts('incoming_correspondence', 'received_date', month_start, month_end)
+        outgoing = self._grouped_counts('outgoing_correspondence', 'sent_date', month_start, month_end)
+        follow_up = self._grouped_counts('follow_up', 'follow_up_date', month_start, month_end, with_priority=False)
+        
+        priorities = dict(incoming['by_priority'])
+        for priority, count in outgoing['by_priority'].items():
+            priorities[priority] = priorities.get(priority, 0) + count
+        
+        return {
+            'total_incoming': incoming['total'],
+            'total_outgoing': outgoing['total'],
+            'new_incoming': incoming['by_status'].get('جديد', 0),
+            'draft_outgoing': outgoing['by_status'].get('مسودة', 0),
+            'pending_followups': follow_up['by_status'].get('معلق', 0),
+            'ongoing_followups': follow_up['by_status'].get('جاري', 0),
+            'closed_followups': follow_up['by_status'].get('مغلق', 0),
+            'completed_followups': follow_up['by_status'].get('مكتمل', 0),
+            'archived': incoming['by_status'].get('مؤرشف', 0) + outgoing['by_status'].get('مؤرشف', 0),
+            'incoming_this_month': incoming['this_month'],
+            'outgoing_this_month': outgoing['this_month'],
+            'incoming_by_status': incoming['by_status'],
+            'outgoing_by_status': outgoing['by_status'],
+            'follow_up_by_status': follow_up['by_status'],
+            'by_priority': priorities,
+        }
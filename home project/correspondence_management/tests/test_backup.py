@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات النسخ الاحتياطي الكامل والتفاضلي
+Backup Engine Tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+
+class DifferentialBackupTest(unittest.TestCase):
+    """النسخة التفاضلية تُستعاد فقط فوق النسخة الأساسية التي أُنشئت منها"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_manager = DatabaseManager(os.path.join(self.temp_dir.name, 'live.db'))
+        self.engine = self.db_manager.backup_engine
+    
+    def tearDown(self):
+        self.db_manager.close()
+        self.temp_dir.cleanup()
+    
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+    
+    def add_incoming(self, first, count):
+        with self.db_manager.transaction(tables=('incoming_correspondence',)) as cursor:
+            cursor.executemany(
+                "INSERT INTO incoming_correspondence (reference_number, received_date, sender, subject) "
+                "VALUES (?, '2025-01-01', 'جهة', 'موضوع')",
+                [(f"R-{number}",) for number in range(first, first + count)]
+            )
+    
+    def incoming_count(self):
+        return self.db_manager.execute_query("SELECT COUNT(*) AS count FROM incoming_correspondence")[0]['count']
+    
+    def round_trip(self, base_name, diff_name):
+        self.add_incoming(1, 50)
+        self.engine.backup(self.path(base_name))
+        self.add_incoming(51, 25)
+        self.assertGreater(self.engine.backup_differential(self.path(base_name), self.path(diff_name)), 0)
+        
+        self.add_incoming(76, 10)
+        self.engine.restore(self.path(diff_name))
+        self.assertEqual(self.incoming_count(), 75)
+    
+    def test_full_diff_restore(self):
+        self.round_trip('base.db', 'changes.diff.gz')
+    
+    def test_compressed_base(self):
+        self.round_trip('base.db.gz', 'changes.diff.gz')
+    
+    def test_overwritten_base_is_rejected(self):
+        self.round_trip('base.db', 'changes.diff.gz')
+        
+        # نسخة كاملة أحدث محفوظة بنفس اسم النسخة الأساسية
+        self.add_incoming(100, 30)
+        self.engine.backup(self.path('base.db'))
+        count = self.incoming_count()
+        
+        with self.assertRaises(ValueError):
+            self.engine.restore(self.path('changes.diff.gz'))
+        self.assertEqual(self.incoming_count(), count)
+        self.assertFalse(self.db_manager.restore_database(self.path('changes.diff.gz')))
+    
+    def test_explicit_wrong_base_is_rejected(self):
+        self.round_trip('base.db', 'changes.diff.gz')
+        self.engine.backup(self.path('other.db'))
+        with self.assertRaises(ValueError):
+            self.engine.materialize(self.path('changes.diff.gz'), self.path('out.db'), base_path=self.path('other.db'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات تسلسل أرقام المراسلات
+Sequence Allocator Tests
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import types
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from gui.enhanced_outgoing_form import EnhancedOutgoingForm
+from gui.incoming_correspondence_form import IncomingCorrespondenceForm
+
+class SequenceTestCase(unittest.TestCase):
+    """قاعدة بيانات مؤقتة لكل اختبار"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'live.db')
+        self.db_manager = DatabaseManager(self.db_path)
+        self.sequences = self.db_manager.sequences
+    
+    def tearDown(self):
+        self.db_manager.close()
+        self.temp_dir.cleanup()
+    
+    def form(self, db_manager=None, auto_reference_number=None):
+        """بديل بسيط للنموذج يكفي لاستدعاء reserve_reference_number"""
+        return types.SimpleNamespace(
+            db_manager=db_manager or self.db_manager,
+            auto_reference_number=auto_reference_number
+        )
+    
+    def insert_incoming(self, reference_number, db_manager=None, auto=False):
+        """إدراج مراسلة واردة بنفس طريقة النموذج (الحجز والإدراج في معاملة واحدة)"""
+        db_manager = db_manager or self.db_manager
+        form = self.form(db_manager, reference_number if auto else None)
+        with db_manager.transaction(tables=('incoming_correspondence', 'sequences')) as cursor:
+            reference_number = IncomingCorrespondenceForm.reserve_reference_number(form, reference_number, cursor)
+            cursor.execute(
+                "INSERT INTO incoming_correspondence (reference_number, received_date, sender, subject) "
+                "VALUES (?, '2024-01-01', 'جهة', 'موضوع')",
+                (reference_number,)
+            )
+        return reference_number
+    
+    def insert_outgoing(self, reference_number, subject_code=None):
+        """إدراج مراسلة صادرة مباشرة (بيانات موجودة قبل إنشاء السلسلة)"""
+        self.db_manager.execute_update(
+            "INSERT INTO outgoing_correspondence (reference_number, subject_code, sent_date, recipient, subject) "
+            "VALUES (?, ?, '2024-01-01', 'جهة', 'موضوع')",
+            (reference_number, subject_code)
+        )
+
+class ConcurrentAllocationTest(SequenceTestCase):
+    """الحجز المتزامن لا يعطي نفس الرقم مرتين"""
+    
+    THREADS = 8
+    PER_THREAD = 25
+    
+    def run_threads(self, target):
+        errors = []
+        
+        def worker(index):
+            try:
+                target(index)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+    
+    def test_allocate_from_threads_and_connections(self):
+        """خيوط على نفس المدير وعلى مدير ثانٍ لنفس الملف"""
+        other = DatabaseManager(self.db_path)
+        self.addCleanup(other.close)
+        results = []
+        lock = threading.Lock()
+        
+        def allocate(index):
+            db_manager = other if index % 2 else self.db_manager
+            numbers = [db_manager.sequences.allocate('incoming') for _ in range(self.PER_THREAD)]
+            with lock:
+                results.extend(numbers)
+        
+        self.run_threads(allocate)
+        total = self.THREADS * self.PER_THREAD
+        self.assertEqual(sorted(results), list(range(1, total + 1)))
+        self.assertEqual(self.sequences.peek('incoming'), total + 1)
+    
+    def test_form_reserve_inserts_unique_numbers(self):
+        """حفظ النموذج المتزامن لا يصطدم بالقيد الفريد على رقم المراسلة"""
+        next_number = str(self.sequences.peek('incoming'))
+        
+        def save(index):
+            for _ in range(self.PER_THREAD):
+                # كل النماذج عرضت نفس الرقم التلقائي قبل الحفظ
+                self.insert_incoming(next_number, auto=True)
+        
+        self.run_threads(save)
+        rows = self.db_manager.execute_query("SELECT reference_number FROM incoming_correspondence")
+        numbers = sorted(int(row['reference_number']) for row in rows)
+        total = self.THREADS * self.PER_THREAD
+        self.assertEqual(numbers, list(range(1, total + 1)))
+    
+    def test_failed_transaction_releases_number(self):
+        """الرقم المحجوز داخل معاملة فاشلة لا يُستهلك"""
+        with self.assertRaises(RuntimeError):
+            with self.db_manager.transaction(tables=('sequences',)) as cursor:
+                self.assertEqual(self.sequences.allocate('incoming', cursor), 1)
+                raise RuntimeError
+        self.assertEqual(self.sequences.allocate('incoming'), 1)
+
+class AdvanceToTest(SequenceTestCase):
+    """الأرقام اليدوية والمستوردة تقدم السلسلة"""
+    
+    def test_manual_number_advances_sequence(self):
+        self.assertEqual(self.insert_incoming('1', auto=True), '1')
+        self.assertEqual(self.insert_incoming('50'), '50')
+        self.assertEqual(self.sequences.peek('incoming'), 51)
+        self.assertEqual(self.insert_incoming('51', auto=True), '51')
+    
+    def test_lower_manual_number_keeps_sequence(self):
+        self.insert_incoming('20')
+        self.insert_incoming('5')
+        self.assertEqual(self.sequences.peek('incoming'), 21)
+    
+    def test_non_numeric_manual_number_ignored(self):
+        self.insert_incoming('3')
+        self.insert_incoming('IN-900')
+        self.assertEqual(self.sequences.peek('incoming'), 4)
+    
+    def test_outgoing_form_advances_sequence(self):
+        form = self.form()
+        with self.db_manager.transaction(tables=('sequences',)) as cursor:
+            self.assertEqual(EnhancedOutgoingForm.reserve_reference_number(form, '70', cursor), '70')
+        self.assertEqual(self.sequences.allocate('outgoing'), 71)
+    
+    def test_import_advances_sequences(self):
+        path = os.path.join(self.temp_dir.name, 'outgoing.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("reference_number,subject_code,subject,recipient,sent_date\n")
+            f.write("120,OUT-CHR7,موضوع,جهة,2024-01-01\n")
+            f.write("95,OUT-CHR30,موضوع,جهة,2024-01-02\n")
+        
+        result = self.db_manager.bulk_io.import_file('outgoing', path)
+        self.assertEqual(result['inserted'], 2)
+        self.assertEqual(self.sequences.allocate('outgoing'), 121)
+        self.assertEqual(self.sequences.allocate(self.sequences.subject_series('OUT', 'CHR')), 31)
+
+class SeedTest(SequenceTestCase):
+    """تهيئة السلاسل من البيانات الموجودة قبل جدول التسلسلات"""
+    
+    def test_seed_uses_largest_numeric_reference(self):
+        # آخر صف مُدرج ليس أكبر رقم، والأرقام غير الرقمية تُتجاهل
+        for reference_number in ('100', '7', 'OUT-500', '12'):
+            self.insert_outgoing(reference_number)
+        self.assertEqual(self.sequences.peek('outgoing'), 101)
+        self.assertEqual(self.sequences.allocate('outgoing'), 101)
+    
+    def test_seed_compares_numbers_not_text(self):
+        for reference_number in ('9', '10'):
+            self.insert_outgoing(reference_number)
+        self.assertEqual(self.sequences.allocate('outgoing'), 11)
+    
+    def test_seed_incoming(self):
+        self.insert_incoming('42')
+        self.db_manager.execute_update("DELETE FROM sequences")
+        self.assertEqual(self.sequences.allocate('incoming'), 43)
+    
+    def test_seed_empty_table(self):
+        self.assertEqual(self.sequences.peek('outgoing'), 1)
+        self.assertEqual(self.sequences.allocate('outgoing'), 1)
+    
+    def test_seed_subject_code(self):
+        self.insert_outgoing('1', 'OUT-CHR9')
+        self.insert_outgoing('2', 'OUT-CHR12')
+        self.insert_outgoing('3', 'OUT-CH99')
+        self.assertEqual(self.sequences.allocate(self.sequences.subject_series('OUT', 'CHR')), 13)
+        self.assertEqual(self.sequences.allocate(self.sequences.subject_series('OUT', 'CH')), 100)
+    
+    def test_seed_happens_once(self):
+        self.insert_outgoing('5')
+        self.assertEqual(self.sequences.allocate('outgoing'), 6)
+        self.db_manager.execute_update("DELETE FROM outgoing_correspondence")
+        self.assertEqual(self.sequences.allocate('outgoing'), 7)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات صلاحيات خادم قاعدة البيانات
+Database Server Security Tests
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from remote_client import RemoteDatabaseManager, RemoteAuthManager, RemoteError
+from server import DatabaseServer
+
+class ServerSecurityTest(unittest.TestCase):
+    """دوال auth.* تتطلب تسجيل الدخول، وجمل SQL من العملاء لا تصل للمستخدمين ولا للمخطط"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.db_manager = DatabaseManager(os.path.join(cls.temp_dir.name, 'server.db'))
+        cls.server = DatabaseServer(cls.db_manager, '127.0.0.1', 0, pool_size=2)
+        cls.server.auth.create_default_admin()
+        cls.employee_id = cls.server.auth.create_user('employee', 'employee123', 'موظف', 'employee')
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.thread.join()
+        cls.temp_dir.cleanup()
+    
+    def client(self, username=None, password=None):
+        """عميل جديد (مع تسجيل الدخول إذا حُدد المستخدم)"""
+        db_manager = RemoteDatabaseManager(self.server.address)
+        auth = RemoteAuthManager(db_manager)
+        if username:
+            self.assertIsNotNone(auth.authenticate(username, password))
+        return db_manager, auth
+    
+    def user(self, username):
+        return self.db_manager.execute_query(
+            "SELECT id, role, is_active, password_hash FROM users WHERE username = ?", (username,)
+        )
+    
+    # دوال auth.*
+    def test_user_management_requires_login(self):
+        db_manager, _ = self.client()
+        with self.assertRaises(RemoteError):
+            db_manager.call('auth.create_user', 'evil', 'x', 'Evil', 'admin')
+        with self.assertRaises(RemoteError):
+            db_manager.call('auth.change_password', self.employee_id, 'x')
+        with self.assertRaises(RemoteError):
+            db_manager.call('auth.update_user', self.employee_id, role='admin')
+        self.assertEqual(self.user('evil'), [])
+        self.assertEqual(self.user('employee')[0]['role'], 'employee')
+    
+    def test_wrong_password_gives_no_login(self):
+        db_manager, auth = self.client()
+        self.assertIsNone(auth.authenticate('admin', 'wrong'))
+        self.assertIsNone(db_manager.login_key)
+    
+    def test_employee_cannot_manage_other_users(self):
+        db_manager, auth = self.client('employee', 'employee123')
+        self.assertIsNone(auth.create_user('evil', 'x', 'Evil', 'admin'))
+        admin_id = self.user('admin')[0]['id']
+        self.assertFalse(auth.change_password(admin_id, 'x'))
+        self.assertFalse(auth.update_user(self.employee_id, role='admin'))
+        self.assertEqual(self.user('evil'), [])
+        self.assertEqual(self.user('employee')[0]['role'], 'employee')
+        self.assertTrue(self.server.auth.verify_user('admin', 'admin123'))
+    
+    def test_employee_can_change_own_password(self):
+        _, auth = self.client('employee', 'employee123')
+        self.assertTrue(auth.change_password(self.employee_id, 'changed123'))
+        self.assertTrue(self.server.auth.verify_user('employee', 'changed123'))
+        self.assertTrue(self.server.auth.change_password(self.employee_id, 'employee123'))
+    
+    def test_admin_can_manage_users(self):
+        _, auth = self.client('admin', 'admin123')
+        user_id = auth.create_user('clerk', 'clerk123', 'كاتب', 'employee')
+        self.assertTrue(user_id)
+        self.assertTrue(auth.delete_user(user_id))
+        self.assertEqual(self.user('clerk')[0]['is_active'], 0)
+    
+    def test_logout_ends_login(self):
+        db_manager, auth = self.client('admin', 'admin123')
+        login_key = db_manager.login_key
+        auth.logout()
+        db_manager.login_key = login_key
+        with self.assertRaises(RemoteError):
+            db_manager.call('auth.create_user', 'evil', 'x', 'Evil', 'admin')
+    
+    def test_demoted_admin_loses_rights(self):
+        _, admin = self.client('admin', 'admin123')
+        user_id = admin.create_user('boss', 'boss123', 'مدير مؤقت', 'admin')
+        _, boss = self.client('boss', 'boss123')
+        self.db_manager.execute_update("UPDATE users SET role = 'employee' WHERE id = ?", (user_id,))
+        self.assertIsNone(boss.create_user('evil', 'x', 'Evil', 'admin'))
+        self.assertEqual(self.user('evil'), [])
+    
+    def test_unknown_methods_rejected(self):
+        db_manager, _ = self.client()
+        for method in ('auth.verify_user', 'close', 'backup_engine.restore', '_open_connection', 'auth.hasher'):
+            with self.assertRaises(RemoteError):
+                db_manager.call(method)
+    
+    # جمل SQL من العملاء
+    def test_client_sql_cannot_write_users(self):
+        db_manager, _ = self.client('admin', 'admin123')
+        self.assertIsNone(db_manager.execute_update(
+            "UPDATE users SET role = 'admin', is_active = 1 WHERE username = 'employee'"
+        ))
+        self.assertIsNone(db_manager.execute_update(
+            "INSERT INTO users (username, password_hash, full_name, role) VALUES ('evil', 'x', 'Evil', 'admin')"
+        ))
+        self.assertIsNone(db_manager.execute_update("DELETE FROM users WHERE username = 'employee'"))
+        self.assertEqual(self.user('employee')[0]['role'], 'employee')
+        self.assertEqual(self.user('evil'), [])
+    
+    def test_client_sql_cannot_read_password_hash(self):
+        db_manager, _ = self.client()
+        rows = db_manager.execute_query("SELECT * FROM users WHERE username = 'admin'")
+        self.assertEqual(len(rows), 1)
+        self.assertIsNone(rows[0]['password_hash'])
+        self.assertEqual(db_manager.execute_query("SELECT id FROM users WHERE password_hash LIKE '%'"), [])
+    
+    def test_client_sql_rejects_schema_attach_and_pragma(self):
+        db_manager, _ = self.client()
+        attached = os.path.join(self.temp_dir.name, 'attached.db')
+        self.assertEqual(db_manager.execute_query(f"ATTACH DATABASE '{attached}' AS other"), [])
+        self.assertFalse(os.path.exists(attached))
+        self.assertEqual(db_manager.execute_query("PRAGMA table_info(users)"), [])
+        self.assertIsNone(db_manager.execute_update("DROP TABLE follow_up"))
+        self.assertIsNone(db_manager.execute_update("PRAGMA foreign_keys = OFF"))
+        self.assertTrue(self.db_manager.execute_query("PRAGMA table_info(follow_up)"))
+    
+    def test_transaction_sql_is_checked(self):
+        db_manager, _ = self.client()
+        with self.assertRaises(sqlite3.DatabaseError):
+            with db_manager.transaction() as cursor:
+                cursor.execute("UPDATE users SET role = 'admin'")
+        with self.assertRaises(sqlite3.DatabaseError):
+            with db_manager.transaction() as cursor:
+                cursor.execute("CREATE TABLE evil (id INTEGER)")
+    
+    def test_client_sql_can_use_application_tables(self):
+        db_manager, _ = self.client()
+        record_id = db_manager.execute_update(
+            "INSERT INTO incoming_correspondence (reference_number, received_date, sender, subject) VALUES (?, ?, ?, ?)",
+            ('T-1', '2025-01-01', 'جهة', 'موضوع اختبار')
+        )
+        self.assertTrue(record_id)
+        self.assertIsNotNone(db_manager.execute_update(
+            "DELETE FROM incoming_correspondence WHERE id = ?", (record_id,)
+        ))
+    
+    # الربط والنسخ الاحتياطي
+    def test_public_bind_requires_token(self):
+        with self.assertRaises(ValueError):
+            DatabaseServer(self.db_manager, '0.0.0.0', 0)
+    
+    def test_backup_names_confined_to_backup_dir(self):
+        for name in ('../evil.db', '/tmp/evil.db', '..', '.hidden', 'a/b.db', 'a\\b.db', 'C:evil.db', ''):
+            with self.assertRaises(Exception, msg=name):
+                self.server.backup_file(name)
+        self.assertEqual(
+            self.server.backup_file('backup.db'), os.path.join(self.server.backup_dir, 'backup.db')
+        )
+
+class TokenTest(unittest.TestCase):
+    """رمز الدخول مطلوب عند تحديده"""
+    
+    def test_wrong_token_rejected(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_manager = DatabaseManager(os.path.join(temp_dir, 'server.db'))
+            server = DatabaseServer(db_manager, '127.0.0.1', 0, token='secret', pool_size=1)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                with self.assertRaises(RemoteError):
+                    RemoteDatabaseManager(server.address, token='wrong').get_data_version()
+                with self.assertRaises(RemoteError):
+                    RemoteDatabaseManager(server.address).get_data_version()
+                self.assertTrue(RemoteDatabaseManager(server.address, token='secret').get_data_version())
+            finally:
+                server.shutdown()
+                thread.join()
+
+if __name__ == '__main__':
+    unittest.main()